@@ -0,0 +1,260 @@
+# Copyright Manuel Cerón.  All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied.  See the License for the specific language
+# governing permissions and limitations under the License.
+
+"""Profiler explaining where the time of type checks is spent.
+
+A ConstraintProfiler attributes calls and time to every node of the
+annotations checked by typechecked(): each element constraint of a list,
+each key and value branch of a dict, each position of a tuple, predicates,
+unions and interfaces. It is meant for tuning the annotations of hot
+functions, not to be left enabled in production.
+
+>>> from annotation.typed import typechecked
+>>> profiler = ConstraintProfiler()
+>>> @typechecked(profiler=profiler)
+... def total(prices: {str: [int]}) -> int:
+...     return sum(sum(p) for p in prices.values())
+...
+>>> total({'a': [1, 2], 'b': [3]})
+6
+>>> for node in sorted(profiler.stats(), key=lambda node: node.path):
+...     print(node.path, node.constraint, node.calls)
+prices {str: [int]} 1
+prices{key} str 2
+prices{value} [int] 2
+prices{value}[*] int 3
+return int 1
+"""
+
+__all__ = ['ConstraintProfiler', 'NodeStats']
+
+import collections
+import functools
+import inspect
+
+from annotation import instrument
+from annotation.typed import (AnyType, _CollectionChecker, _DictChecker,
+                              _TupleChecker, _compile, _compile_signature,
+                              _describe_checker)
+
+
+NodeStats = collections.namedtuple(
+    'NodeStats', 'function path constraint calls total_time self_time')
+
+
+class _Node(object):
+    """A node of the constraint tree with its accumulated statistics."""
+    __slots__ = ('function', 'path', 'checker', 'calls', 'total_time',
+                 'self_time', 'children')
+
+    def __init__(self, function, path, checker):
+        self.function = function
+        self.path = path
+        self.checker = checker
+        self.calls = 0
+        self.total_time = 0.0
+        self.self_time = 0.0
+        self.children = {}
+
+    def child(self, key, suffix, checker):
+        try:
+            return self.children[key]
+        except KeyError:
+            node = self.children[key] = _Node(self.function, self.path + suffix,
+                                              checker)
+            return node
+
+    def walk(self):
+        yield self
+        for child in self.children.values():
+            yield from child.walk()
+
+
+class ConstraintProfiler(object):
+    """Collects the time spent checking each node of the annotations.
+
+    Use it as typechecked(profiler=profiler), or call check() directly. The
+    nodes are the ones of the compiled checkers used by typechecked(), so
+    the alternatives of structurally equal annotations, such as [int, str]
+    and [str, int], are numbered in the same order.
+    """
+
+    def __init__(self):
+        self._roots = {} # {(function, name): _Node, ...}
+        self._any_type = _compile(AnyType)
+
+    def _root(self, function, name, checker):
+        key = function, name
+        try:
+            return self._roots[key]
+        except KeyError:
+            node = self._roots[key] = _Node(function, name, checker)
+            return node
+
+    def _check(self, checker, value, node):
+        """checker.check(value) recording the time spent in each node."""
+        clock = instrument.clock
+        start = clock()
+        children_time = 0.0
+        node.calls += 1
+        kind = type(checker)
+        if kind is _CollectionChecker:
+            result = isinstance(value, checker.kind)
+            alternatives = checker.alternatives
+            if result and alternatives:
+                if len(alternatives) == 1:
+                    suffixes = ['[*]']
+                else:
+                    suffixes = ['[*]#{0}'.format(i) for i in range(len(alternatives))]
+                for item in value:
+                    for index, alternative in enumerate(alternatives):
+                        child = node.child(index, suffixes[index], alternative)
+                        matched, elapsed = self._check(alternative, item, child)
+                        children_time += elapsed
+                        if matched:
+                            break
+                    else:
+                        result = False
+                        break
+        elif kind is _TupleChecker:
+            items = checker.items
+            result = isinstance(value, tuple) and len(value) == len(items)
+            if result:
+                for index, (item, item_checker) in enumerate(zip(value, items)):
+                    child = node.child(index, '[{0}]'.format(index), item_checker)
+                    matched, elapsed = self._check(item_checker, item, child)
+                    children_time += elapsed
+                    if not matched:
+                        result = False
+                        break
+        elif kind is _DictChecker:
+            result = isinstance(value, dict)
+            items = checker.items
+            if result and items:
+                if len(items) == 1:
+                    suffixes = ['']
+                else:
+                    suffixes = ['#{0}'.format(i) for i in range(len(items))]
+                for key, item in value.items():
+                    matched = False
+                    for index, (key_checker, value_checker) in enumerate(items):
+                        suffix = suffixes[index]
+                        child = node.child(2 * index, '{key}' + suffix, key_checker)
+                        matched, elapsed = self._check(key_checker, key, child)
+                        children_time += elapsed
+                        if matched:
+                            child = node.child(2 * index + 1, '{value}' + suffix,
+                                               value_checker)
+                            matched, elapsed = self._check(value_checker, item,
+                                                           child)
+                            children_time += elapsed
+                        if matched:
+                            break
+                    if not matched:
+                        result = False
+                        break
+        else:
+            result = checker.check(value)
+        elapsed = clock() - start
+        node.total_time += elapsed
+        node.self_time += elapsed - children_time
+        return result, elapsed
+
+    def check(self, value, constraint, name='value'):
+        """Checks value against constraint, profiling it under name."""
+        checker = _compile(constraint)
+        node = self._root(None, name, checker)
+        return self._check(checker, value, node)[0]
+
+    def _check_arguments(self, function, checks, signature, args, kwargs):
+        bound = checks.bind(args, kwargs)
+        if bound is None:
+            signature.bind(*args, **kwargs)
+        for name, checker, value in bound:
+            if checker is None:
+                checker = self._any_type
+            node = self._root(function, name, checker)
+            if not self._check(checker, value, node)[0]:
+                raise TypeError('Incorrect type for "{0}"'.format(name))
+
+    def _check_return(self, function, checks, return_value):
+        checker = checks.returns
+        if checker is None:
+            checker = self._any_type
+        node = self._root(function, 'return', checker)
+        if not self._check(checker, return_value, node)[0]:
+            raise TypeError('Incorrect return type')
+        return return_value
+
+    def wrap(self, target, signature=None):
+        """Returns a typechecked() wrapper of target that profiles its checks.
+
+        The signature of target is introspected if it's not given. The return
+        value of coroutine functions is checked once they have been awaited.
+        """
+        function = '{0}.{1}'.format(target.__module__, target.__qualname__)
+        checks = None if signature is None else _compile_signature(signature)
+
+        if inspect.iscoroutinefunction(target):
+            @functools.wraps(target)
+            async def wrapper(*args, **kwargs):
+                nonlocal signature, checks
+                if checks is None:
+                    signature = inspect.signature(target)
+                    checks = _compile_signature(signature)
+                self._check_arguments(function, checks, signature, args, kwargs)
+                return self._check_return(function, checks,
+                                          await target(*args, **kwargs))
+            return wrapper
+
+        @functools.wraps(target)
+        def wrapper(*args, **kwargs):
+            nonlocal signature, checks
+            if checks is None:
+                signature = inspect.signature(target)
+                checks = _compile_signature(signature)
+            self._check_arguments(function, checks, signature, args, kwargs)
+            return self._check_return(function, checks, target(*args, **kwargs))
+        return wrapper
+
+    def stats(self):
+        """Returns a NodeStats for every node, sorted by self time."""
+        nodes = [NodeStats(node.function, node.path,
+                           _describe_checker(node.checker), node.calls,
+                           node.total_time, node.self_time)
+                 for root in self._roots.values() for node in root.walk()]
+        nodes.sort(key=lambda node: node.self_time, reverse=True)
+        return nodes
+
+    def report(self, sort='self_time', limit=None):
+        """Renders the statistics as a table sorted by the given column."""
+        nodes = sorted(self.stats(), key=lambda node: getattr(node, sort),
+                       reverse=True)
+        if limit is not None:
+            nodes = nodes[:limit]
+        lines = ['{0:>10} {1:>12} {2:>12} {3:>10}  {4}'.format(
+            'calls', 'total (ms)', 'self (ms)', 'per call', 'node')]
+        for node in nodes:
+            per_call = node.total_time / node.calls if node.calls else 0.0
+            location = node.path
+            if node.function is not None:
+                location = '{0}:{1}'.format(node.function, node.path)
+            lines.append('{0:>10} {1:>12.3f} {2:>12.3f} {3:>8.2f}us  {4} {5}'.format(
+                node.calls, node.total_time * 1e3, node.self_time * 1e3,
+                per_call * 1e6, location, node.constraint))
+        return '\n'.join(lines)
+
+    def reset(self):
+        """Discards all the collected statistics."""
+        self._roots.clear()
@@ -0,0 +1,141 @@
+# Copyright Manuel Cerón.  All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied.  See the License for the specific language
+# governing permissions and limitations under the License.
+
+"""Instrumentation of the time spent in runtime type checking.
+
+Instrumentation is decided when functions are decorated and classes are
+created: typechecked() functions, interfaces and overloaded functions defined
+while instrumentation is enabled get counters, the ones defined while it is
+disabled run exactly the same code as if this module didn't exist. It must be
+enabled before importing the code to instrument:
+
+>>> from annotation import instrument
+>>> instrument.enable()
+>>> from annotation.typed import typechecked
+>>> @typechecked
+... def double(a: int) -> int:
+...     return a * 2
+...
+>>> double(2)
+4
+>>> [counters['calls'] for name, counters in instrument.snapshot().items()
+...  if name.endswith('.double')]
+[1]
+>>> instrument.disable()
+>>> instrument.reset()
+"""
+
+__all__ = ['Counters', 'add_hook', 'counters', 'disable', 'enable', 'export',
+           'is_enabled', 'remove_hook', 'reset', 'snapshot']
+
+import time
+
+
+clock = time.perf_counter
+
+
+class Counters(object):
+    """Accumulators for a single instrumented object.
+
+    calls: number of calls to the function, or checks against the interface.
+    checks: number of values that passed a check.
+    failures: number of failed checks.
+    check_time: seconds spent checking types, or dispatching overloads.
+    hits, misses: dispatch cache hits and misses of overloaded functions.
+    """
+    __slots__ = ('name', 'calls', 'checks', 'failures', 'check_time', 'hits',
+                 'misses')
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.checks = 0
+        self.failures = 0
+        self.check_time = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__
+                if name != 'name'}
+
+    def __repr__(self):
+        return '<Counters {0} {1}>'.format(self.name, self.as_dict())
+
+
+_enabled = False
+_counters = {} # {name: Counters, ...}
+_hooks = []
+
+
+def enable():
+    """Instruments the objects defined from now on."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stops instrumenting new objects. Existing counters keep counting."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def counters(name):
+    """Returns the Counters for the given name, creating them if needed."""
+    try:
+        return _counters[name]
+    except KeyError:
+        _counters[name] = result = Counters(name)
+        return result
+
+
+def snapshot():
+    """Returns a copy of all the counters as {name: {counter: value}}."""
+    return {name: counter.as_dict() for name, counter in _counters.items()}
+
+
+def reset():
+    """Sets all the counters to zero."""
+    for counter in _counters.values():
+        counter.reset()
+
+
+def add_hook(hook):
+    """Registers a callable receiving the snapshots made by export()."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+def export(reset_counters=False):
+    """Passes a snapshot of the counters to every hook and returns it.
+
+    If reset_counters is True the counters are set to zero afterwards, which
+    is useful to export deltas periodically.
+    """
+    data = snapshot()
+    for hook in _hooks:
+        hook(data)
+    if reset_counters:
+        reset()
+    return data
@@ -12,8 +12,19 @@
 # either express or implied.  See the License for the specific language
 # governing permissions and limitations under the License.
 
+import abc
+import asyncio
 import collections
+import collections.abc
+import functools
+import importlib
 import inspect
+import json
+import weakref
+
+from annotation import instrument
+from annotation.typed import InterfaceMeta, PredicateMeta, UnionMeta, _is_subclass
+from annotation.typed import _invalidation_hooks
 
 
 _empty_func = lambda *args: None
@@ -25,13 +36,21 @@ def _ann_cmp(ann1, ann2):
     Compares two annotations and returns True if ann1 is more specific
     than ann2.
     """
-    return ann1 != ann2 and (ann2 == _empty_annotation or issubclass(ann1, ann2))
+    return ann1 != ann2 and (ann2 == _empty_annotation or _ann_subclass(ann1, ann2))
 
 
 def _get_annotations(func):
     return (param.annotation for param in inspect.signature(func).parameters.values())
 
 
+def _annotates_receiver(func):
+    """True if the first parameter of func, the receiver of a method, is
+    annotated."""
+    for annotation in _get_annotations(func):
+        return annotation != _empty_annotation
+    return False
+
+
 def _func_eq(func1, func2):
     """
     Returns True if the two functions's signatures evaluate to the same types.
@@ -117,13 +136,158 @@ def _func_cmp(func1, func2):
             continue
         if ann2 == _empty_annotation:
             continue
-        if not issubclass(ann1, ann2):
+        if not _ann_subclass(ann1, ann2):
             return False
     return True
 
 
+def _ann_subclass(ann1, ann2):
+    """
+    issubclass() for comparing annotations. The attributes of an Interface are
+    only checked on values, so the classes implementing its methods are not
+    more specific than it, only its subclasses are.
+    """
+    if not _has_attributes(ann2):
+        return _is_subclass(ann1, ann2)
+    if isinstance(ann2, UnionMeta):
+        if isinstance(ann1, UnionMeta):
+            return all(_ann_subclass(t, ann2) for t in ann1.__types__)
+        return any(_ann_subclass(ann1, t) for t in ann2.__types__)
+    return ann2 in getattr(ann1, '__mro__', ())
+
+
+def _has_predicate(ann):
+    if isinstance(ann, PredicateMeta):
+        return True
+    return isinstance(ann, UnionMeta) and any(_has_predicate(t) for t in ann.__types__)
+
+
+def _has_attributes(ann):
+    if isinstance(ann, InterfaceMeta):
+        return bool(ann.__attribute_table__)
+    return isinstance(ann, UnionMeta) and any(_has_attributes(t) for t in ann.__types__)
+
+
+def _dispatch_annotations(func):
+    """
+    The annotations of func as ((position, type annotation, value annotation),
+    ...), skipping empty annotations.
+
+    The type annotation is checked against the type of the argument, it's None
+    for predicates, which can't be decided from a type. The value annotation is
+    checked against the argument itself, it's None unless the annotation is or
+    contains a predicate or an Interface with attributes, since
+    issubclass() can't check those.
+    """
+    result = []
+    for i, ann in enumerate(_get_annotations(func)):
+        if ann == _empty_annotation:
+            continue
+        if _has_predicate(ann):
+            result.append((i, None, ann))
+        elif _has_attributes(ann):
+            result.append((i, ann, ann))
+        else:
+            result.append((i, ann, None))
+    return tuple(result)
+
+
+def _match_types(annotations, types):
+    """
+    Type-level stage of dispatch. Returns None if a function with the given
+    _dispatch_annotations() can't be called with arguments of these types.
+    Otherwise returns the ((position, annotation), ...) that still have to be
+    checked against the arguments, see _select().
+    """
+    checks = ()
+    for i, type_ann, value_ann in annotations:
+        if type_ann is not None and types[i] != type_ann and not _is_subclass(types[i], type_ann):
+            return None
+        if value_ann is not None:
+            checks += ((i, value_ann),)
+    return checks
+
+
+def _unpack_heap(heap):
+    func = heap._root
+    annotations = None if func == _empty_func else _dispatch_annotations(func)
+    return annotations, func, heap._childs
+
+
+def _unpack_frozen(heap):
+    return heap
+
+
+def _candidates(heap, types, unpack):
+    """
+    Finds the functions of a heap that can be called with arguments of the
+    given types, as [(func, checks), ...] where checks are the value checks
+    returned by _match_types().
+
+    The candidates are sorted from the most specific to the least one. The
+    most specialized function with no value checks is found like in a heap
+    with only types: descending into the children that match, the last one
+    registered when several unrelated ones do. The candidates with value
+    checks met on the way, and their own children, come before it and the
+    functions more generic than it are never needed, so it's the last one.
+
+    Arguments:
+    unpack: returns (annotations, func, childs) for a node of the heap, see
+            _unpack_heap() and _unpack_frozen().
+    """
+    annotations, func, childs = unpack(heap)
+    checks = ()
+    if func != _empty_func:
+        checks = _match_types(annotations, types)
+        if checks is None:
+            return []
+    levels = [] # [[candidate with value checks, ...], ...] by depth
+    while True:
+        conditional = []
+        definite = None
+        for child in childs:
+            child_annotations, child_func, child_childs = unpack(child)
+            child_checks = _match_types(child_annotations, types)
+            if child_checks is None:
+                continue
+            if child_checks:
+                conditional.extend(_candidates(child, types, unpack))
+            else:
+                definite = child_func, child_childs
+        levels.append(conditional)
+        if definite is None:
+            break
+        func, childs = definite
+        checks = ()
+    candidates = [candidate for level in reversed(levels) for candidate in level]
+    if func != _empty_func:
+        candidates.append((func, checks))
+    return candidates
+
+
 def _check_func_types(func, types):
-    return all((typ == ann) or issubclass(typ, ann) for typ, ann in zip(types, _get_annotations(func)) if ann != _empty_annotation)
+    """Whether func can be called with arguments of the given types, leaving
+    out the checks that need the arguments themselves, see _match_types()."""
+    return _match_types(_dispatch_annotations(func), types) is not None
+
+
+def _select(candidates, args):
+    """
+    Value-level stage of dispatch. Returns the first of the candidates found by
+    _candidates() whose value checks pass for args. Predicates see arguments
+    of any type, a predicate raising TypeError doesn't match.
+    """
+    for func, checks in candidates:
+        try:
+            for i, ann in checks:
+                if not isinstance(args[i], ann):
+                    break
+            else:
+                return func
+        except TypeError:
+            pass
+    raise FunctionNotFound('No function found for arguments of types: {0}'.format(
+        tuple(type(arg) for arg in args)))
 
 
 class AmbiguousFunction(ValueError):
@@ -146,14 +310,27 @@ class FunctionNotFound(Exception):
 class FunctionHeap(object):
     def __init__(self, func):
         self._root = func
-        self._childs = set()
+        self._childs = [] # In registration order, see _candidates().
 
     def push(self, func):
         if _func_eq(func, self._root):
             raise AmbiguousFunction(func)
         if self._root == _empty_func:
+            if any(_func_eq(func, child._root) for child in self._childs):
+                raise AmbiguousFunction(func)
             if all(_func_cmp(child._root, func) for child in self._childs):
                 self._root = func
+                return
+            for child in self._childs:
+                if _func_cmp(func, child._root):
+                    child.push(func)
+                    return
+            # func is a new branch, more specific functions go below it.
+            new_heap = self.__class__(func)
+            new_heap._childs = [child for child in self._childs
+                                if _func_cmp(child._root, func)]
+            self._childs = [child for child in self._childs
+                            if child not in new_heap._childs] + [new_heap]
         elif _func_cmp(func, self._root):
             if any(_func_eq(func, child._root) for child in self._childs):
                 raise AmbiguousFunction(func)
@@ -161,50 +338,394 @@ class FunctionHeap(object):
                 if _func_cmp(func, child._root):
                     child.push(func)
                     return
-            self._childs.add(self.__class__(func))
+            self._childs.append(self.__class__(func))
         else:
             old_heap = self.__class__(self._root)
             old_heap._childs = self._childs
             if _func_cmp(self._root, func):
                 self._root = func
-                self._childs = set([old_heap])
+                self._childs = [old_heap]
             else:
                 new_heap = self.__class__(func)
                 self._root = _empty_func
-                self._childs = set([old_heap, new_heap])
+                self._childs = [old_heap, new_heap]
 
-    def find(self, types):
+    def find(self, types, args=None):
         """
         Finds the most specialized function for args.
         For example if args where (1,2,'foo', 'bar') and the Heap had the childs
         foo(a:int,b,c,d) and bar(a:int,b,c:str,d) it would choose bar.
 
         Arguments:
-        *args: all types that the function should accept
-        """
-        if self._root != _empty_func and not _check_func_types(self._root, types):
-            raise FunctionNotFound()
-        current_heap = self
-        new_root = True
-        while new_root:
-            new_root = False
-            for child in current_heap._childs:
-                if _check_func_types(child._root, types):
-                    current_heap = child
-                    new_root = True
-        if current_heap._root == _empty_func:
-            raise FunctionNotFound()
-        return current_heap._root
-
-
-class OverloadedFunction(collections.Callable):
+        types: the types of args
+        args: the arguments, only needed when a function matching the types
+              annotates predicates or interfaces with attributes. TypeError
+              is raised if they are missing then.
+        """
+        candidates = _candidates(self, types, _unpack_heap)
+        if args is not None:
+            return _select(candidates, args)
+        if not candidates:
+            raise FunctionNotFound('No function found for signature: {0}'.format(types))
+        if candidates[0][1]:
+            raise TypeError('the function for {0} depends on the values of the '
+                            'arguments, args are needed'.format(types))
+        return candidates[0][0]
+
+
+def _mark_coroutine(obj):
+    """
+    Marks obj, an object or a class whose instances are, for
+    inspect.iscoroutinefunction() and asyncio.iscoroutinefunction(). Before
+    Python 3.12 only the latter can be told, with a private marker.
+    """
+    if hasattr(inspect, 'markcoroutinefunction'):
+        inspect.markcoroutinefunction(obj)
+    elif hasattr(asyncio.coroutines, '_is_coroutine'):
+        obj._is_coroutine = asyncio.coroutines._is_coroutine
+    return obj
+
+
+class BoundOverloadedFunction(object):
+    """
+    An overloaded method bound to its receiver. The dispatch cache is keyed
+    on the types of the other arguments. Only when an overload annotates
+    self, in this set or the one of a base class, the type of the receiver
+    comes first in the key.
+    """
+    __slots__ = ('_function', '_receiver')
+
+    def __init__(self, function, receiver):
+        self._function = function
+        self._receiver = receiver
+
+    def __call__(self, *args):
+        function = self._function
+        types = tuple(type(arg) for arg in args)
+        if function._receiver_dispatch:
+            types = (type(self._receiver),) + types
+        try:
+            func = function._method_cache[types]
+        except KeyError:
+            func = function._find_method(types, self._receiver, args)
+        return func(self._receiver, *args)
+
+
+@_mark_coroutine
+class _AsyncBoundOverloadedFunction(BoundOverloadedFunction):
+    """A BoundOverloadedFunction of async def functions."""
+    __slots__ = ()
+
+
+def _more_generic(ann, annotations):
+    """
+    Yields the annotations among the given ones that are more generic than
+    ann. Superclasses with a plain type metaclass are looked up in the MRO of
+    ann instead of calling issubclass() for every annotation.
+    """
+    if ann == _empty_annotation:
+        return
+    if _empty_annotation in annotations:
+        yield _empty_annotation
+    if isinstance(ann, type):
+        for base in ann.__mro__[1:]:
+            if base in annotations:
+                yield base
+        annotations = [other for other in annotations if type(other) is not type]
+    for other in annotations:
+        if other != _empty_annotation and _ann_cmp(ann, other):
+            yield other
+
+
+class _SpecificityIndex(object):
+    """
+    Specificity relations between many functions with the same number of
+    arguments, see OverloadedFunction.register_many().
+
+    The annotations of each function are introspected once. For every
+    position, the distinct annotations are grouped and compared to each other
+    once, which gives for each function the set of functions it is more
+    specific than in at least one position. Only those pairs need to be looked
+    at to find the ambiguous and the more generic functions.
+    """
+    def __init__(self, funcs):
+        self.annotations = {func: tuple(_get_annotations(func)) for func in funcs}
+        arg_len = len(next(iter(self.annotations.values()), ()))
+        # [{annotation: set of more generic annotations}, ...] by position
+        self._generic = []
+        # {func: set of functions with a more generic annotation somewhere}
+        self._beaten = {func: set() for func in funcs}
+        for position in range(arg_len):
+            by_annotation = {}
+            for func in funcs:
+                by_annotation.setdefault(self.annotations[func][position],
+                                         []).append(func)
+            generic = {ann: set(_more_generic(ann, by_annotation))
+                       for ann in by_annotation}
+            self._generic.append(generic)
+            for ann, ann_funcs in by_annotation.items():
+                for other in generic[ann]:
+                    for func in ann_funcs:
+                        self._beaten[func].update(by_annotation[other])
+
+    def ambiguous(self, func1, func2):
+        """_func_eq() for two different functions."""
+        if self.annotations[func1] == self.annotations[func2]:
+            return True
+        return func2 in self._beaten[func1] and func1 in self._beaten[func2]
+
+    def more_generic(self, func):
+        """The functions that func is more specific than, see _func_cmp()."""
+        annotations = self.annotations[func]
+        return {other for other in self._beaten[func]
+                if all(ann == other_ann or other_ann in generic[ann]
+                       for ann, other_ann, generic in zip(
+                           annotations, self.annotations[other], self._generic))}
+
+
+def _build_heap(funcs):
+    """
+    Builds a FunctionHeap with functions of the same number of arguments.
+
+    Every pair of functions is checked for ambiguity first. Then the functions
+    are sorted so that each comes after all the more generic ones and are
+    inserted in that order, which only ever descends the heap.
+    """
+    index = _SpecificityIndex(funcs)
+    seen = {}
+    for func in funcs:
+        other = seen.setdefault(index.annotations[func], func)
+        if other is not func:
+            raise AmbiguousFunction(func)
+        for other in index._beaten[func]:
+            if index.ambiguous(func, other):
+                raise AmbiguousFunction(func)
+
+    # A function is more specific than all the functions that are more generic
+    # than any function it is more specific than, so sorting by the number of
+    # more generic functions is a topological order.
+    generic = {func: index.more_generic(func) for func in funcs}
+    root = FunctionHeap(_empty_func)
+    for func in sorted(funcs, key=lambda func: len(generic[func])):
+        heap = root
+        while True:
+            for child in heap._childs:
+                if child._root in generic[func]:
+                    heap = child
+                    break
+            else:
+                heap._childs.append(FunctionHeap(func))
+                break
+    if len(root._childs) == 1:
+        return root._childs[0]
+    return root
+
+
+def _heap_functions(heap):
+    """All the functions in a FunctionHeap."""
+    if heap._root != _empty_func:
+        yield heap._root
+    for child in heap._childs:
+        yield from _heap_functions(child)
+
+
+def _walk(heap, unpack, depth=0):
+    """Yields (depth, func) for the functions of a heap, depth first. The
+    depth of the root is 0, an empty root is skipped and doesn't count."""
+    annotations, func, childs = unpack(heap)
+    if func != _empty_func:
+        yield depth, func
+        depth += 1
+    for child in sorted(childs, key=lambda child: _signature(unpack(child)[1])):
+        yield from _walk(child, unpack, depth)
+
+
+def _signature(func):
+    return '{0}{1}'.format(func.__name__, inspect.signature(func))
+
+
+def _not_found(*args):
+    raise FunctionNotFound()
+
+
+class _SingleDispatch(object):
+    """
+    Finds the functions of a heap whose annotations only differ in one
+    position with functools.singledispatch(), which caches the function for
+    each class of that argument, holding the classes weakly and following the
+    ABCs they are registered in. The heap is still used to add functions, so
+    ambiguous functions are detected as before.
+
+    fixed are the _dispatch_annotations() of the other positions, shared by
+    all the functions, and classes the classes registered for the varying
+    position.
+    """
+    __slots__ = ('position', 'fixed', 'classes', 'dispatch')
+
+    def __init__(self, position, fixed, classes, dispatch):
+        self.position = position
+        self.fixed = fixed
+        self.classes = classes
+        self.dispatch = dispatch
+
+    def candidates(self, types):
+        """_candidates() for the given types, or None if the heap has to
+        choose: when singledispatch finds them ambiguous, or when the class
+        inherits from registered classes unrelated to each other, which
+        singledispatch orders by the MRO and the heap by registration."""
+        if _match_types(self.fixed, types) is None:
+            return []
+        cls = types[self.position]
+        bases = [base for base in self.classes if issubclass(cls, base)]
+        for i, base in enumerate(bases):
+            for other in bases[i + 1:]:
+                if not issubclass(base, other) and not issubclass(other, base):
+                    return None
+        try:
+            func = self.dispatch(cls)
+        except RuntimeError: # Ambiguous dispatch between ABCs.
+            return None
+        if func is _not_found:
+            return []
+        return [(func, ())]
+
+
+def _single_dispatch(funcs):
+    """
+    Returns a _SingleDispatch for functions with the same number of
+    arguments, or None if their annotations vary in more than one position or
+    are not plain classes or ABCs.
+    """
+    if len(funcs) < 2:
+        return None
+    annotations = [tuple(_get_annotations(func)) for func in funcs]
+    for anns in annotations:
+        for ann in anns:
+            if ann != _empty_annotation and type(ann) not in (type, abc.ABCMeta):
+                return None
+    varying = [i for i, anns in enumerate(zip(*annotations)) if len(set(anns)) > 1]
+    if len(varying) != 1:
+        return None
+    position = varying[0]
+    registry = functools.singledispatch(_not_found)
+    registered = set()
+    for func, anns in zip(funcs, annotations):
+        cls = anns[position]
+        if cls == _empty_annotation:
+            cls = object
+        if cls in registered:
+            return None
+        registered.add(cls)
+        registry.register(cls, func)
+    fixed = tuple(ann for ann in _dispatch_annotations(funcs[0])
+                  if ann[0] != position)
+    return _SingleDispatch(position, fixed, tuple(registered),
+                           registry.dispatch)
+
+
+def _freeze_heap(heap):
+    """
+    Converts a FunctionHeap to nested tuples (annotations, func, childs),
+    with the _dispatch_annotations() of func already computed.
+    """
+    return (_unpack_heap(heap)[0], heap._root,
+            tuple(_freeze_heap(child) for child in heap._childs))
+
+
+class OverloadStats(collections.namedtuple(
+        'OverloadStats', 'name functions depth type_tuples calls hits misses '
+                         'failures dispatch_time lookup_time implementations')):
+    """
+    Statistics of an overloaded function, see OverloadedFunction.stats().
+
+    name: 'module.qualname' of the overloaded function.
+    functions: number of functions in the overload set.
+    depth: number of levels of the deepest heap.
+    type_tuples: number of distinct tuples of argument types in the caches.
+    calls, hits, misses, failures: calls, dispatch cache hits and misses, and
+        calls with no matching function.
+    dispatch_time: seconds spent choosing functions, lookup_time the part of
+        it spent on cache misses.
+    implementations: ((function, calls), ...) with the most called first.
+
+    The counters from calls on are only collected for the overloaded
+    functions defined while annotation.instrument is enabled. They are zero
+    for the others, which run without any bookkeeping.
+    """
+    __slots__ = ()
+
+    @property
+    def hit_ratio(self):
+        """Fraction of the calls served by the dispatch caches."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+# Every OverloadedFunction, registered or not, to clear their caches when
+# the subclass checks they were found with change.
+_all_functions = weakref.WeakSet()
+
+
+def _clear_all_caches():
+    for function in list(_all_functions):
+        function._clear_caches()
+
+_invalidation_hooks.append(_clear_all_caches)
+
+
+class OverloadedFunction(collections.abc.Callable):
+    """
+    A set of functions with the same name, called according to the types of
+    the arguments. See overloaded().
+
+    Overloaded functions defined in a class are methods: they bind their
+    receiver like regular functions. A subclass can extend the overloads of
+    a base class by declaring more with the same name. Its own overloads are
+    tried first, then the ones of the base class.
+
+    Arguments annotated with predicates, or with interfaces declaring
+    attributes, can't be matched by their type alone. The candidate functions
+    for the types of the arguments are cached, and only their value checks
+    run on every call. A predicate is tried before the overloads it can't be
+    compared to, for example foo(a: Even) before foo(a: int).
+
+    An overload set contains either async def functions or regular ones.
+    Calling an async set returns the coroutine of the chosen function, and
+    asyncio.iscoroutinefunction() is True for it.
+    """
+    _bound = BoundOverloadedFunction
+    _async_bound = _AsyncBoundOverloadedFunction
+
     def __init__(self, module, name):
         self._module = module
         self._name = name
         self._functions = {} # {arg_len: FunctionHeap, ...}
         self._function_cache = {} # {(type1, type2, ...): func, ...}
+        # Like _function_cache, for bound calls. The receiver is left out of
+        # the keys unless _receiver_dispatch.
+        self._method_cache = {}
+        # {(type1, type2, ...): ((func, value checks), ...), ...} when the
+        # types are not enough to choose the function.
+        self._candidate_cache = {}
+        self._method_candidate_cache = {}
+        # The keys of both kinds of caches since the set was created, see
+        # observed_types().
+        self._observed = set()
+        self._observed_methods = set()
+        self._parent = None # Overloads of the same method in a base class.
+        self._children = weakref.WeakSet()
+        _all_functions.add(self)
+        self._frozen = None # {arg_len: frozen heap, ...} once frozen.
+        self._coroutine = None # True for async def functions, None if empty.
+        self._dispatchers = {} # {arg_len: _SingleDispatch or None, ...}
+        self._annotates_receiver = False # An overload annotates self.
+        # Same for this set or the one of a base class, see _clear_caches().
+        self._receiver_dispatch = False
     
     def add_function(self, func):
+        if self._frozen is not None:
+            raise TypeError('overloaded function {0} is frozen'.format(self._name))
+        coroutine = self._check_coroutine([func])
         parameters = inspect.signature(func).parameters
         for param in parameters.values():
             if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
@@ -213,21 +734,378 @@ class OverloadedFunction(collections.Callable):
             self._functions[len(parameters)] = FunctionHeap(func)
         else:
             self._functions[len(parameters)].push(func)
+        self._dispatchers.pop(len(parameters), None)
+        self._set_coroutine(coroutine)
+        self._annotates_receiver = self._annotates_receiver or _annotates_receiver(func)
+        self._clear_caches()
+
+    def register_many(self, funcs):
+        """
+        Adds several functions at once.
+
+        It's faster than calling add_function() for each of them: their
+        signatures are introspected once, the heaps are built in a single
+        pass and the caches are cleared once. Every pair of functions, among
+        the new ones and the existing ones, is checked for ambiguity, not
+        only the ones met while walking a heap. An ambiguous pair raises
+        AmbiguousFunction and leaves the overload set unchanged.
+        """
+        if self._frozen is not None:
+            raise TypeError('overloaded function {0} is frozen'.format(self._name))
+        funcs = list(funcs)
+        coroutine = self._check_coroutine(funcs)
+        by_len = {}
+        for func in funcs:
+            parameters = inspect.signature(func).parameters
+            for param in parameters.values():
+                if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                    raise TypeError('functions with *args and **kwargs are not supported')
+            by_len.setdefault(len(parameters), []).append(func)
+        heaps = {}
+        for arg_len, new_funcs in by_len.items():
+            existing = self._functions.get(arg_len)
+            if existing is not None:
+                new_funcs = list(_heap_functions(existing)) + new_funcs
+            heaps[arg_len] = _build_heap(new_funcs)
+        self._functions.update(heaps)
+        for arg_len in heaps:
+            self._dispatchers.pop(arg_len, None)
+        self._set_coroutine(coroutine)
+        self._annotates_receiver = (self._annotates_receiver or
+                                    any(_annotates_receiver(func) for func in funcs))
+        self._clear_caches()
+
+    def _check_coroutine(self, funcs):
+        """
+        Returns True if the functions and the ones already in this set are
+        async def functions, False if they are regular ones. Raises TypeError
+        if they are mixed.
+        """
+        coroutine = self._coroutine
+        for func in funcs:
+            is_coroutine = inspect.iscoroutinefunction(func)
+            if coroutine is None:
+                coroutine = is_coroutine
+            elif is_coroutine != coroutine:
+                raise TypeError('overloaded function {0} mixes async def and '
+                                'regular functions'.format(self._name))
+        return coroutine
+
+    def _set_coroutine(self, coroutine):
+        if coroutine and not self._coroutine:
+            _mark_coroutine(self)
+        self._coroutine = coroutine
+
+    def freeze(self):
+        """
+        Makes the overload set immutable. Its heaps are replaced by a compact
+        read-only structure with the annotations of every function already
+        introspected, so finding a function that is not cached is faster.
+        Adding functions afterwards raises TypeError.
+        """
+        if self._frozen is None:
+            for arg_len in self._functions:
+                self._dispatcher(arg_len)
+            self._frozen = {arg_len: _freeze_heap(heap)
+                            for arg_len, heap in self._functions.items()}
+            self._functions = {}
+        return self
+
+    def _clear_caches(self):
+        receiver_dispatch = self._annotates_receiver or (
+            self._parent is not None and self._parent._receiver_dispatch)
+        if receiver_dispatch != self._receiver_dispatch:
+            # The method types observed so far are keyed the other way.
+            self._observed_methods = set()
+        self._receiver_dispatch = receiver_dispatch
         self._function_cache = {}
+        self._method_cache = {}
+        self._candidate_cache = {}
+        self._method_candidate_cache = {}
+        for child in self._children:
+            child._clear_caches()
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if self._coroutine:
+            return self._async_bound(self, instance)
+        return self._bound(self, instance)
+
+    def __set_name__(self, owner, name):
+        for base in owner.__mro__[1:]:
+            parent = vars(base).get(name)
+            if isinstance(parent, OverloadedFunction):
+                if (self._coroutine is not None and parent._coroutine is not None
+                        and self._coroutine != parent._coroutine):
+                    raise TypeError('overloaded method {0} mixes async def and '
+                                    'regular functions with its base '
+                                    'class'.format(self._name))
+                self._parent = parent
+                parent._children.add(self)
+                self._clear_caches()
+                return
     
     def __call__(self, *args):
         types = tuple(type(arg) for arg in args)
         if types in self._function_cache:
             return self._function_cache[types](*args)
-        if len(args) not in self._functions:
+        return self._find(types, args)(*args)
+
+    def _dispatcher(self, arg_len):
+        """The _SingleDispatch for the functions with arg_len arguments, if
+        their annotations only vary in one position. Built when first needed."""
+        try:
+            return self._dispatchers[arg_len]
+        except KeyError:
+            heap = self._functions.get(arg_len)
+            dispatcher = None
+            if heap is not None:
+                dispatcher = _single_dispatch(list(_heap_functions(heap)))
+            self._dispatchers[arg_len] = dispatcher
+            return dispatcher
+
+    def _lookup(self, types):
+        """Finds the _candidates() for the given types, in this overload set
+        and then in the one of the base class."""
+        candidates = None
+        dispatcher = self._dispatcher(len(types))
+        if dispatcher is not None:
+            candidates = dispatcher.candidates(types)
+        if candidates is None:
+            if self._frozen is not None:
+                heap = self._frozen.get(len(types))
+                unpack = _unpack_frozen
+            else:
+                heap = self._functions.get(len(types))
+                unpack = _unpack_heap
+            candidates = [] if heap is None else _candidates(heap, types, unpack)
+        if self._parent is not None and (not candidates or candidates[-1][1]):
+            candidates.extend(self._parent._lookup(types))
+        return candidates
+
+    def _cache(self, key, types, function_cache, candidate_cache, observed):
+        """
+        Finds the candidates for the given types and caches them under key: a
+        function chosen by the types alone in function_cache, otherwise the
+        candidates in candidate_cache. The key is added to observed, which
+        unlike the caches is never cleared.
+        """
+        candidates = self._lookup(types)
+        if not candidates:
             raise FunctionNotFound('No function found for signature: {0}'.format(types))
+        observed.add(key)
+        if not candidates[0][1]:
+            function_cache[key] = candidates[0][0]
+            return candidates[:1]
+        candidates = candidate_cache[key] = tuple(candidates)
+        return candidates
+
+    def _resolve(self, key, types, args, function_cache, candidate_cache,
+                 observed):
+        """Finds the function for the given arguments, see _cache(). Only the
+        value checks run when the candidates are cached."""
+        try:
+            candidates = candidate_cache[key]
+        except KeyError:
+            candidates = self._cache(key, types, function_cache, candidate_cache,
+                                     observed)
+        return _select(candidates, args)
+
+    def _find(self, types, args):
+        """Finds the function for the given arguments and caches it."""
+        return self._resolve(types, types, args, self._function_cache,
+                             self._candidate_cache, self._observed)
+
+    def _find_method(self, key, receiver, args):
+        """Finds the method for the given receiver and arguments and caches
+        it under key, see BoundOverloadedFunction."""
+        types = (type(receiver),) + tuple(type(arg) for arg in args)
+        return self._resolve(key, types, (receiver,) + args,
+                             self._method_cache, self._method_candidate_cache,
+                             self._observed_methods)
+
+    def observed_types(self):
+        """
+        Returns the argument types this overload set has been called with, as
+        (function types, method types). Method types start with the type of
+        the receiver only if an overload annotates self, see
+        BoundOverloadedFunction. The types are recorded on cache misses, so
+        calls served by the caches cost nothing more. Clearing the caches,
+        for example when a class is registered in an ABC, doesn't forget them.
+        """
+        return (sorted(self._observed, key=repr),
+                sorted(self._observed_methods, key=repr))
+
+    def warm_up(self, functions=(), methods=()):
+        """
+        Finds and caches the functions for the given tuples of argument
+        types, as returned by observed_types(), so the first calls with them
+        are as fast as the next ones. Types that don't match any function are
+        skipped. Returns the number of tuples cached.
+        """
+        cached = 0
+        for types in functions:
+            try:
+                self._cache(tuple(types), tuple(types), self._function_cache,
+                            self._candidate_cache, self._observed)
+                cached += 1
+            except FunctionNotFound:
+                pass
+        for types in methods:
+            key = tuple(types)
+            if not self._receiver_dispatch:
+                types = (object,) + key
+            try:
+                self._cache(key, tuple(types), self._method_cache,
+                            self._method_candidate_cache, self._observed_methods)
+                cached += 1
+            except FunctionNotFound:
+                pass
+        return cached
+
+    def _heaps(self):
+        """Yields (arg_len, heap, unpack) for every heap, sorted by arg_len."""
+        if self._frozen is not None:
+            for arg_len, heap in sorted(self._frozen.items()):
+                yield arg_len, heap, _unpack_frozen
         else:
-            func = self._functions[len(args)].find(types)
-            self._function_cache[types] = func
-            return func(*args)
+            for arg_len, heap in sorted(self._functions.items()):
+                yield arg_len, heap, _unpack_heap
 
+    def stats(self):
+        """Returns the OverloadStats of this overloaded function."""
+        functions = 0
+        depth = 0
+        for arg_len, heap, unpack in self._heaps():
+            for level, func in _walk(heap, unpack):
+                functions += 1
+                depth = max(depth, level + 1)
+        type_tuples = len(set(self._function_cache) | set(self._candidate_cache) |
+                          set(self._method_cache) | set(self._method_candidate_cache))
+        name = '{0}.{1}'.format(self._module, self._name)
+        return OverloadStats(name, functions, depth, type_tuples, 0, 0, 0, 0,
+                             0.0, 0.0, ())
 
-_overloaded_functions = {} # {'module': {'function_name': OverloadedFunction, ...}, ...}
+    def dump_heap(self):
+        """
+        Renders the heaps of this overloaded function as an indented tree:
+        every function is followed by the more specific ones. Heaps using
+        functools.singledispatch() for cache misses are flagged.
+        """
+        lines = []
+        for arg_len, heap, unpack in self._heaps():
+            header = '{0} with {1} argument{2}'.format(
+                self._name, arg_len, '' if arg_len == 1 else 's')
+            dispatcher = self._dispatcher(arg_len)
+            if dispatcher is not None:
+                header += ', singledispatch on argument {0}'.format(
+                    dispatcher.position)
+            lines.append(header)
+            for level, func in _walk(heap, unpack):
+                lines.append('  ' * (level + 1) + _signature(func))
+        return '\n'.join(lines)
+
+
+class _InstrumentedBoundOverloadedFunction(BoundOverloadedFunction):
+    __slots__ = ()
+
+    def __call__(self, *args):
+        function = self._function
+        counters = function._counters
+        start = instrument.clock()
+        counters.calls += 1
+        types = tuple(type(arg) for arg in args)
+        if function._receiver_dispatch:
+            types = (type(self._receiver),) + types
+        try:
+            if types in function._method_cache:
+                counters.hits += 1
+                func = function._method_cache[types]
+            elif types in function._method_candidate_cache:
+                counters.hits += 1
+                func = _select(function._method_candidate_cache[types],
+                               (self._receiver,) + args)
+            else:
+                counters.misses += 1
+                lookup_start = instrument.clock()
+                try:
+                    func = function._find_method(types, self._receiver, args)
+                finally:
+                    function._lookup_time += instrument.clock() - lookup_start
+        except FunctionNotFound:
+            counters.failures += 1
+            raise
+        finally:
+            counters.check_time += instrument.clock() - start
+        implementation_calls = function._implementation_calls
+        implementation_calls[func] = implementation_calls.get(func, 0) + 1
+        return func(self._receiver, *args)
+
+
+@_mark_coroutine
+class _InstrumentedAsyncBoundOverloadedFunction(_InstrumentedBoundOverloadedFunction):
+    """An _InstrumentedBoundOverloadedFunction of async def functions."""
+    __slots__ = ()
+
+
+class _InstrumentedOverloadedFunction(OverloadedFunction):
+    """
+    OverloadedFunction created while instrumentation is enabled. It counts
+    dispatch cache hits and misses, the time spent dispatching and the calls
+    of every function.
+    """
+    _bound = _InstrumentedBoundOverloadedFunction
+    _async_bound = _InstrumentedAsyncBoundOverloadedFunction
+
+    def __init__(self, module, name):
+        OverloadedFunction.__init__(self, module, name)
+        self._counters = instrument.counters('{0}.{1}'.format(module, name))
+        self._lookup_time = 0.0 # Seconds spent on cache misses.
+        self._implementation_calls = {} # {func: calls, ...}
+
+    def __call__(self, *args):
+        counters = self._counters
+        start = instrument.clock()
+        counters.calls += 1
+        types = tuple(type(arg) for arg in args)
+        try:
+            if types in self._function_cache:
+                counters.hits += 1
+                func = self._function_cache[types]
+            elif types in self._candidate_cache:
+                counters.hits += 1
+                func = _select(self._candidate_cache[types], args)
+            else:
+                counters.misses += 1
+                lookup_start = instrument.clock()
+                try:
+                    func = self._find(types, args)
+                finally:
+                    self._lookup_time += instrument.clock() - lookup_start
+        except FunctionNotFound:
+            counters.failures += 1
+            raise
+        finally:
+            counters.check_time += instrument.clock() - start
+        implementation_calls = self._implementation_calls
+        implementation_calls[func] = implementation_calls.get(func, 0) + 1
+        return func(*args)
+
+    def stats(self):
+        counters = self._counters
+        implementations = sorted(self._implementation_calls.items(),
+                                 key=lambda item: item[1], reverse=True)
+        return OverloadedFunction.stats(self)._replace(
+            calls=counters.calls, hits=counters.hits, misses=counters.misses,
+            failures=counters.failures, dispatch_time=counters.check_time,
+            lookup_time=self._lookup_time,
+            implementations=tuple(implementations))
+
+
+# The registry only holds overloaded functions weakly, they are released with
+# the module, class or closure where they are defined.
+_overloaded_functions = {} # {'module': WeakValueDictionary({'function_name': OverloadedFunction, ...}), ...}
 
 
 def overloaded(func):
@@ -238,8 +1116,143 @@ def overloaded(func):
     module = func.__module__
     qualname = func.__qualname__
     if module not in _overloaded_functions:
-        _overloaded_functions[module] = {}
-    if qualname not in _overloaded_functions[module]:
-        _overloaded_functions[module][qualname] = OverloadedFunction(module, qualname)
-    _overloaded_functions[module][qualname].add_function(func)
-    return _overloaded_functions[module][qualname]
+        _overloaded_functions[module] = weakref.WeakValueDictionary()
+    function = _overloaded_functions[module].get(qualname)
+    if function is None:
+        if instrument.is_enabled():
+            function = _InstrumentedOverloadedFunction(module, qualname)
+        else:
+            function = OverloadedFunction(module, qualname)
+        _overloaded_functions[module][qualname] = function
+    function.add_function(func)
+    return function
+
+
+def unregister(function):
+    """
+    Removes an OverloadedFunction from the registry. Functions declared
+    afterwards with the same name start a new overload set.
+    """
+    functions = _overloaded_functions.get(function._module)
+    if functions is not None and functions.get(function._name) is function:
+        del functions[function._name]
+        if not functions:
+            del _overloaded_functions[function._module]
+
+
+def _type_name(cls):
+    return '{0}:{1}'.format(cls.__module__, cls.__qualname__)
+
+
+# Builtin types that can't be imported by their name.
+_unnamed_types = {_type_name(cls): cls
+                  for cls in (type(None), type(Ellipsis), type(NotImplemented))}
+
+
+def _import_type(name):
+    """Imports a class given its 'module:qualname'."""
+    if name in _unnamed_types:
+        return _unnamed_types[name]
+    module_name, _, qualname = name.partition(':')
+    obj = importlib.import_module(module_name)
+    for attribute in qualname.split('.'):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+def dump_profile(fp):
+    """
+    Writes the argument types observed by every overloaded function, see
+    OverloadedFunction.observed_types(), as JSON to a file object. Each type
+    is written once and referenced by its index. Types defined in functions
+    can't be imported again and are left out.
+    """
+    types = [] # ['module:qualname', ...]
+    indexes = {} # {class: index in types, ...}
+
+    def encode(type_tuples):
+        result = []
+        for type_tuple in type_tuples:
+            if any('<locals>' in cls.__qualname__ for cls in type_tuple):
+                continue
+            for cls in type_tuple:
+                if cls not in indexes:
+                    indexes[cls] = len(types)
+                    types.append(_type_name(cls))
+            result.append([indexes[cls] for cls in type_tuple])
+        return result
+
+    profile = {}
+    for module, functions in sorted(_overloaded_functions.items()):
+        for name, function in sorted(functions.items()):
+            function_types, method_types = function.observed_types()
+            function_types = encode(function_types)
+            method_types = encode(method_types)
+            if function_types or method_types:
+                profile['{0}:{1}'.format(module, name)] = [function_types,
+                                                            method_types]
+    json.dump({'types': types, 'functions': profile}, fp,
+              separators=(',', ':'))
+
+
+def warm_up(fp):
+    """
+    Reads a profile written by dump_profile() and warms up the caches of the
+    overloaded functions in it, see OverloadedFunction.warm_up(). Call it
+    once the modules defining them are imported, for example after freezing
+    them. Functions not defined and types that can't be imported are
+    skipped. Returns the number of tuples of types cached.
+    """
+    profile = json.load(fp)
+    types = []
+    for name in profile['types']:
+        try:
+            types.append(_import_type(name))
+        except (ImportError, AttributeError):
+            types.append(None)
+
+    def decode(type_tuples):
+        result = []
+        for indexes in type_tuples:
+            type_tuple = tuple(types[i] for i in indexes)
+            if None not in type_tuple:
+                result.append(type_tuple)
+        return result
+
+    cached = 0
+    for name, (function_types, method_types) in profile['functions'].items():
+        module, _, qualname = name.partition(':')
+        function = _overloaded_functions.get(module, {}).get(qualname)
+        if function is not None:
+            cached += function.warm_up(decode(function_types),
+                                       decode(method_types))
+    return cached
+
+
+def stats():
+    """Returns the OverloadStats of every registered overloaded function."""
+    return [function.stats()
+            for module, functions in sorted(_overloaded_functions.items())
+            for name, function in sorted(functions.items())]
+
+
+def report(sort='misses', limit=None):
+    """
+    Renders the statistics of every registered overloaded function as a table
+    sorted by the given OverloadStats field, to find the overload sets with
+    deep heaps or whose caches keep missing.
+    """
+    rows = sorted(stats(), key=lambda row: getattr(row, sort), reverse=True)
+    if limit is not None:
+        rows = rows[:limit]
+    lines = ['{0:>5} {1:>5} {2:>7} {3:>10} {4:>7} {5:>12}  {6}'.format(
+        'funcs', 'depth', 'types', 'calls', 'hits', 'lookup (ms)', 'name')]
+    for row in rows:
+        hottest = ''
+        if row.implementations:
+            func, calls = row.implementations[0]
+            hottest = ' (hottest: {0}, {1} calls)'.format(_signature(func), calls)
+        lines.append('{0:>5} {1:>5} {2:>7} {3:>10} {4:>7.1%} {5:>12.3f}  {6}{7}'.format(
+            row.functions, row.depth, row.type_tuples, row.calls, row.hit_ratio,
+            row.lookup_time * 1e3, row.name, hottest))
+    return '\n'.join(lines)
@@ -0,0 +1,244 @@
+# Copyright Manuel Cerón.  All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied.  See the License for the specific language
+# governing permissions and limitations under the License.
+
+"""Bulk conformance scanner for structural interfaces.
+
+scan() imports a set of modules or packages and builds a ConformanceIndex
+telling which classes satisfy which Interface subclasses. Interfaces are
+grouped by the names of their required methods, so a class is only compared
+against the interfaces whose method names it defines. The scan can be split
+across several processes and the resulting index can be saved as JSON.
+
+It can also be used from the command line:
+
+    python -m annotation.scan -i plugins.api:Plugin -o index.json plugins
+"""
+
+__all__ = ['ConformanceIndex', 'scan']
+
+import argparse
+import collections
+import concurrent.futures
+import importlib
+import json
+import pkgutil
+import sys
+
+from annotation.typed import Interface, InterfaceMeta
+
+
+def _qualified_name(obj):
+    return '{0}:{1}'.format(obj.__module__, obj.__qualname__)
+
+
+def _import_object(name):
+    """Imports an object given its 'module:qualname'."""
+    module_name, _, qualname = name.partition(':')
+    obj = importlib.import_module(module_name)
+    for attribute in qualname.split('.'):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+def _iter_module_names(names, recursive):
+    """Yields the names of the given modules and their submodules."""
+    for name in names:
+        module = importlib.import_module(name)
+        yield module.__name__
+        path = getattr(module, '__path__', None)
+        if recursive and path is not None:
+            for info in pkgutil.walk_packages(path, module.__name__ + '.'):
+                yield info.name
+
+
+def _module_classes(module):
+    """Classes defined at the top level of a module, excluding interfaces."""
+    for obj in vars(module).values():
+        if (isinstance(obj, type) and not isinstance(obj, InterfaceMeta) and
+                obj.__module__ == module.__name__):
+            yield obj
+
+
+def _module_interfaces(module):
+    for obj in vars(module).values():
+        if (isinstance(obj, InterfaceMeta) and obj is not Interface and
+                obj.__module__ == module.__name__):
+            yield obj
+
+
+_metaclass_names = {}
+
+
+def _member_names(cls):
+    """Names that inspect.getattr_static() can find in a class."""
+    metaclass = type(cls)
+    if metaclass not in _metaclass_names:
+        _metaclass_names[metaclass] = frozenset().union(
+            *(vars(k) for k in metaclass.__mro__))
+    return _metaclass_names[metaclass].union(*(vars(k) for k in cls.__mro__))
+
+
+def _group_interfaces(interfaces):
+    """Groups interfaces by the set of names of their required methods."""
+    groups = collections.defaultdict(list)
+    for interface in interfaces:
+        if interface.__pending__:
+            interface._resolve_pending()
+        groups[frozenset(interface.__signatures__)].append(interface)
+    # Check the groups with more requirements first, they are the ones more
+    # likely to be discarded by the set intersection.
+    return sorted(groups.items(), key=lambda group: -len(group[0]))
+
+
+def _scan_classes(classes, groups):
+    """Returns {class name: [interface name, ...]} for the given classes."""
+    index = {}
+    for cls in classes:
+        names = _member_names(cls)
+        implemented = []
+        for required, interfaces in groups:
+            if not required <= names:
+                continue
+            for interface in interfaces:
+                if issubclass(cls, interface):
+                    implemented.append(_qualified_name(interface))
+        if implemented:
+            index[_qualified_name(cls)] = sorted(implemented)
+    return index
+
+
+def _scan_module(module_name, interface_names):
+    """Scans a single module. Runs in worker processes."""
+    interfaces = [_import_object(name) for name in interface_names]
+    module = importlib.import_module(module_name)
+    return _scan_classes(_module_classes(module), _group_interfaces(interfaces))
+
+
+class ConformanceIndex(object):
+    """Maps classes to the interfaces they implement.
+
+    Classes and interfaces are identified by their 'module:qualname' so the
+    index can be serialized and used without importing them.
+    """
+
+    def __init__(self, classes=None):
+        self.classes = dict(classes or {}) # {class: [interface, ...], ...}
+
+    def interfaces_of(self, cls):
+        """Names of the interfaces implemented by a class or class name."""
+        if not isinstance(cls, str):
+            cls = _qualified_name(cls)
+        return list(self.classes.get(cls, ()))
+
+    def implementations_of(self, interface):
+        """Names of the classes implementing an interface or interface name."""
+        if not isinstance(interface, str):
+            interface = _qualified_name(interface)
+        return sorted(cls for cls, interfaces in self.classes.items()
+                      if interface in interfaces)
+
+    def to_dict(self):
+        return {'classes': self.classes}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['classes'])
+
+    def dump(self, fp):
+        """Writes the index as JSON to a file object."""
+        json.dump(self.to_dict(), fp, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, fp):
+        """Reads an index written by dump()."""
+        return cls.from_dict(json.load(fp))
+
+    def __eq__(self, other):
+        if not isinstance(other, ConformanceIndex):
+            return NotImplemented
+        return self.classes == other.classes
+
+    def __len__(self):
+        return len(self.classes)
+
+    def __repr__(self):
+        return '<ConformanceIndex of {0} classes>'.format(len(self.classes))
+
+
+def scan(modules, interfaces=None, recursive=True, processes=None):
+    """Builds a ConformanceIndex of the classes defined in some modules.
+
+    Arguments:
+    modules: names of the modules or packages to scan.
+    interfaces: Interface subclasses, or their 'module:qualname', to check.
+                By default all the interfaces defined in the scanned modules.
+    recursive: if True the submodules of packages are scanned too.
+    processes: number of worker processes. By default the scan runs in the
+               current process.
+    """
+    module_names = list(_iter_module_names(modules, recursive))
+    if interfaces is None:
+        interfaces = [interface for name in module_names
+                      for interface in _module_interfaces(
+                          importlib.import_module(name))]
+    else:
+        interfaces = [_import_object(i) if isinstance(i, str) else i
+                      for i in interfaces]
+
+    index = ConformanceIndex()
+    if not processes or processes == 1:
+        groups = _group_interfaces(interfaces)
+        for name in module_names:
+            module = importlib.import_module(name)
+            index.classes.update(_scan_classes(_module_classes(module), groups))
+        return index
+
+    interface_names = [_qualified_name(i) for i in interfaces]
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        results = executor.map(_scan_module, module_names,
+                               [interface_names] * len(module_names))
+        for result in results:
+            index.classes.update(result)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m annotation.scan',
+        description='Finds which classes implement which interfaces.')
+    parser.add_argument('modules', nargs='+',
+                        help='modules or packages to scan')
+    parser.add_argument('-i', '--interface', action='append', dest='interfaces',
+                        metavar='MODULE:NAME',
+                        help='interface to check, can be repeated '
+                             '(default: interfaces found in the modules)')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of worker processes')
+    parser.add_argument('-o', '--output', help='file to write the index to')
+    parser.add_argument('--no-recursive', dest='recursive',
+                        action='store_false',
+                        help='do not scan the submodules of packages')
+    args = parser.parse_args(argv)
+
+    index = scan(args.modules, args.interfaces, args.recursive, args.processes)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            index.dump(fp)
+    else:
+        index.dump(sys.stdout)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
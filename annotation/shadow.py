@@ -0,0 +1,265 @@
+# Copyright Manuel Cerón.  All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied.  See the License for the specific language
+# governing permissions and limitations under the License.
+
+"""Asynchronous "shadow" type checking.
+
+A function decorated with typechecked(shadow=checker) doesn't check its types
+when it's called. It only hands references to its arguments and return value
+to a ShadowChecker and returns right away. The checker validates them in the
+background and reports violations to a callback, by default a warning in the
+'annotation.shadow' logger.
+
+>>> from annotation.typed import typechecked
+>>> violations = []
+>>> checker = ShadowChecker(on_violation=lambda name, error: violations.append(error))
+>>> @typechecked(shadow=checker)
+... def double(a: int) -> int:
+...     return a * 2
+...
+>>> double('a')
+'aa'
+>>> checker.wait()
+>>> violations
+['Incorrect type for "a"', 'Incorrect return type']
+
+Arguments are not copied, an object modified after the call is validated with
+its new value.
+"""
+
+__all__ = ['ShadowChecker']
+
+import functools
+import inspect
+import logging
+import queue
+import threading
+
+from annotation.typed import _check_arguments, _check_return, _compile_signature
+
+
+_logger = logging.getLogger('annotation.shadow')
+
+
+def _validate(signature, args, kwargs, return_value, returned=True):
+    """Returns the type errors of a call, an empty list if it's correct. The
+    return value is not checked unless the call returned."""
+    errors = []
+    checks = _compile_signature(signature)
+    try:
+        _check_arguments(checks, signature, args, kwargs)
+    except TypeError as error:
+        errors.append(str(error))
+    if not returned:
+        return errors
+    try:
+        _check_return(checks, signature, return_value)
+    except TypeError as error:
+        errors.append(str(error))
+    return errors
+
+
+def _log_violation(name, error):
+    _logger.warning('%s: %s', name, error)
+
+
+class ShadowChecker(object):
+    """Validates calls of typechecked functions off the calling thread.
+
+    Arguments:
+    maxsize: maximum number of calls waiting to be validated.
+    drop: what to do when the queue is full. 'newest' discards the call being
+          submitted, 'oldest' discards the call that has waited the most.
+    on_violation: callable receiving (function name, error message).
+    workers: number of worker threads.
+    executor: optional concurrent.futures.Executor, for example a process
+              pool, used instead of worker threads. Arguments, return values
+              and annotations must then be picklable. Calls submitted while
+              maxsize calls are in flight are always dropped.
+
+    The counters submitted, validated, violations and dropped can be read at
+    any time. Once close() is called, submitting raises RuntimeError.
+    """
+
+    def __init__(self, maxsize=1024, drop='newest', on_violation=None,
+                 workers=1, executor=None):
+        if drop not in ('newest', 'oldest'):
+            raise ValueError("drop should be 'newest' or 'oldest'")
+        self.maxsize = maxsize
+        self.drop = drop
+        self.on_violation = on_violation or _log_violation
+        self.submitted = 0
+        self.validated = 0
+        self.violations = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._executor = executor
+        self._in_flight = 0
+        self._closed = False
+        self._idle = threading.Condition(self._lock)
+        self._queue = queue.Queue(maxsize)
+        self._workers = []
+        self._worker_count = workers
+
+    def wrap(self, target, signature=None):
+        """Returns a typechecked() wrapper of target checking in background.
+
+        Calls raising an exception are submitted too, only their arguments
+        are validated. The return value of coroutine functions is validated
+        once they have been awaited.
+        """
+        name = '{0}.{1}'.format(target.__module__, target.__qualname__)
+
+        if inspect.iscoroutinefunction(target):
+            @functools.wraps(target)
+            async def wrapper(*args, **kwargs):
+                nonlocal signature
+                if signature is None:
+                    signature = inspect.signature(target)
+                try:
+                    return_value = await target(*args, **kwargs)
+                except BaseException:
+                    self.submit(name, signature, args, kwargs, None,
+                                returned=False)
+                    raise
+                self.submit(name, signature, args, kwargs, return_value)
+                return return_value
+            return wrapper
+
+        @functools.wraps(target)
+        def wrapper(*args, **kwargs):
+            nonlocal signature
+            if signature is None:
+                signature = inspect.signature(target)
+            try:
+                return_value = target(*args, **kwargs)
+            except BaseException:
+                self.submit(name, signature, args, kwargs, None, returned=False)
+                raise
+            self.submit(name, signature, args, kwargs, return_value)
+            return return_value
+        return wrapper
+
+    def submit(self, name, signature, args, kwargs, return_value,
+               returned=True):
+        """Enqueues a call to be validated. Never blocks. Raises RuntimeError
+        once the checker is closed. With returned=False only the arguments
+        are validated, return_value is ignored."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('ShadowChecker is closed')
+            self.submitted += 1
+            if self._executor is None:
+                if not self._workers:
+                    self._start()
+                self.dropped += self._enqueue(
+                    (name, signature, args, kwargs, return_value, returned))
+                return
+            if self._in_flight >= self.maxsize:
+                self.dropped += 1
+                return
+            self._in_flight += 1
+        future = self._executor.submit(_validate, signature, args, kwargs,
+                                       return_value, returned)
+        future.add_done_callback(functools.partial(self._done, name))
+
+    def _enqueue(self, item):
+        """Puts item in the queue, returns the number of calls dropped. Must
+        be called holding the lock, so only the workers take items out
+        meanwhile."""
+        try:
+            self._queue.put_nowait(item)
+            return 0
+        except queue.Full:
+            if self.drop == 'newest':
+                return 1
+        dropped = 1
+        try:
+            self._queue.get_nowait()
+            self._queue.task_done()
+        except queue.Empty:
+            dropped = 0
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            dropped += 1
+        return dropped
+
+    def _start(self):
+        """Starts the worker threads. Must be called holding the lock."""
+        while len(self._workers) < self._worker_count:
+            worker = threading.Thread(target=self._work,
+                                      name='annotation-shadow', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                name, signature, args, kwargs, return_value, returned = item
+                try:
+                    errors = _validate(signature, args, kwargs, return_value,
+                                       returned)
+                except Exception as error:
+                    errors = [repr(error)]
+                self._report(name, errors)
+            finally:
+                self._queue.task_done()
+
+    def _done(self, name, future):
+        try:
+            errors = future.result()
+        except Exception as error:
+            errors = [repr(error)]
+        try:
+            self._report(name, errors)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._idle.notify_all()
+
+    def _report(self, name, errors):
+        with self._lock:
+            self.validated += 1
+            if errors:
+                self.violations += 1
+        for error in errors:
+            try:
+                self.on_violation(name, error)
+            except Exception:
+                _logger.exception('Error reporting a type violation')
+
+    def wait(self):
+        """Blocks until every submitted call has been validated."""
+        if self._executor is not None:
+            with self._idle:
+                while self._in_flight:
+                    self._idle.wait()
+        else:
+            self._queue.join()
+
+    def close(self):
+        """Validates the pending calls and stops the worker threads. Calls
+        can't be submitted afterwards."""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        if self._executor is not None:
+            self.wait()
+        for _ in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join()
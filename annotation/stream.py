@@ -0,0 +1,234 @@
+# Copyright Manuel Cerón.  All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied.  See the License for the specific language
+# governing permissions and limitations under the License.
+
+"""Streaming validation of records read from JSON Lines or CSV files.
+
+Records are parsed one at a time, checked against a type annotation and the
+valid ones are yielded. Invalid records are passed to a callback with the
+location of their violations. Only one record, or a bounded number of chunks
+when using worker processes, is held in memory at any time.
+
+>>> import io
+>>> lines = io.StringIO('{"a": [1, 2]}\\n{"b": [3, "4"]}\\n')
+>>> failures = []
+>>> validator = StreamValidator({str: [int]}, on_failure=failures.append)
+>>> list(validator.validate(read_jsonl(lines)))
+[{'a': [1, 2]}]
+>>> print(failures[0])
+record 2: record["b"][1]: expected int, got str
+>>> validator.stats.valid, validator.stats.invalid
+(1, 1)
+"""
+
+__all__ = ['Failure', 'StreamStats', 'StreamValidator', 'read_csv',
+           'read_jsonl']
+
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import itertools
+import json
+
+from annotation import instrument
+from annotation.typed import _compile, _find_violations
+
+
+@contextlib.contextmanager
+def _open(source, **kwargs):
+    """Opens source if it's a path, otherwise uses it as a file object."""
+    if isinstance(source, str):
+        with open(source, **kwargs) as fp:
+            yield fp
+    else:
+        yield source
+
+
+def read_jsonl(source):
+    """Yields the records of a JSON Lines file, or file object.
+
+    Blank lines are skipped. A malformed line raises ValueError with its line
+    number.
+    """
+    with _open(source, encoding='utf-8') as fp:
+        for number, line in enumerate(fp, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise ValueError('line {0}: {1}'.format(number, error)) from None
+
+
+def read_csv(source, converters=None, **kwargs):
+    """Yields the rows of a CSV file, or file object, as dicts.
+
+    converters maps column names to functions converting their text, for
+    example {'age': int}. Values that can't be converted are kept as text so
+    the validation reports them. Other keyword arguments are passed to
+    csv.DictReader.
+    """
+    converters = converters or {}
+    with _open(source, newline='', encoding='utf-8') as fp:
+        for row in csv.DictReader(fp, **kwargs):
+            for name, convert in converters.items():
+                try:
+                    row[name] = convert(row[name])
+                except (KeyError, TypeError, ValueError):
+                    pass
+            yield row
+
+
+class Failure(collections.namedtuple('Failure', 'number record violations')):
+    """An invalid record, its 1-based position in the stream and the
+    violations found in it."""
+    __slots__ = ()
+
+    def __str__(self):
+        return 'record {0}: {1}'.format(
+            self.number, '; '.join(str(v) for v in self.violations))
+
+
+class StreamStats(object):
+    """Counters of a StreamValidator."""
+    __slots__ = ('records', 'valid', 'invalid', 'seconds')
+
+    def __init__(self):
+        self.records = 0
+        self.valid = 0
+        self.invalid = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        """Records validated per second."""
+        return self.records / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return ('{0} records, {1} valid, {2} invalid in {3:.3f}s '
+                '({4:.0f} records/s)').format(self.records, self.valid,
+                                              self.invalid, self.seconds,
+                                              self.throughput)
+
+
+def _check_chunk(constraint, chunk, max_errors):
+    """Returns [(position in chunk, violations), ...] of the invalid records.
+    Runs in worker processes."""
+    checker = _compile(constraint)
+    failures = []
+    for position, record in enumerate(chunk):
+        if not checker.check(record):
+            violations = []
+            _find_violations(record, constraint, ('record',), violations,
+                             max_errors)
+            failures.append((position, violations))
+    return failures
+
+
+class StreamValidator(object):
+    """Validates a stream of records against a type annotation.
+
+    Arguments:
+    constraint: annotation every record must match, such as {str: int}.
+    on_failure: callable receiving a Failure for every invalid record. By
+                default invalid records are only counted.
+    max_errors: maximum number of violations located per invalid record.
+    processes: number of worker processes. By default records are checked in
+               the current process. Records and constraints must then be
+               picklable.
+    chunk_size: number of records sent to a worker process at once.
+
+    stats is updated while records are validated.
+    """
+
+    def __init__(self, constraint, on_failure=None, max_errors=1,
+                 processes=None, chunk_size=1000):
+        self.constraint = constraint
+        self.on_failure = on_failure
+        self.max_errors = max_errors
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.stats = StreamStats()
+
+    def validate(self, records):
+        """Yields the valid records, in order."""
+        if self.processes and self.processes > 1:
+            return self._validate_in_pool(records)
+        return self._validate(records)
+
+    def _fail(self, number, record, violations):
+        self.stats.invalid += 1
+        if self.on_failure is not None:
+            self.on_failure(Failure(number, record, violations))
+
+    def _validate(self, records):
+        check = _compile(self.constraint).check
+        stats = self.stats
+        clock = instrument.clock
+        start = clock()
+        try:
+            for number, record in enumerate(records, 1):
+                stats.records += 1
+                if check(record):
+                    stats.valid += 1
+                    stats.seconds += clock() - start
+                    yield record
+                    start = clock()
+                else:
+                    violations = []
+                    _find_violations(record, self.constraint, ('record',),
+                                     violations, self.max_errors)
+                    self._fail(number, record, violations)
+        finally:
+            stats.seconds += clock() - start
+
+    def _validate_in_pool(self, records):
+        stats = self.stats
+        clock = instrument.clock
+        records = iter(records)
+        chunks = iter(lambda: list(itertools.islice(records, self.chunk_size)),
+                      [])
+        number = 1
+        pending = collections.deque()
+        start = clock()
+        with concurrent.futures.ProcessPoolExecutor(self.processes) as executor:
+            try:
+                while True:
+                    # At most two chunks per worker are in memory.
+                    while len(pending) < 2 * self.processes:
+                        chunk = next(chunks, None)
+                        if chunk is None:
+                            break
+                        future = executor.submit(_check_chunk, self.constraint,
+                                                 chunk, self.max_errors)
+                        pending.append((number, chunk, future))
+                        number += len(chunk)
+                    if not pending:
+                        break
+                    first, chunk, future = pending.popleft()
+                    failures = dict(future.result())
+                    stats.records += len(chunk)
+                    for position, record in enumerate(chunk):
+                        if position in failures:
+                            self._fail(first + position, record,
+                                       failures[position])
+                            continue
+                        stats.valid += 1
+                        stats.seconds += clock() - start
+                        yield record
+                        start = clock()
+            finally:
+                stats.seconds += clock() - start
+                for _, _, future in pending:
+                    future.cancel()
@@ -25,11 +25,20 @@ This module provides a set of tools for type checking and annotations:
 """
 
 __author__ = ('Manuel Cerón <ceronman@gmail.com>')
-__all__ = ['AnyType', 'Interface', 'only', 'optional', 'options', 'predicate',
-           'typechecked', 'typedef', 'union']
+__all__ = ['AnyType', 'Interface', 'Record', 'TypeCheckError', 'check_type_async', 'only',
+           'optional', 'options', 'predicate', 'typecheck_module', 'typechecked',
+           'typedef', 'union']
 
+import abc
+import asyncio
+import copyreg
 import functools
 import inspect
+import sys
+import types
+import weakref
+
+from annotation import instrument
 
 EMPTY_ANNOTATION = inspect.Signature.empty
 
@@ -75,8 +84,21 @@ class UnionMeta(type):
 
 
 def union(*args):
-    """A convenience function for creating unions. See UnionMeta."""
-    return UnionMeta('union', (), {'__types__': set(args)})
+    """A convenience function for creating unions. See UnionMeta.
+
+    Like the other constraints created by the functions of this module,
+    except typedefs, unions are interned and can be pickled:
+
+    >>> import pickle
+    >>> union(int, str) is union(str, int)
+    True
+    >>> pickle.loads(pickle.dumps(union(int, str))) is union(int, str)
+    True
+    """
+    return _interned_constraint(
+        union, tuple(sorted(set(args), key=repr)),
+        frozenset(_typed_key(args)),
+        lambda: UnionMeta('union', (), {'__types__': set(args)}))
 
 
 class AnyTypeMeta(type):
@@ -116,7 +138,117 @@ class AnyType(metaclass=AnyTypeMeta):
 def _multi_instanceof(a, b, t):
     return isinstance(a, t) and isinstance(b, t)
 
+
+_constraints = weakref.WeakValueDictionary() # {(factory, key): constraint}
+
+
+def _interned_constraint(factory, args, key, create):
+    """Returns the constraint factory(*args), calling create() only if an
+    equal constraint doesn't exist already.
+
+    The constraint keeps factory and args in __constraint__, which is all
+    that's needed to pickle it. key identifies equal constraints, see
+    _typed_key(). Constraints with unhashable arguments are not interned.
+    """
+    try:
+        return _constraints[factory, key]
+    except KeyError:
+        cls = _constraints[factory, key] = create()
+    except TypeError:
+        cls = create()
+    cls.__constraint__ = factory, args
+    return cls
+
+
+def _typed_key(values):
+    """Key of the values of a constraint, which tells apart equal values of
+    different types such as 1, 1.0 and True."""
+    return tuple((type(value), value) for value in values)
+
+
+def _reduce_constraint(cls):
+    """Pickles constraints as a call to the function that created them."""
+    try:
+        return cls.__dict__['__constraint__']
+    except KeyError:
+        # Defined with a class statement, pickled by reference.
+        return cls.__qualname__
+
+def _qualified_name(obj):
+    return '{0}.{1}'.format(obj.__module__, obj.__qualname__)
+
+# Memoized results of _check_signature_constraint() for hashable annotations,
+# and the typedefs memoizing their checks. They are cleared when an Interface
+# changes or when new classes are registered in an ABC.
+_signature_cache = {} # {(instance, constraint): bool, ...}
+_SIGNATURE_CACHE_SIZE = 4096
+_typedefs = weakref.WeakSet()
+_cache_token = abc.get_cache_token()
+_generation = 0 # Incremented every time the caches are invalidated.
+# Functions called without arguments after the caches are invalidated, to
+# clear the caches built from these checks elsewhere.
+_invalidation_hooks = []
+
+# Memoized issubclass() results for bases with a custom __subclasscheck__,
+# shared by the specificity and dispatch checks of overloaded functions. The
+# subclasses are weakly referenced and the results are cleared together with
+# the signature checks.
+_subclass_cache = weakref.WeakKeyDictionary() # {cls: {base: bool}, ...}
+_SUBCLASS_CACHE_SIZE = 4096
+
+
+def _invalidate_caches():
+    """Clears all the memoized signature and subclass checks."""
+    global _cache_token, _generation
+    _cache_token = abc.get_cache_token()
+    _generation += 1
+    _signature_cache.clear()
+    _subclass_cache.clear()
+    for typedef_ in _typedefs:
+        typedef_.__cache__.clear()
+    for hook in _invalidation_hooks:
+        hook()
+
+
 def _check_signature_constraint(instance, constraint):
+    if _cache_token != abc.get_cache_token():
+        _invalidate_caches()
+    key = instance, constraint
+    try:
+        return _signature_cache[key]
+    except KeyError:
+        pass
+    except TypeError: # complex annotations are not hashable.
+        return _compare_signature_constraint(instance, constraint)
+    result = _compare_signature_constraint(instance, constraint)
+    if len(_signature_cache) >= _SIGNATURE_CACHE_SIZE:
+        _signature_cache.clear()
+    _signature_cache[key] = result
+    return result
+
+def _is_subclass(cls, base):
+    """issubclass() memoized when base is a union, an Interface, an ABC or
+    any other class whose metaclass overrides the check."""
+    if type(base) is type:
+        return issubclass(cls, base)
+    if _cache_token != abc.get_cache_token():
+        _invalidate_caches()
+    try:
+        results = _subclass_cache[cls]
+    except KeyError:
+        if len(_subclass_cache) >= _SUBCLASS_CACHE_SIZE:
+            _subclass_cache.clear()
+        results = _subclass_cache[cls] = {}
+    except TypeError: # not weakly referenceable
+        return issubclass(cls, base)
+    try:
+        return results[base]
+    except KeyError:
+        result = results[base] = issubclass(cls, base)
+        return result
+
+
+def _compare_signature_constraint(instance, constraint):
     if isinstance(constraint, type):
         return issubclass(instance, constraint)
     elif _multi_instanceof(instance, constraint, list) or _multi_instanceof(instance, constraint, set):
@@ -137,8 +269,11 @@ def _check_signature_constraint(instance, constraint):
     else:
         return False
 
-def _implements_signature(function, signature):
-    """True if the given function implements the given inspect.Signature."""
+def _implements_signature(function, signature, unbound=False):
+    """True if the given function implements the given inspect.Signature.
+
+    If unbound is True the first parameter of the function (self) is ignored.
+    """
     try:
         instance_signature = inspect.signature(function)
     except TypeError:
@@ -148,6 +283,8 @@ def _implements_signature(function, signature):
 
     cls_params = signature.parameters.values()
     instance_params = instance_signature.parameters.values()
+    if unbound:
+        instance_params = list(instance_params)[1:]
     if len(cls_params) != len(instance_params):
         return False
 
@@ -182,6 +319,42 @@ def _implements_signature(function, signature):
     return True
 
 
+def _implements_method(function, signature):
+    """True if a function found in a class implements the given signature."""
+    if isinstance(function, staticmethod):
+        return _implements_signature(function.__func__, signature)
+    if isinstance(function, classmethod):
+        return _implements_signature(function.__func__, signature, True)
+    # Objects that are not descriptors are not bound to the instance.
+    unbound = hasattr(type(function), '__get__')
+    return _implements_signature(function, signature, unbound)
+
+
+def _property_implements(prop, type_):
+    """True if the return annotation of a property getter matches type_."""
+    try:
+        annotation = inspect.signature(prop.fget).return_annotation
+    except (TypeError, ValueError):
+        annotation = EMPTY_ANNOTATION
+    if annotation is EMPTY_ANNOTATION:
+        annotation = AnyType
+    return _check_signature_constraint(annotation, type_)
+
+
+def _is_data_descriptor(value):
+    value_type = type(value)
+    return hasattr(value_type, '__set__') or hasattr(value_type, '__delete__')
+
+
+# Kinds of attributes in the static lookup tables of interfaces.
+_ATTRIBUTE_RESOLVED = 0 # the result of the check is known from the class.
+_ATTRIBUTE_SLOT = 1 # read the value from a slot.
+_ATTRIBUTE_INSTANCE = 2 # read the value from the instance __dict__.
+_ATTRIBUTE_CLASS = 3 # read from the instance __dict__ or the class.
+
+_EMPTY_DICT = {}
+
+
 class InterfaceMeta(type):
     """Metaclass for an Interface.
 
@@ -222,26 +395,95 @@ class InterfaceMeta(type):
     ...
     >>> isinstance(Developer('dave', 20), Person)
     True
+
+    Interfaces can extend and combine other interfaces. The requirements of
+    all the bases are flattened when the class is created:
+
+    >>> class Sized(Interface):
+    ...     def __len__():
+    ...             pass
+    ...
+    >>> class SizedIterable(Sized, IterableWithLen):
+    ...     def __contains__(key):
+    ...             pass
+    ...
+    >>> sorted(SizedIterable.__signatures__)
+    ['__contains__', '__iter__', '__len__']
+    >>> isinstance([], SizedIterable)
+    True
+
+    Interfaces declared with static=True never trigger properties, __getattr__
+    or other descriptors of the checked objects. Methods are looked up
+    statically in the type of the object and the result is cached per type,
+    attributes are read directly from __dict__ or __slots__. Properties are
+    checked against the return annotation of their getter. Changing a class
+    after its instances have been checked is not noticed:
+
+    >>> class Keyed(Interface, static=True):
+    ...     key = str
+    ...
+    >>> class Lazy:
+    ...     @property
+    ...     def key(self) -> str:
+    ...             raise AssertionError('not loaded')
+    ...
+    >>> isinstance(Lazy(), Keyed)
+    True
+
+    Interfaces declared with lazy=True postpone the introspection of their
+    methods until they are first used in isinstance() or issubclass():
+
+    >>> class Named(Interface, lazy=True):
+    ...     def get_name() -> str:
+    ...             pass
+    ...
+    >>> Named.__signatures__
+    {}
+    >>> isinstance('string', Named)
+    False
+    >>> list(Named.__signatures__)
+    ['get_name']
     """
 
-    def __new__(mcls, name, bases, namespace):
+    def __new__(mcls, name, bases, namespace, lazy=None, static=None):
+        # Interfaces extending an instrumented interface are instrumented too.
+        if instrument.is_enabled() and mcls is InterfaceMeta and bases:
+            mcls = _InstrumentedInterfaceMeta
         cls = super().__new__(mcls, name, bases, namespace)
-        # TODO: check base classes, prevent multiple inheritance.
+        if isinstance(cls, _InstrumentedInterfaceMeta):
+            cls.__counters__ = instrument.counters(_qualified_name(cls))
+        # Interfaces extending lazy or static interfaces inherit those modes
+        # unless specified.
+        if lazy is None:
+            lazy = getattr(cls, '__lazy__', False)
+        if static is None:
+            static = getattr(cls, '__static__', False)
+        cls.__lazy__ = lazy
+        cls.__static__ = static
+        cls.__declared_methods__ = {}
+        cls.__declared_attributes__ = {}
         cls.__signatures__ = {}
-        cls.__attributes__ = {}
-        for name, value in namespace.items():
-            if name in ('__qualname__', '__module__', '__doc__'):
+        for attr_name, value in namespace.items():
+            if attr_name in ('__qualname__', '__module__', '__doc__'):
                 continue
             if inspect.isfunction(value):
-                mcls.add_method(cls, value)
+                mcls._declare_method(cls, value)
                 continue
 
-            mcls.add_attribute(cls, name, value)
+            mcls._declare_attribute(cls, attr_name, value)
+        mcls._flatten(cls)
         return cls
 
     def __instancecheck__(cls, instance):
         """Override for isinstance(instance, cls)."""
-        for name, type_ in cls.__attributes__.items():
+        if cls.__pending__:
+            cls._resolve_pending()
+        if cls.__static__:
+            return cls._static_instancecheck(instance)
+        attribute_table = cls.__attribute_table__
+        if attribute_table and isinstance(type(instance), RecordMeta):
+            attribute_table = cls._record_table(type(instance))
+        for name, type_ in attribute_table:
             try:
                 attribute = getattr(instance, name)
             except AttributeError:
@@ -250,19 +492,134 @@ class InterfaceMeta(type):
             if not isinstance(attribute, type_):
                 return False
 
-        for name, signature in cls.__signatures__.items():
+        for name, signature in cls.__signature_table__:
             function = getattr(instance, name, None)
             if not _implements_signature(function, signature):
                 return False
         return True
 
+    def _static_instancecheck(cls, instance):
+        """isinstance() implementation for static interfaces.
+
+        The tables are rebuilt when the caches are invalidated, for example
+        when a class is registered in an ABC. Members added to or removed
+        from a class after it was first checked are not noticed.
+        """
+        if _cache_token != abc.get_cache_token():
+            _invalidate_caches()
+        instance_type = type(instance)
+        try:
+            generation, attributes, methods = cls.__static_cache__[instance_type]
+        except KeyError:
+            generation = None
+        if generation != _generation:
+            attributes, methods = cls._static_table(instance_type)
+            cls.__static_cache__[instance_type] = (_generation, attributes,
+                                                   methods)
+
+        try:
+            instance_dict = object.__getattribute__(instance, '__dict__')
+        except AttributeError:
+            instance_dict = _EMPTY_DICT
+
+        for name, type_, kind, value in attributes:
+            if kind == _ATTRIBUTE_RESOLVED:
+                if not value:
+                    return False
+                continue
+            if kind == _ATTRIBUTE_SLOT:
+                try:
+                    attribute = value.__get__(instance, instance_type)
+                except AttributeError:
+                    return False
+            elif name in instance_dict:
+                attribute = instance_dict[name]
+            elif kind == _ATTRIBUTE_CLASS:
+                attribute = value
+            else:
+                return False
+
+            if not isinstance(attribute, type_):
+                return False
+
+        for name, signature, implemented in methods:
+            if name in instance_dict:
+                implemented = _implements_signature(instance_dict[name],
+                                                    signature)
+            if not implemented:
+                return False
+        return True
+
+    def _record_table(cls, record):
+        """The attribute table for the instances of a record. Attributes
+        whose type is guaranteed by a field of the record only need to be set,
+        they are checked against object.
+
+        Tables are cached in the record class. Registering classes in ABCs
+        can only add guarantees, so they are only recomputed when interfaces
+        change.
+        """
+        try:
+            generation, table = record.__interface_tables__[cls]
+            if generation == _generation:
+                return table
+        except KeyError:
+            pass
+        table = []
+        for name, type_ in cls.__attribute_table__:
+            field = record.__fields__.get(name)
+            try:
+                guaranteed = isinstance(field, type) and issubclass(field, type_)
+            except TypeError:
+                guaranteed = False
+            table.append((name, object if guaranteed else type_))
+        table = tuple(table)
+        record.__interface_tables__[cls] = _generation, table
+        return table
+
+    def _static_table(cls, instance_type):
+        """Resolves the members of the interface statically in a type."""
+        attributes = []
+        attribute_table = cls.__attribute_table__
+        if isinstance(instance_type, RecordMeta):
+            attribute_table = cls._record_table(instance_type)
+        for name, type_ in attribute_table:
+            try:
+                value = inspect.getattr_static(instance_type, name)
+            except AttributeError:
+                attributes.append((name, type_, _ATTRIBUTE_INSTANCE, None))
+                continue
+            if isinstance(value, types.MemberDescriptorType):
+                attributes.append((name, type_, _ATTRIBUTE_SLOT, value))
+            elif isinstance(value, property):
+                attributes.append((name, type_, _ATTRIBUTE_RESOLVED,
+                                   _property_implements(value, type_)))
+            elif _is_data_descriptor(value):
+                attributes.append((name, type_, _ATTRIBUTE_INSTANCE, None))
+            else:
+                attributes.append((name, type_, _ATTRIBUTE_CLASS, value))
+
+        methods = []
+        for name, signature in cls.__signature_table__:
+            try:
+                function = inspect.getattr_static(instance_type, name)
+            except AttributeError:
+                methods.append((name, signature, False))
+                continue
+            methods.append((name, signature,
+                            _implements_method(function, signature)))
+        return tuple(attributes), tuple(methods)
+
     def __subclasscheck__(cls, subclass):
         """Override for isinstance(instance, cls)."""
         if cls is subclass:
             return True
 
+        if cls.__pending__:
+            cls._resolve_pending()
+
         # TODO: support attributes
-        for name, signature in cls.__signatures__.items():
+        for name, signature in cls.__signature_table__:
             try:
                 function = inspect.getattr_static(subclass, name)
             except AttributeError:
@@ -315,20 +672,118 @@ class InterfaceMeta(type):
         return True
 
     def add_method(cls, method):
-        """Adds a new method to an Interface."""
-        # TODO check that signatures contain only types as annotations.
-        try:
-            cls.__signatures__[method.__name__] = inspect.signature(method)
-        except (TypeError, AttributeError):
-            raise TypeError('Interface methods should have a signature')
+        """Adds a new method to an Interface.
+
+        Lazy interfaces only record the method here, its signature is
+        introspected on the first isinstance() or issubclass() check.
+        """
+        cls._declare_method(method)
+        cls._update()
         return method
 
     def add_attribute(cls, name, type_=AnyType):
         """Adds a new attribute to an Interface."""
+        cls._declare_attribute(name, type_)
+        cls._update()
+
+    def _declare_method(cls, method):
+        # TODO check that signatures contain only types as annotations.
+        if cls.__lazy__:
+            if not callable(method) or not hasattr(method, '__name__'):
+                raise TypeError('Interface methods should have a signature')
+            cls.__signatures__.pop(method.__name__, None)
+        else:
+            try:
+                cls.__signatures__[method.__name__] = inspect.signature(method)
+            except (TypeError, AttributeError):
+                raise TypeError('Interface methods should have a signature')
+        cls.__declared_attributes__.pop(method.__name__, None)
+        cls.__declared_methods__[method.__name__] = method
+
+    def _declare_attribute(cls, name, type_):
         if not isinstance(type_, type):
             # TODO the error message below is incomplete.
             raise TypeError('Interface attributes should be type')
-        cls.__attributes__[name] = type_
+        cls.__signatures__.pop(name, None)
+        cls.__declared_methods__.pop(name, None)
+        cls.__declared_attributes__[name] = type_
+
+    def _update(cls):
+        """Flattens again this Interface and every Interface extending it."""
+        cls._flatten_all()
+        _invalidate_caches()
+
+    def _flatten_all(cls):
+        cls._flatten()
+        for subclass in cls.__subclasses__():
+            if isinstance(subclass, InterfaceMeta):
+                subclass._flatten_all()
+
+    def _flatten(cls):
+        """Merges the declarations of all the base interfaces.
+
+        The complete set of requirements is computed once following the MRO,
+        so checking a deep hierarchy of interfaces costs the same as checking a
+        flat one. Signatures already introspected by a base are reused.
+        """
+        signatures = {}
+        pending = {}
+        attributes = {}
+        for base in reversed(cls.__mro__):
+            if not isinstance(base, InterfaceMeta):
+                continue
+            for name, method in base.__declared_methods__.items():
+                attributes.pop(name, None)
+                signature = base.__signatures__.get(name)
+                if signature is None:
+                    signatures.pop(name, None)
+                    pending[name] = method
+                else:
+                    pending.pop(name, None)
+                    signatures[name] = signature
+            for name, type_ in base.__declared_attributes__.items():
+                signatures.pop(name, None)
+                pending.pop(name, None)
+                attributes[name] = type_
+
+        cls.__signatures__ = signatures
+        cls.__pending__ = pending
+        cls.__attributes__ = attributes
+        cls.__attribute_table__ = tuple(attributes.items())
+        cls.__signature_table__ = tuple(signatures.items())
+        cls.__static_cache__ = weakref.WeakKeyDictionary()
+        if pending and not cls.__lazy__:
+            cls._resolve_pending()
+
+    def _resolve_pending(cls):
+        """Introspects the methods deferred by a lazy Interface."""
+        signatures = dict(cls.__signatures__)
+        for name, method in cls.__pending__.items():
+            try:
+                signatures[name] = inspect.signature(method)
+            except (TypeError, ValueError):
+                raise TypeError('Interface methods should have a signature')
+        cls.__signatures__ = signatures
+        cls.__pending__ = {}
+        cls.__signature_table__ = tuple(signatures.items())
+        cls.__static_cache__ = weakref.WeakKeyDictionary()
+
+
+class _InstrumentedInterfaceMeta(InterfaceMeta):
+    """Metaclass of the interfaces created while instrumentation is enabled."""
+
+    def __instancecheck__(cls, instance):
+        counters = cls.__counters__
+        start = instrument.clock()
+        counters.calls += 1
+        counters.checks += 1
+        try:
+            result = super().__instancecheck__(instance)
+        finally:
+            counters.check_time += instrument.clock() - start
+        if not result:
+            counters.failures += 1
+        return result
 
 
 class Interface(metaclass=InterfaceMeta):
@@ -336,6 +791,121 @@ class Interface(metaclass=InterfaceMeta):
     pass
 
 
+class RecordMeta(type):
+    """Metaclass for records.
+
+    A record declares its fields as annotated class attributes without a
+    value. Fields are stored in __slots__ and their types are checked when
+    the record is created and every time a field is assigned:
+
+    >>> class Point(Record):
+    ...     x: int
+    ...     y: int
+    ...
+    >>> point = Point(1, y=2)
+    >>> point
+    Point(x=1, y=2)
+    >>> point.x = 'one'
+    Traceback (most recent call last):
+        ...
+    TypeError: Incorrect type for "x"
+
+    Fields can be any type annotation accepted by typechecked(). Records
+    extending other records add fields after the ones of their bases. Other
+    class attributes, such as constants and nested classes, are not fields.
+    Records with equal fields are equal. Like other mutable objects compared
+    by value, they are not hashable.
+
+    Since the fields of a record are always valid, interfaces don't check the
+    type of the attributes guaranteed by the field declarations:
+
+    >>> class Located(Interface):
+    ...     x = int
+    ...
+    >>> isinstance(point, Located)
+    True
+    """
+
+    def __new__(mcls, name, bases, namespace):
+        fields = {}
+        for base in reversed(bases):
+            fields.update(getattr(base, '__fields__', {}))
+        own_fields = dict(namespace.get('__annotations__', {}))
+        for attr_name in namespace:
+            if attr_name in own_fields:
+                raise TypeError('Record fields can\'t have a value: "{0}"'
+                                .format(attr_name))
+            if attr_name in fields:
+                raise TypeError('Record members can\'t hide the field "{0}"'
+                                .format(attr_name))
+        namespace = dict(namespace)
+        namespace['__slots__'] = tuple(name for name in own_fields
+                                       if name not in fields)
+        fields.update(own_fields)
+
+        cls = super().__new__(mcls, name, bases, namespace)
+        cls.__fields__ = fields
+        cls.__field_table__ = tuple(
+            (field, _compile(constraint), getattr(cls, field))
+            for field, constraint in fields.items())
+        cls.__field_map__ = {field: (checker, slot)
+                             for field, checker, slot in cls.__field_table__}
+        cls.__interface_tables__ = {} # {interface: (generation, table)}
+        return cls
+
+
+class Record(metaclass=RecordMeta):
+    """See RecordMeta."""
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        table = type(self).__field_table__
+        if len(args) > len(table):
+            raise TypeError('{0}() takes {1} positional arguments but {2} were '
+                            'given'.format(type(self).__name__, len(table),
+                                           len(args)))
+        for (name, checker, slot), value in zip(table, args):
+            if name in kwargs:
+                raise TypeError('Multiple values for field "{0}"'.format(name))
+            if not checker.check(value):
+                raise TypeError('Incorrect type for "{0}"'.format(name))
+            slot.__set__(self, value)
+        for name, checker, slot in table[len(args):]:
+            try:
+                value = kwargs.pop(name)
+            except KeyError:
+                raise TypeError('Missing field "{0}"'.format(name)) from None
+            if not checker.check(value):
+                raise TypeError('Incorrect type for "{0}"'.format(name))
+            slot.__set__(self, value)
+        if kwargs:
+            raise TypeError('Unknown field "{0}"'.format(next(iter(kwargs))))
+
+    def __setattr__(self, name, value):
+        try:
+            checker, slot = type(self).__field_map__[name]
+        except KeyError:
+            object.__setattr__(self, name, value)
+            return
+        if not checker.check(value):
+            raise TypeError('Incorrect type for "{0}"'.format(name))
+        slot.__set__(self, value)
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, name, None) == getattr(other, name, None)
+                   for name in self.__fields__)
+
+    # Records are mutable and compared by value, so they are not hashable.
+    __hash__ = None
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, ', '.join(
+            '{0}={1!r}'.format(name, getattr(self, name))
+            for name in self.__fields__ if hasattr(self, name)))
+
+
 class PredicateMeta(type):
     """Metaclass for a predicate.
 
@@ -371,7 +941,9 @@ def predicate(function, name=None):
     False
     """
     name = name or function.__name__
-    return PredicateMeta(name, (), {'__predicate__': function})
+    return _interned_constraint(
+        predicate, (function, name), _typed_key((function, name)),
+        lambda: PredicateMeta(name, (), {'__predicate__': function}))
 
 
 def optional(type_):
@@ -382,7 +954,60 @@ def optional(type_):
     >>> isinstance(None, optional(int))
     True
     """
-    return predicate(lambda x: (x is None or isinstance(x, type_)), 'optional')
+    return _interned_constraint(
+        optional, (type_,), _typed_key((type_,)),
+        lambda: PredicateMeta('optional', (), {
+            '__predicate__': lambda x: x is None or isinstance(x, type_)}))
+
+
+class TypedefMeta(PredicateMeta):
+    """Metaclass for a typedef. See typedef().
+
+    The result of checking a callable is memoized, the callable is only held
+    weakly. Callables that can't be weakly referenced are checked each time.
+    If a callable changes its signature, invalidate() must be called:
+
+    >>> @typedef
+    ... def callback(a: int) -> int:
+    ...     pass
+    ...
+    >>> def handler(a: int) -> int:
+    ...     return a
+    ...
+    >>> isinstance(handler, callback)
+    True
+    >>> handler.__annotations__['a'] = str
+    >>> callback.invalidate(handler)
+    >>> isinstance(handler, callback)
+    False
+    """
+    def __new__(mcls, name, bases, namespace):
+        cls = super().__new__(mcls, name, bases, namespace)
+        cls.__cache__ = weakref.WeakKeyDictionary()
+        _typedefs.add(cls)
+        return cls
+
+    def __instancecheck__(cls, instance):
+        if _cache_token != abc.get_cache_token():
+            _invalidate_caches()
+        try:
+            return cls.__cache__[instance]
+        except KeyError:
+            result = _implements_signature(instance, cls.__signature__)
+            cls.__cache__[instance] = result
+            return result
+        except TypeError: # not weakly referenceable or not hashable.
+            return _implements_signature(instance, cls.__signature__)
+
+    def invalidate(cls, function=None):
+        """Forgets the memoized result for function, or for all of them."""
+        if function is None:
+            cls.__cache__.clear()
+        else:
+            try:
+                del cls.__cache__[function]
+            except (KeyError, TypeError):
+                pass
 
 
 def typedef(function):
@@ -402,8 +1027,19 @@ def typedef(function):
     >>> isinstance(lambda x: x, callback)
     False
     """
-    signature = inspect.signature(function)
-    return predicate(lambda x: _implements_signature(x, signature), 'typedef')
+    return _typedef(inspect.signature(function))
+
+
+def _typedef(signature):
+    """Creates a typedef from a signature. Typedefs are pickled as a call to
+    this function, functions in their annotations are pickled by reference.
+
+    Unlike the other constraints, typedefs are not interned: each one has its
+    own cache of checked callables, invalidated on its own.
+    """
+    cls = TypedefMeta('typedef', (), {'__signature__': signature})
+    cls.__constraint__ = _typedef, (signature,)
+    return cls
 
 
 def options(*args):
@@ -415,7 +1051,9 @@ def options(*args):
     >>> isinstance('other', Days)
     False
     """
-    return predicate(lambda x: x in args, 'options')
+    return _interned_constraint(
+        options, args, _typed_key(args),
+        lambda: PredicateMeta('options', (), {'__predicate__': lambda x: x in args}))
 
 
 def only(type_):
@@ -426,58 +1064,705 @@ def only(type_):
     >>> isinstance(1, only(bool))
     False
     """
-    return predicate(lambda x: type(x) is type_, 'only')
+    return _interned_constraint(
+        only, (type_,), _typed_key((type_,)),
+        lambda: PredicateMeta('only', (), {
+            '__predicate__': lambda x: type(x) is type_}))
+
+
+copyreg.pickle(UnionMeta, _reduce_constraint)
+copyreg.pickle(PredicateMeta, _reduce_constraint)
+copyreg.pickle(TypedefMeta, _reduce_constraint)
 
 def _check_type_constraint(value, constraint):
     if isinstance(constraint, type):
         return isinstance(value, constraint)
     elif _multi_instanceof(value, constraint, list) or _multi_instanceof(value, constraint, set):
         if len(constraint):
-            ret = True
             for sub_val in value:
-                ret &= any(_check_type_constraint(sub_val, con) for con in constraint)
-            return ret
-        else:
-            return True
+                if not any(_check_type_constraint(sub_val, con) for con in constraint):
+                    return False
+        return True
     elif _multi_instanceof(value, constraint, tuple) and len(constraint) == len(value):
         return all(_check_type_constraint(sub, con) for sub, con in zip(value, constraint))
     elif _multi_instanceof(value, constraint, dict):
         if len(constraint):
-            ret = True
             for sub_key, sub_val in value.items():
-                ret &= any(
-                    (_check_type_constraint(sub_key, key_constraint) and
-                    _check_type_constraint(sub_val, value_constraint))
-                    for key_constraint, value_constraint in constraint.items())
-            return ret
-        else:
-            return True
+                if not any(
+                        (_check_type_constraint(sub_key, key_constraint) and
+                        _check_type_constraint(sub_val, value_constraint))
+                        for key_constraint, value_constraint in constraint.items()):
+                    return False
+        return True
     else:
         return False
 
 def _check_argument_types(signature, *args, **kwargs):
     """Check that the arguments of a function match the given signature."""
-    bound_arguments = signature.bind(*args, **kwargs)
-    parameters = signature.parameters
-    for name, value in bound_arguments.arguments.items():
-        annotation = parameters[name].annotation
-        if annotation is EMPTY_ANNOTATION:
-            annotation = AnyType
-        if not _check_type_constraint(value, annotation):
-            raise TypeError('Incorrect type for "{0}"'.format(name))
+    return _check_arguments(_compile_signature(signature), signature, args,
+                            kwargs)
 
 
 def _check_return_type(signature, return_value):
     """Check that the return value of a function matches the signature."""
-    annotation = signature.return_annotation
-    if annotation is EMPTY_ANNOTATION:
-        annotation = AnyType
-    if not _check_type_constraint(return_value, annotation):
+    return _check_return(_compile_signature(signature), signature,
+                         return_value)
+
+
+def _check_arguments(checks, signature, args, kwargs):
+    """Checks the arguments of a call with the _SignatureChecker of its
+    signature. Raises the TypeError of signature.bind() if they can't be
+    bound, or one naming the first incorrect argument. Returns the number of
+    arguments checked.
+    """
+    error = checks.match(args, kwargs)
+    if error is None:
+        return len(args) + len(kwargs)
+    if not error:
+        signature.bind(*args, **kwargs)
+    raise TypeError('Incorrect type for "{0}"'.format(error))
+
+
+def _check_return(checks, signature, return_value):
+    """Checks the return value of a call like _check_arguments()."""
+    returns = checks.returns
+    if returns is not None and not returns.check(return_value):
         raise TypeError('Incorrect return type')
     return return_value
 
 
-def typechecked(target):
+class _Checker(object):
+    """A compiled constraint, see _compile().
+
+    check(value) returns the same result as _check_type_constraint(value,
+    constraint). Checkers are hash-consed: structurally equal constraints,
+    such as every [str] annotation of a code base, share a single checker.
+    """
+    __slots__ = ('__weakref__',)
+
+
+class _InstanceChecker(_Checker):
+    __slots__ = ('type',)
+
+    def __init__(self, type_):
+        self.type = type_
+
+    def check(self, value):
+        return isinstance(value, self.type)
+
+
+class _NeverChecker(_Checker):
+    """Constraints that aren't types nor containers don't match anything."""
+    __slots__ = ()
+
+    def check(self, value):
+        return False
+
+
+class _CollectionChecker(_Checker):
+    """A list or set constraint. Elements must match any of alternatives."""
+    __slots__ = ('kind', 'alternatives')
+
+    def __init__(self, kind, alternatives):
+        self.kind = kind
+        self.alternatives = alternatives
+
+    def check(self, value):
+        if not isinstance(value, self.kind):
+            return False
+        alternatives = self.alternatives
+        if len(alternatives) == 1:
+            check = alternatives[0].check
+            for item in value:
+                if not check(item):
+                    return False
+        elif alternatives:
+            for item in value:
+                for alternative in alternatives:
+                    if alternative.check(item):
+                        break
+                else:
+                    return False
+        return True
+
+
+class _TupleChecker(_Checker):
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+    def check(self, value):
+        items = self.items
+        if not isinstance(value, tuple) or len(value) != len(items):
+            return False
+        for item, checker in zip(value, items):
+            if not checker.check(item):
+                return False
+        return True
+
+
+class _DictChecker(_Checker):
+    """A dict constraint. items is a tuple of (key checker, value checker)."""
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+    def check(self, value):
+        if not isinstance(value, dict):
+            return False
+        items = self.items
+        for key, item in value.items():
+            for key_checker, value_checker in items:
+                if key_checker.check(key) and value_checker.check(item):
+                    break
+            else:
+                if items:
+                    return False
+        return True
+
+
+_container_checkers = (_CollectionChecker, _TupleChecker, _DictChecker)
+
+_checkers = weakref.WeakValueDictionary() # {structural key: _Checker}
+
+
+def _hash_consed(key, create):
+    try:
+        return _checkers[key]
+    except KeyError:
+        checker = _checkers[key] = create()
+        return checker
+
+
+def _compile(constraint):
+    """Returns the shared _Checker for a type annotation.
+
+    >>> _compile({str: [int]}) is _compile({str: [int]})
+    True
+    >>> _compile({str: [int]}).check({'a': [1, 2]})
+    True
+    """
+    if isinstance(constraint, type):
+        return _hash_consed((type, constraint),
+                            lambda: _InstanceChecker(constraint))
+    if isinstance(constraint, (list, set)):
+        alternatives = tuple(_compile(c) for c in constraint)
+        kind = type(constraint)
+        key = list if kind is list or issubclass(kind, list) else set
+        return _hash_consed((key, frozenset(alternatives)),
+                            lambda: _CollectionChecker(key, alternatives))
+    if isinstance(constraint, tuple):
+        items = tuple(_compile(c) for c in constraint)
+        return _hash_consed((tuple, items), lambda: _TupleChecker(items))
+    if isinstance(constraint, dict):
+        items = tuple((_compile(k), _compile(v)) for k, v in constraint.items())
+        return _hash_consed((dict, frozenset(items)),
+                            lambda: _DictChecker(items))
+    return _hash_consed(None, _NeverChecker)
+
+
+class _SignatureChecker(_Checker):
+    """The compiled annotations of a signature, shared by every function with
+    the same parameters and annotations.
+
+    Unannotated parameters have a None checker. var_positional and
+    var_keyword are empty if the signature doesn't accept *args or **kwargs,
+    or a (checker, name) tuple.
+    """
+    __slots__ = ('positional', 'keywords', 'required', 'var_positional',
+                 'var_keyword', 'returns', 'order')
+
+    def __init__(self, positional, keywords, required, var_positional,
+                 var_keyword, returns):
+        self.positional = positional # ((name, checker), ...)
+        self.keywords = dict(keywords) # {name: (position or -1, checker)}
+        self.required = required # ((position or -1, name or None), ...)
+        self.var_positional = var_positional
+        self.var_keyword = var_keyword
+        self.returns = returns
+        # {name: index in the order of the parameters} of the keywords.
+        self.order = {name: position if position >= 0 else len(positional) + i
+                      for i, (name, (position, checker)) in enumerate(keywords)}
+
+    def bindable(self, args, kwargs):
+        """Whether the arguments of a call can be bound to the signature,
+        following the rules of Signature.bind()."""
+        count = len(args)
+        if count > len(self.positional) and not self.var_positional:
+            return False
+        if kwargs:
+            keywords = self.keywords
+            for name in kwargs:
+                try:
+                    position = keywords[name][0]
+                except KeyError:
+                    if not self.var_keyword:
+                        return False
+                    continue
+                if 0 <= position < count:
+                    return False # Multiple values for the argument.
+        for position, name in self.required:
+            if ((position < 0 or position >= count) and
+                    (name is None or name not in kwargs)):
+                return False
+        return True
+
+    def bind(self, args, kwargs):
+        """Binds the arguments of a call like Signature.bind().
+
+        Returns [(name, checker, value), ...] in the order of the parameters,
+        with a None checker for unannotated parameters, or None if the
+        arguments can't be bound. Extra positional and keyword arguments are
+        bound as a tuple and a dict.
+        """
+        if not self.bindable(args, kwargs):
+            return None
+        positional = self.positional
+        bound = [(name, checker, value)
+                 for value, (name, checker) in zip(args, positional)]
+        if len(args) > len(positional):
+            checker, name = self.var_positional
+            bound.append((name, checker, args[len(positional):]))
+        if kwargs:
+            keywords = self.keywords
+            order = self.order
+            extra = {name: value for name, value in kwargs.items()
+                     if name not in keywords}
+            bound.extend(sorted(
+                ((name, keywords[name][1], value)
+                 for name, value in kwargs.items() if name in keywords),
+                key=lambda argument: order[argument[0]]))
+            if extra:
+                checker, name = self.var_keyword
+                bound.append((name, checker, extra))
+        return bound
+
+    def match(self, args, kwargs):
+        """Checks the arguments of a call, like checking the ones returned by
+        bind() without building them.
+
+        Returns None if they are correct, the name of the first incorrect
+        argument, in the order of the parameters, or '' if the arguments
+        can't be bound to the signature.
+        """
+        if not self.bindable(args, kwargs):
+            return ''
+        positional = self.positional
+        for value, (name, checker) in zip(args, positional):
+            if checker is not None and not checker.check(value):
+                return name
+        if len(args) > len(positional):
+            checker = self.var_positional[0]
+            if checker is not None and not checker.check(args[len(positional):]):
+                return self.var_positional[1]
+        if kwargs:
+            keywords = self.keywords
+            order = self.order
+            failed = None
+            extra = None
+            for name, value in kwargs.items():
+                try:
+                    checker = keywords[name][1]
+                except KeyError:
+                    if extra is None:
+                        extra = {}
+                    extra[name] = value
+                    continue
+                if checker is not None and not checker.check(value):
+                    if failed is None or order[name] < order[failed]:
+                        failed = name
+            if failed is not None:
+                return failed
+            if extra is not None:
+                checker = self.var_keyword[0]
+                if checker is not None and not checker.check(extra):
+                    return self.var_keyword[1]
+        return None
+
+
+def _compile_signature(signature):
+    """Returns the shared _SignatureChecker of a signature."""
+    def compile_annotation(annotation):
+        if annotation is EMPTY_ANNOTATION:
+            return None
+        return _compile(annotation)
+
+    positional = []
+    keywords = []
+    required = []
+    var_positional = var_keyword = ()
+    for name, parameter in signature.parameters.items():
+        kind = parameter.kind
+        checker = compile_annotation(parameter.annotation)
+        if kind is parameter.VAR_POSITIONAL:
+            var_positional = (checker, name)
+            continue
+        if kind is parameter.VAR_KEYWORD:
+            var_keyword = (checker, name)
+            continue
+        position = -1
+        if kind is not parameter.KEYWORD_ONLY:
+            position = len(positional)
+            positional.append((name, checker))
+        if kind is not parameter.POSITIONAL_ONLY:
+            keywords.append((name, (position, checker)))
+        if parameter.default is parameter.empty:
+            # Positional only parameters can't be given by keyword.
+            required.append((position, None if kind is parameter.POSITIONAL_ONLY
+                             else name))
+    returns = compile_annotation(signature.return_annotation)
+    key = (tuple(positional), tuple(keywords), tuple(required),
+           var_positional, var_keyword, returns)
+    return _hash_consed(key, lambda: _SignatureChecker(*key))
+
+
+def _describe(constraint):
+    """A short description of a constraint for error messages and reports."""
+    if isinstance(constraint, PredicateMeta):
+        return 'predicate {0}'.format(constraint.__name__)
+    if isinstance(constraint, UnionMeta):
+        return 'union({0})'.format(
+            ', '.join(sorted(_describe(t) for t in constraint.__types__)))
+    if isinstance(constraint, InterfaceMeta):
+        return 'interface {0}'.format(constraint.__qualname__)
+    if isinstance(constraint, type):
+        return constraint.__qualname__
+    if isinstance(constraint, list):
+        return '[{0}]'.format(', '.join(_describe(c) for c in constraint))
+    if isinstance(constraint, tuple):
+        return '({0})'.format(', '.join(_describe(c) for c in constraint))
+    if isinstance(constraint, set):
+        return '{{{0}}}'.format(', '.join(sorted(_describe(c) for c in constraint)))
+    if isinstance(constraint, dict):
+        return '{{{0}}}'.format(', '.join(
+            '{0}: {1}'.format(_describe(k), _describe(v))
+            for k, v in constraint.items()))
+    return repr(constraint)
+
+
+def _describe_checker(checker):
+    """_describe() for the constraint compiled into a _Checker."""
+    kind = type(checker)
+    if kind is _InstanceChecker:
+        return _describe(checker.type)
+    if kind is _CollectionChecker:
+        descriptions = [_describe_checker(c) for c in checker.alternatives]
+        if checker.kind is list:
+            return '[{0}]'.format(', '.join(descriptions))
+        return '{{{0}}}'.format(', '.join(sorted(descriptions)))
+    if kind is _TupleChecker:
+        return '({0})'.format(', '.join(_describe_checker(c)
+                                        for c in checker.items))
+    if kind is _DictChecker:
+        return '{{{0}}}'.format(', '.join(
+            '{0}: {1}'.format(_describe_checker(k), _describe_checker(v))
+            for k, v in checker.items))
+    return 'nothing'
+
+
+def _format_path(path):
+    """Renders ('a', 'items', 3) as a["items"][3]."""
+    parts = [path[0]]
+    for key in path[1:]:
+        if isinstance(key, str):
+            key = '"{0}"'.format(key.replace('\\', '\\\\').replace('"', '\\"'))
+        else:
+            key = repr(key)
+        parts.append('[{0}]'.format(key))
+    return ''.join(parts)
+
+
+class Violation(object):
+    """A value, or dict key, that doesn't match its annotation.
+
+    path is the location of the value, such as a["items"][3]. Elements of sets
+    are located by their position when iterating the set.
+    """
+    __slots__ = ('_path', 'expected', 'value', 'key')
+
+    def __init__(self, path, expected, value, key=False):
+        self._path = path
+        self.expected = expected # Tuple of acceptable constraints.
+        self.value = value
+        self.key = key
+
+    @property
+    def path(self):
+        return _format_path(self._path)
+
+    def __str__(self):
+        return '{0}: expected {1}{2}, got {3}'.format(
+            self.path, 'key ' if self.key else '',
+            ' or '.join(_describe(c) for c in self.expected),
+            type(self.value).__qualname__)
+
+    def __repr__(self):
+        return '<Violation {0}>'.format(self)
+
+
+class TypeCheckError(TypeError):
+    """Raised by typechecked() functions with errors='fail-fast' or
+    errors='collect-all'. violations is the list of Violation found.
+
+    >>> @typechecked(errors='fail-fast')
+    ... def test(a: {str: [int]}):
+    ...     return a
+    ...
+    >>> try:
+    ...     test({'items': [1, 2, 'three']})
+    ... except TypeCheckError as error:
+    ...     print(error)
+    ...     print(error.violations[0].value)
+    Incorrect type for "a"
+      a["items"][2]: expected int, got str
+    three
+    """
+
+    def __init__(self, message, violations):
+        super().__init__(message)
+        self.violations = violations
+
+    def __str__(self):
+        # Violations are only rendered when the error is displayed.
+        return '\n'.join([self.args[0]] +
+                         ['  {0}'.format(v) for v in self.violations])
+
+
+def _find_violations(value, constraint, path, found, limit):
+    """Appends to found the violations of a value that doesn't match.
+
+    Only called once a check failed, so the successful checks never pay for
+    locating errors. Stops when found has limit violations.
+    """
+    if _multi_instanceof(value, constraint, list) or _multi_instanceof(value, constraint, set):
+        constraints = tuple(constraint)
+        for index, sub_val in enumerate(value):
+            if any(_check_type_constraint(sub_val, con) for con in constraints):
+                continue
+            if len(constraints) == 1:
+                _find_violations(sub_val, constraints[0], path + (index,),
+                                 found, limit)
+            else:
+                found.append(Violation(path + (index,), constraints, sub_val))
+            if len(found) >= limit:
+                return
+    elif _multi_instanceof(value, constraint, tuple) and len(constraint) == len(value):
+        for index, (sub, con) in enumerate(zip(value, constraint)):
+            if not _check_type_constraint(sub, con):
+                _find_violations(sub, con, path + (index,), found, limit)
+                if len(found) >= limit:
+                    return
+    elif _multi_instanceof(value, constraint, dict):
+        items = tuple(constraint.items())
+        for sub_key, sub_val in value.items():
+            candidates = tuple(value_constraint
+                               for key_constraint, value_constraint in items
+                               if _check_type_constraint(sub_key, key_constraint))
+            if any(_check_type_constraint(sub_val, con) for con in candidates):
+                continue
+            if not candidates:
+                found.append(Violation(path + (sub_key,), tuple(constraint),
+                                       sub_key, key=True))
+            elif len(candidates) == 1:
+                _find_violations(sub_val, candidates[0], path + (sub_key,),
+                                 found, limit)
+            else:
+                found.append(Violation(path + (sub_key,), candidates, sub_val))
+            if len(found) >= limit:
+                return
+    else:
+        found.append(Violation(path, (constraint,), value))
+
+
+def _locating_checks(limit):
+    """Returns versions of _check_arguments() and _check_return() raising
+    TypeCheckError with at most limit violations."""
+
+    def check_arguments(checks, signature, args, kwargs):
+        error = checks.match(args, kwargs)
+        if error is None:
+            return len(args) + len(kwargs)
+        if not error:
+            signature.bind(*args, **kwargs)
+        names = []
+        found = []
+        parameters = signature.parameters
+        for name, checker, value in checks.bind(args, kwargs):
+            if checker is None or checker.check(value):
+                continue
+            names.append('"{0}"'.format(name))
+            _find_violations(value, parameters[name].annotation, (name,),
+                             found, limit)
+            if len(found) >= limit:
+                break
+        raise TypeCheckError('Incorrect type for {0}'.format(', '.join(names)),
+                             found)
+
+    def check_return(checks, signature, return_value):
+        returns = checks.returns
+        if returns is None or returns.check(return_value):
+            return return_value
+        found = []
+        _find_violations(return_value, signature.return_annotation,
+                         ('return',), found, limit)
+        raise TypeCheckError('Incorrect return type', found)
+
+    return check_arguments, check_return
+
+
+class _Budget(object):
+    """Number of leaf checks left before yielding to the event loop."""
+    __slots__ = ('chunk_size', 'left')
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.left = chunk_size
+
+    async def pause(self):
+        self.left = self.chunk_size
+        await asyncio.sleep(0)
+
+
+async def check_type_async(value, constraint, chunk_size=4096):
+    """Checks value against a type annotation without stalling the event loop.
+
+    The elements of containers, including the ones of nested containers, are
+    checked in chunks of chunk_size, yielding to the event loop between
+    them. The result is the same as the one of the synchronous check done by
+    typechecked().
+
+    >>> import asyncio
+    >>> asyncio.run(check_type_async(list(range(10000)), [int], 1000))
+    True
+    >>> asyncio.run(check_type_async({'a': [1, 'b']}, {str: [int]}, 1))
+    False
+    """
+    return await _check_async(_compile(constraint), value, _Budget(chunk_size))
+
+
+def _is_nested(checker, value):
+    """Whether checking value with checker goes through its elements."""
+    return (type(checker) in _container_checkers and
+            isinstance(value, (list, set, tuple, dict)))
+
+
+async def _check_async(checker, value, budget):
+    """checker.check(value), charging budget one check per element that is
+    not itself a container, and yielding when it's spent."""
+    kind = type(checker)
+    if kind is _CollectionChecker:
+        if not isinstance(value, checker.kind):
+            return False
+        alternatives = checker.alternatives
+        if not alternatives:
+            return True
+        for item in value:
+            for alternative in alternatives:
+                if _is_nested(alternative, item):
+                    matched = await _check_async(alternative, item, budget)
+                else:
+                    matched = alternative.check(item)
+                    budget.left -= 1
+                if matched:
+                    break
+            else:
+                return False
+            if budget.left <= 0:
+                await budget.pause()
+        return True
+    elif kind is _TupleChecker:
+        items = checker.items
+        if not isinstance(value, tuple) or len(value) != len(items):
+            return False
+        for item, item_checker in zip(value, items):
+            if _is_nested(item_checker, item):
+                matched = await _check_async(item_checker, item, budget)
+            else:
+                matched = item_checker.check(item)
+                budget.left -= 1
+            if not matched:
+                return False
+            if budget.left <= 0:
+                await budget.pause()
+        return True
+    elif kind is _DictChecker:
+        if not isinstance(value, dict):
+            return False
+        items = checker.items
+        if not items:
+            return True
+        for key, item in value.items():
+            for key_checker, value_checker in items:
+                budget.left -= 1
+                if not key_checker.check(key):
+                    continue
+                if _is_nested(value_checker, item):
+                    matched = await _check_async(value_checker, item, budget)
+                else:
+                    matched = value_checker.check(item)
+                    budget.left -= 1
+                if matched:
+                    break
+            else:
+                return False
+            if budget.left <= 0:
+                await budget.pause()
+        return True
+    else:
+        budget.left -= 1
+        return checker.check(value)
+
+
+def _async_checks(chunk_size, check_arguments, check_return):
+    """Returns coroutine function versions of check_arguments and
+    check_return. Given a chunk_size, they check in chunks like
+    check_type_async() and repeat the failed checks synchronously to raise
+    the same errors as the synchronous wrapper."""
+
+    async def check_arguments_async(checks, signature, args, kwargs):
+        if chunk_size is None:
+            return check_arguments(checks, signature, args, kwargs)
+        bound = checks.bind(args, kwargs)
+        if bound is None:
+            check_arguments(checks, signature, args, kwargs)
+        budget = _Budget(chunk_size)
+        for name, checker, value in bound:
+            if checker is not None and not await _check_async(checker, value,
+                                                              budget):
+                check_arguments(checks, signature, args, kwargs)
+        return len(bound)
+
+    async def check_return_async(checks, signature, return_value):
+        returns = checks.returns
+        if chunk_size is None or returns is None:
+            return check_return(checks, signature, return_value)
+        if not await _check_async(returns, return_value, _Budget(chunk_size)):
+            check_return(checks, signature, return_value)
+        return return_value
+
+    return check_arguments_async, check_return_async
+
+
+def _async_wrapper(target, signature, check_arguments, check_return):
+    """A typechecked() wrapper for coroutine functions, see _async_checks()."""
+    checks = None if signature is None else _compile_signature(signature)
+
+    @functools.wraps(target)
+    async def wrapper(*args, **kwargs):
+        nonlocal signature, checks
+        if checks is None:
+            signature = inspect.signature(target)
+            checks = _compile_signature(signature)
+        await check_arguments(checks, signature, args, kwargs)
+        return await check_return(checks, signature,
+                                  await target(*args, **kwargs))
+    return wrapper
+
+
+def typechecked(target=None, *, lazy=False, profiler=None, shadow=None,
+                chunk_size=None, errors=None, max_errors=100):
     """A decorator to make a function check its types at runtime.
 
     >>> @typechecked
@@ -490,15 +1775,267 @@ def typechecked(target):
     Traceback (most recent call last):
         ...
     TypeError: Incorrect type for "a"
+
+    With lazy=True the signature of the function is not introspected until
+    the first call, which keeps decoration cheap at import time:
+
+    >>> @typechecked(lazy=True)
+    ... def test(a: int):
+    ...     return a
+    ...
+    >>> test(1)
+    1
+
+    A profiler, such as annotation.explain.ConstraintProfiler, can be given to
+    find out which parts of the annotations are slow to check.
+
+    With a shadow checker, such as annotation.shadow.ShadowChecker, the types
+    are checked in background and the violations are reported asynchronously
+    instead of raising TypeError.
+
+    Coroutine functions check their arguments before being awaited and their
+    return value after it. Given a chunk_size, the elements of containers are
+    checked in chunks yielding to the event loop between them, see
+    check_type_async().
+
+    By default a TypeError only names the incorrect argument. With
+    errors='fail-fast' a TypeCheckError locating the first violation is
+    raised, with errors='collect-all' it lists up to max_errors violations.
+    Violations are only searched once a check has failed.
+
+    Decorating a class checks all its annotated methods, including static
+    methods, class methods and properties. Methods without annotations are
+    left untouched, they don't pay any overhead:
+
+    >>> @typechecked
+    ... class Counter:
+    ...     def __init__(self):
+    ...         self.count = 0
+    ...     def add(self, amount: int) -> int:
+    ...         self.count += amount
+    ...         return self.count
+    ...
+    >>> Counter().add('one')
+    Traceback (most recent call last):
+        ...
+    TypeError: Incorrect type for "amount"
+
+    >>> @typechecked(errors='collect-all')
+    ... def test(a: [int], b: (str, int)):
+    ...     return a
+    ...
+    >>> try:
+    ...     test([1, 'two', 3, 'four'], ('five', 'six'))
+    ... except TypeCheckError as error:
+    ...     print(error)
+    Incorrect type for "a", "b"
+      a[1]: expected int, got str
+      a[3]: expected int, got str
+      b[1]: expected int, got str
+    """
+    if target is None or isinstance(target, type):
+        decorator = functools.partial(typechecked, lazy=lazy, profiler=profiler,
+                                      shadow=shadow, chunk_size=chunk_size,
+                                      errors=errors, max_errors=max_errors)
+        if target is None:
+            return decorator
+        return _typecheck_class(target, decorator)
+    wrapper = _wrap(target, lazy, profiler, shadow, chunk_size, errors,
+                    max_errors)
+    # Marks the wrapper, and the wrappers of other decorators copying its
+    # __dict__, so decorating the class or module again skips it.
+    wrapper.__typechecked__ = True
+    return wrapper
+
+
+def _wrap(target, lazy, profiler, shadow, chunk_size, errors, max_errors):
+    """The typechecked() wrapper of a function."""
+    if errors is None:
+        check_arguments = _check_arguments
+        check_return = _check_return
+    elif errors == 'fail-fast':
+        check_arguments, check_return = _locating_checks(1)
+    elif errors == 'collect-all':
+        check_arguments, check_return = _locating_checks(max_errors)
+    else:
+        raise ValueError("errors should be 'fail-fast' or 'collect-all'")
+
+    signature = None if lazy else inspect.signature(target)
+    if profiler is not None:
+        return profiler.wrap(target, signature)
+    if shadow is not None:
+        return shadow.wrap(target, signature)
+    if inspect.iscoroutinefunction(target):
+        check_arguments, check_return = _async_checks(
+            chunk_size, check_arguments, check_return)
+        if instrument.is_enabled():
+            return _instrumented_async_wrapper(target, signature,
+                                               check_arguments, check_return)
+        return _async_wrapper(target, signature, check_arguments, check_return)
+    if instrument.is_enabled():
+        return _instrumented_wrapper(target, signature, check_arguments,
+                                     check_return)
+
+    # Only the shared compiled checks are kept. The signature is introspected
+    # again to report binding errors or to locate violations.
+    checks = None if lazy else _compile_signature(signature)
+    del signature
+    locate = errors is not None
+
+    @functools.wraps(target)
+    def wrapper(*args, **kwargs):
+        nonlocal checks
+        if checks is None:
+            checks = _compile_signature(inspect.signature(target))
+        error = checks.match(args, kwargs)
+        if error is not None:
+            if error and not locate:
+                raise TypeError('Incorrect type for "{0}"'.format(error))
+            check_arguments(checks, inspect.signature(target), args, kwargs)
+        return_value = target(*args, **kwargs)
+        returns = checks.returns
+        if returns is None or returns.check(return_value):
+            return return_value
+        if not locate:
+            raise TypeError('Incorrect return type')
+        return check_return(checks, inspect.signature(target), return_value)
+    return wrapper
+
+
+def _is_annotated(function):
+    return (isinstance(function, types.FunctionType) and
+            bool(function.__annotations__) and
+            not getattr(function, '__typechecked__', False))
+
+
+def _typecheck_member(value, decorator):
+    """Returns a typechecked version of a class member, or the same value if
+    there is nothing to check."""
+    if isinstance(value, (staticmethod, classmethod)):
+        if _is_annotated(value.__func__):
+            return type(value)(decorator(value.__func__))
+    elif isinstance(value, property):
+        accessors = [decorator(f) if _is_annotated(f) else f
+                     for f in (value.fget, value.fset, value.fdel)]
+        if accessors != [value.fget, value.fset, value.fdel]:
+            return property(*accessors, doc=value.__doc__)
+    elif _is_annotated(value):
+        return decorator(value)
+    return value
+
+
+_constraint_metaclasses = (InterfaceMeta, PredicateMeta, UnionMeta, AnyTypeMeta)
+
+
+def _typecheck_class(cls, decorator):
+    """Applies decorator to the annotated members defined in cls."""
+    for name, value in list(vars(cls).items()):
+        member = _typecheck_member(value, decorator)
+        if member is not value:
+            setattr(cls, name, member)
+    return cls
+
+
+def typecheck_module(module, **options):
+    """Applies typechecked() to the annotated functions and methods defined
+    in a module, or module name. Keyword arguments are passed to typechecked().
+
+    Objects imported from other modules, interfaces and other constraint
+    types are skipped. Applying it twice has no effect, so it can be used to
+    enable checking for a whole package from its __init__:
+
+        for name in ('app.models', 'app.views'):
+            typecheck_module(name, errors='fail-fast')
     """
-    signature = inspect.signature(target)
+    if isinstance(module, str):
+        module = sys.modules[module]
+    decorator = typechecked(**options)
+    for name, value in list(vars(module).items()):
+        if getattr(value, '__module__', None) != module.__name__:
+            continue
+        if isinstance(value, type):
+            if not isinstance(value, _constraint_metaclasses):
+                _typecheck_class(value, decorator)
+        elif _is_annotated(value):
+            setattr(module, name, decorator(value))
+    return module
+
+
+def _instrumented_wrapper(target, signature, check_arguments=_check_arguments,
+                          check_return=_check_return):
+    """A typechecked() wrapper updating instrumentation counters."""
+    counters = instrument.counters(_qualified_name(target))
+    clock = instrument.clock
+    checks = None if signature is None else _compile_signature(signature)
 
     @functools.wraps(target)
     def wrapper(*args, **kwargs):
-        _check_argument_types(signature, *args, **kwargs)
-        return _check_return_type(signature, target(*args, **kwargs))
+        nonlocal signature, checks
+        start = clock()
+        counters.calls += 1
+        if checks is None:
+            signature = inspect.signature(target)
+            checks = _compile_signature(signature)
+        try:
+            counters.checks += check_arguments(checks, signature, args, kwargs)
+        except TypeError:
+            counters.failures += 1
+            raise
+        finally:
+            counters.check_time += clock() - start
+
+        return_value = target(*args, **kwargs)
+
+        start = clock()
+        counters.checks += 1
+        try:
+            return check_return(checks, signature, return_value)
+        except TypeError:
+            counters.failures += 1
+            raise
+        finally:
+            counters.check_time += clock() - start
+    return wrapper
+
+
+def _instrumented_async_wrapper(target, signature, check_arguments,
+                                check_return):
+    """_instrumented_wrapper() for coroutine functions, see _async_checks()."""
+    counters = instrument.counters(_qualified_name(target))
+    clock = instrument.clock
+    checks = None if signature is None else _compile_signature(signature)
+
+    @functools.wraps(target)
+    async def wrapper(*args, **kwargs):
+        nonlocal signature, checks
+        start = clock()
+        counters.calls += 1
+        if checks is None:
+            signature = inspect.signature(target)
+            checks = _compile_signature(signature)
+        try:
+            counters.checks += await check_arguments(checks, signature, args,
+                                                     kwargs)
+        except TypeError:
+            counters.failures += 1
+            raise
+        finally:
+            counters.check_time += clock() - start
+
+        return_value = await target(*args, **kwargs)
+
+        start = clock()
+        counters.checks += 1
+        try:
+            return await check_return(checks, signature, return_value)
+        except TypeError:
+            counters.failures += 1
+            raise
+        finally:
+            counters.check_time += clock() - start
     return wrapper
 
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
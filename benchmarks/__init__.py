@@ -0,0 +1,22 @@
+"""Micro benchmarks for the annotation package.
+
+Every module in this package can be run on its own, for example:
+
+    python -m benchmarks.static_interface
+
+The suite of the hot paths, see benchmarks.suite, runs with:
+
+    python -m benchmarks
+"""
+
+import timeit
+
+
+def measure(statement, number=10000, repeat=5):
+    """Returns the best time per call, in seconds, of statement()."""
+    timer = timeit.Timer(statement)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(name, seconds):
+    print('{0:<50} {1:>10.3f} us'.format(name, seconds * 1e6))
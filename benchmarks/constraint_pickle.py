@@ -0,0 +1,36 @@
+"""Size and speed of pickled constraints."""
+
+import pickle
+
+from annotation.typed import optional, options, typedef, union
+
+from benchmarks import measure, report
+
+
+def callback(a: int, b: str) -> optional(int):
+    pass
+
+
+CONSTRAINTS = [
+    ('union(int, str, float)', union(int, str, float)),
+    ('optional(int)', optional(int)),
+    ("options('r', 'w', 'a')", options('r', 'w', 'a')),
+    ('typedef callback', typedef(callback)),
+    ('{str: [optional(int)]}', {str: [optional(int)]}),
+]
+
+
+def main():
+    for name, constraint in CONSTRAINTS:
+        data = pickle.dumps(constraint, pickle.HIGHEST_PROTOCOL)
+        # Typedefs are not interned, their copies are pickled the same.
+        assert pickle.dumps(pickle.loads(data), pickle.HIGHEST_PROTOCOL) == data
+        print('{0:<50} {1:>10} bytes'.format(name, len(data)))
+    for name, constraint in CONSTRAINTS:
+        data = pickle.dumps(constraint, pickle.HIGHEST_PROTOCOL)
+        report('pickle.loads({0})'.format(name),
+               measure(lambda: pickle.loads(data)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Dispatch overhead per await of an async overloaded function."""
+
+import asyncio
+import time
+
+from annotation.overload import OverloadedFunction
+
+from benchmarks import report
+
+
+async def handle_int(a: int):
+    return a
+
+
+async def handle_str(a: str):
+    return a
+
+
+async def handle_bytes(a: bytes):
+    return a
+
+
+def awaits_per_call(handler, count):
+    """Seconds per await of handler(1), awaiting it count times."""
+    async def run():
+        start = time.perf_counter()
+        for _ in range(count):
+            await handler(1)
+        return time.perf_counter() - start
+    return min(asyncio.run(run()) for _ in range(5)) / count
+
+
+def main(count=100000):
+    handler = OverloadedFunction(__name__, 'handle')
+    handler.register_many([handle_int, handle_str, handle_bytes])
+    direct = awaits_per_call(handle_int, count)
+    dispatched = awaits_per_call(handler, count)
+    report('await async def', direct)
+    report('await overloaded async def', dispatched)
+    report('dispatch overhead per await', dispatched - direct)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Cold dispatch of overloaded functions annotated with unions, interfaces
+and ABCs, that is with the dispatch cache cleared before every call, and
+cached dispatch with and without predicates."""
+
+import collections.abc
+
+from annotation.overload import OverloadedFunction
+from annotation.typed import Interface, predicate, union
+
+from benchmarks import measure, report
+
+
+class Sized(Interface):
+    def __len__():
+        pass
+
+
+class Keyed(Interface):
+    def keys():
+        pass
+
+    def __getitem__(key):
+        pass
+
+
+def overloads():
+    def sized(a: Sized, b):
+        return 'sized'
+
+    def keyed(a: Keyed, b):
+        return 'keyed'
+
+    def number(a: union(int, float), b):
+        return 'number'
+
+    def mapping(a: collections.abc.Mapping, b: collections.abc.Hashable):
+        return 'mapping'
+
+    def even(a: predicate(lambda x: x % 2 == 0, 'Even'), b: int):
+        return 'even'
+
+    return [sized, keyed, number, mapping, even]
+
+
+def cold(function, *args):
+    def call():
+        function._clear_caches()
+        return function(*args)
+    return call
+
+
+def main():
+    for frozen in (False, True):
+        function = OverloadedFunction(__name__, 'f')
+        for overload in overloads():
+            function.add_function(overload)
+        kind = 'cold dispatch'
+        if frozen:
+            function.freeze()
+            kind = 'cold frozen dispatch'
+        report(kind + ', union', measure(cold(function, 1.0, None)))
+        report(kind + ', interface', measure(cold(function, 'a', None)))
+        report(kind + ', ABC', measure(cold(function, {}, 'a')))
+    report('cached dispatch', measure(lambda: function({}, 'a')))
+    report('cached dispatch, predicate', measure(lambda: function(2, 1)))
+
+
+if __name__ == '__main__':
+    main()
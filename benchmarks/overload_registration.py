@@ -0,0 +1,53 @@
+"""Time to register 10, 100 and 1000 overloads one by one and in bulk."""
+
+import time
+
+from annotation.overload import OverloadedFunction
+
+
+def hierarchy(count):
+    """count classes forming a binary tree, so overloads are both nested and
+    siblings in the heap."""
+    classes = [type('C0', (object,), {})]
+    for i in range(1, count):
+        classes.append(type('C{0}'.format(i), (classes[(i - 1) // 2],), {}))
+    return classes
+
+
+def overloads(count):
+    functions = []
+    for cls in hierarchy(count):
+        namespace = {'cls': cls}
+        exec('def f(a: cls, b): return cls', namespace)
+        functions.append(namespace['f'])
+    return functions
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def one_by_one(functions):
+    overloaded = OverloadedFunction(__name__, 'f')
+    for function in functions:
+        overloaded.add_function(function)
+
+
+def bulk(functions):
+    OverloadedFunction(__name__, 'f').register_many(functions)
+
+
+def main():
+    print('{0:>10} {1:>15} {2:>15}'.format('overloads', 'add_function',
+                                           'register_many'))
+    for count in (10, 100, 1000):
+        functions = overloads(count)
+        print('{0:>10} {1:>13.2f}ms {2:>13.2f}ms'.format(
+            count, timed(lambda: one_by_one(functions)) * 1e3,
+            timed(lambda: bulk(functions)) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
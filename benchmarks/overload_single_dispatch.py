@@ -0,0 +1,64 @@
+"""Overloads varying in a single argument: the heap against the
+functools.singledispatch backend, and plain functools.singledispatch.
+
+Misses are measured by clearing the dispatch cache of the overload set before
+every call, as happens when the types of the other arguments keep changing.
+"""
+
+import functools
+
+from annotation.overload import OverloadedFunction
+
+from benchmarks import measure, report
+
+
+def hierarchy(count):
+    classes = [type('C0', (object,), {})]
+    for i in range(1, count):
+        classes.append(type('C{0}'.format(i), (classes[(i - 1) // 2],), {}))
+    return classes
+
+
+def overloads(classes):
+    functions = []
+    for cls in classes:
+        namespace = {'cls': cls}
+        exec('def f(a: cls, b): return cls', namespace)
+        functions.append(namespace['f'])
+    return functions
+
+
+def overload_set(functions, single_dispatch):
+    function = OverloadedFunction(__name__, 'f')
+    function.register_many(functions)
+    if not single_dispatch:
+        function._dispatchers[2] = None
+    return function
+
+
+def miss(function, *args):
+    def call():
+        function._clear_caches()
+        return function(*args)
+    return call
+
+
+def main(count=50):
+    classes = hierarchy(count)
+    functions = overloads(classes)
+    value = classes[-1]()
+    heap = overload_set(functions, False)
+    single = overload_set(functions, True)
+    plain = functools.singledispatch(lambda a, b: None)
+    for cls, function in zip(classes, functions):
+        plain.register(cls, function)
+
+    report('miss, heap', measure(miss(heap, value, None), number=1000))
+    report('miss, singledispatch backend', measure(miss(single, value, None)))
+    report('hit, heap', measure(lambda: heap(value, None)))
+    report('hit, singledispatch backend', measure(lambda: single(value, None)))
+    report('functools.singledispatch', measure(lambda: plain(value, None)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Dynamic vs static Interface checks against property heavy objects."""
+
+from annotation.typed import Interface
+
+from benchmarks import measure, report
+
+
+class Model:
+    """An object whose properties are expensive, like ORM lazy loads."""
+
+    def __init__(self):
+        self.id = 1
+        self.__dict__['name'] = 'name'
+
+    @property
+    def owner(self) -> str:
+        return ''.join(str(i) for i in range(100))
+
+    @property
+    def tags(self) -> list:
+        return [str(i) for i in range(100)]
+
+    @property
+    def size(self) -> int:
+        return sum(range(100))
+
+    def save(self, force: bool) -> bool:
+        return force
+
+
+class DynamicModel(Interface):
+    id = int
+    name = str
+    owner = str
+    tags = list
+    size = int
+
+    def save(force: bool) -> bool:
+        pass
+
+
+class StaticModel(Interface, static=True):
+    id = int
+    name = str
+    owner = str
+    tags = list
+    size = int
+
+    def save(force: bool) -> bool:
+        pass
+
+
+def main():
+    model = Model()
+    assert isinstance(model, DynamicModel)
+    assert isinstance(model, StaticModel)
+    report('isinstance(model, DynamicModel)',
+           measure(lambda: isinstance(model, DynamicModel)))
+    report('isinstance(model, StaticModel)',
+           measure(lambda: isinstance(model, StaticModel)))
+
+
+if __name__ == '__main__':
+    main()
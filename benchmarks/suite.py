@@ -0,0 +1,315 @@
+"""Benchmark suite of the hot paths of typed.py and overload.py.
+
+Every case is timed with measure(), the best of several repetitions, and the
+results can be saved as JSON and compared against a baseline to catch
+regressions:
+
+    python -m benchmarks -o baseline.json
+    python -m benchmarks --compare baseline.json
+"""
+
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import time
+
+from annotation.overload import OverloadedFunction
+from annotation.typed import (Interface, optional, options, predicate,
+                              typechecked, union)
+
+from benchmarks import measure
+from benchmarks.overload_registration import overloads
+
+
+_cases = [] # [(name, function returning seconds per call), ...]
+
+
+def case(name):
+    """Registers a function returning the seconds per call of a case."""
+    def decorator(function):
+        _cases.append((name, function))
+        return function
+    return decorator
+
+
+# typechecked call overhead by arity.
+
+def _arity_functions(arity):
+    parameters = ', '.join('a{0}: int'.format(i) for i in range(arity))
+    namespace = {}
+    exec('def function({0}) -> int:\n    return 0'.format(parameters),
+         namespace)
+    return namespace['function'], tuple(range(arity))
+
+
+def _register_arity(arity):
+    function, args = _arity_functions(arity)
+    wrapper = typechecked(function)
+
+    @case('typechecked/arity/{0}/plain'.format(arity))
+    def plain():
+        return measure(lambda: function(*args))
+
+    @case('typechecked/arity/{0}/checked'.format(arity))
+    def checked():
+        return measure(lambda: wrapper(*args))
+
+
+for _arity in (0, 1, 3, 6):
+    _register_arity(_arity)
+
+
+# typechecked call overhead by annotation kind.
+
+class Named(Interface):
+    def name():
+        pass
+
+
+class Person(object):
+    def name(self):
+        return 'name'
+
+
+Even = predicate(lambda x: x % 2 == 0, 'Even')
+
+_KINDS = [
+    ('type', int, 1),
+    ('list', [int], list(range(10))),
+    ('dict', {str: int}, {str(i): i for i in range(10)}),
+    ('tuple', (int, str, float), (1, 'a', 1.0)),
+    ('union', union(int, str), 'a'),
+    ('optional', optional(int), None),
+    ('options', options('r', 'w', 'a'), 'a'),
+    ('predicate', Even, 2),
+    ('interface', Named, Person()),
+]
+
+
+def _register_kind(name, annotation, value):
+    def function(a: annotation):
+        pass
+    wrapper = typechecked(function)
+
+    @case('typechecked/kind/{0}'.format(name))
+    def checked():
+        return measure(lambda: wrapper(value))
+
+
+for _kind in _KINDS:
+    _register_kind(*_kind)
+
+
+# Container validation by size.
+
+def _register_size(size):
+    @typechecked
+    def function(a: [int]):
+        pass
+    value = list(range(size))
+
+    @case('typechecked/list/{0}'.format(size))
+    def checked():
+        return measure(lambda: function(value), number=max(1, 100000 // size),
+                       repeat=3)
+
+
+for _exponent in range(1, 7):
+    _register_size(10 ** _exponent)
+
+
+# Interfaces and constraint types.
+
+@case('interface/isinstance')
+def interface_isinstance():
+    person = Person()
+    return measure(lambda: isinstance(person, Named))
+
+
+@case('interface/issubclass')
+def interface_issubclass():
+    return measure(lambda: issubclass(Person, Named))
+
+
+@case('union/isinstance')
+def union_isinstance():
+    constraint = union(int, str, float)
+    return measure(lambda: isinstance(1.0, constraint))
+
+
+@case('predicate/isinstance')
+def predicate_isinstance():
+    return measure(lambda: isinstance(2, Even))
+
+
+@case('options/isinstance')
+def options_isinstance():
+    constraint = options('r', 'w', 'a')
+    return measure(lambda: isinstance('a', constraint))
+
+
+# Overload dispatch and registration.
+
+def _overload_set(count, single_dispatch=True):
+    function = OverloadedFunction(__name__, 'f')
+    function.register_many(overloads(count))
+    if not single_dispatch:
+        function._dispatchers[2] = None
+    return function
+
+
+def _deepest_argument(function):
+    """An argument for a deepest function of the heap, the slowest to find."""
+    heap = function._functions[2]
+    while heap._childs:
+        heap = next(iter(heap._childs))
+    return heap._root.__annotations__['a']()
+
+
+def _register_dispatch(count):
+    @case('overload/{0}/hot'.format(count))
+    def hot():
+        function = _overload_set(count)
+        argument = _deepest_argument(function)
+        return measure(lambda: function(argument, None))
+
+    def cold(single_dispatch, number):
+        function = _overload_set(count, single_dispatch)
+        argument = _deepest_argument(function)
+        def call():
+            function._clear_caches()
+            function(argument, None)
+        return measure(call, number=number)
+
+    case('overload/{0}/cold/heap'.format(count))(
+        lambda: cold(False, number=100))
+    case('overload/{0}/cold/singledispatch'.format(count))(
+        lambda: cold(True, number=1000))
+
+
+for _count in (10, 100):
+    _register_dispatch(_count)
+
+
+def _timed(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _register_registration(count):
+    functions = overloads(count)
+
+    @case('overload/register/{0}/add_function'.format(count))
+    def one_by_one():
+        def register():
+            function = OverloadedFunction(__name__, 'f')
+            for func in functions:
+                function.add_function(func)
+        return _timed(register)
+
+    @case('overload/register/{0}/register_many'.format(count))
+    def bulk():
+        return _timed(lambda: OverloadedFunction(__name__, 'f').register_many(
+            functions))
+
+
+for _count in (10, 100, 1000):
+    _register_registration(_count)
+
+
+def cases(patterns=None):
+    """The registered (name, function) cases matching any of the glob
+    patterns, all of them by default."""
+    return [(name, function) for name, function in _cases
+            if not patterns or any(fnmatch.fnmatch(name, pattern)
+                                   for pattern in patterns)]
+
+
+def run(patterns=None, out=None):
+    """Runs the cases and returns {name: seconds per call}. Progress is
+    written to out if it's given."""
+    results = {}
+    for name, function in cases(patterns):
+        results[name] = function()
+        if out is not None:
+            out.write('{0:<50} {1:>12.3f} us\n'.format(name, results[name] * 1e6))
+            out.flush()
+    return results
+
+
+def compare(baseline, results, threshold):
+    """
+    Compares results with a baseline, both {name: seconds}. Returns the lines
+    of a report and the names of the cases slower than the baseline by more
+    than threshold, a fraction.
+    """
+    lines = ['{0:<50} {1:>12} {2:>12} {3:>8}'.format(
+        'case', 'baseline us', 'current us', 'change')]
+    regressions = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            lines.append('{0:<50} {1:>12} {2:>12.3f}'.format(name, '-',
+                                                            seconds * 1e6))
+            continue
+        change = seconds / baseline[name] - 1 if baseline[name] else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        lines.append('{0:<50} {1:>12.3f} {2:>12.3f} {3:>+8.1%}{4}'.format(
+            name, baseline[name] * 1e6, seconds * 1e6, change, flag))
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Measures the overhead of typechecked, interfaces and '
+                    'overloaded functions.')
+    parser.add_argument('-k', dest='patterns', action='append',
+                        metavar='PATTERN',
+                        help='only run the cases matching this glob pattern, '
+                             'can be repeated')
+    parser.add_argument('-o', '--output',
+                        help='file to write the results to, as JSON')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown reported as a regression with '
+                             '--compare (default: 0.1, that is 10%%)')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='list the cases and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, function in cases(args.patterns):
+            print(name)
+        return 0
+
+    results = run(args.patterns, sys.stderr)
+    data = {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'results': results}
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(data, fp, indent=1, sort_keys=True)
+    elif not args.compare:
+        json.dump(data, sys.stdout, indent=1, sort_keys=True)
+        sys.stdout.write('\n')
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)['results']
+        lines, regressions = compare(baseline, results, args.threshold)
+        print('\n'.join(lines))
+        if regressions:
+            print('{0} regressions'.format(len(regressions)))
+            return 1
+    return 0
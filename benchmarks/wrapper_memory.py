@@ -0,0 +1,45 @@
+"""Memory used by 10k typechecked functions sharing a few annotations."""
+
+import gc
+import tracemalloc
+
+from annotation.typed import optional, typechecked
+
+from benchmarks import measure, report
+
+
+SOURCE = '''
+def function_{0}(name: [str], counts: {{str: int}}, limit: optional(int) = None) -> [str]:
+    return name
+'''
+
+
+def define(count):
+    namespace = {'optional': optional}
+    for i in range(count):
+        exec(SOURCE.format(i), namespace)
+    return [namespace['function_{0}'.format(i)] for i in range(count)]
+
+
+def allocated(function):
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = function()
+    end = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, end - start
+
+
+def main(count=10000):
+    functions = define(count)
+    wrappers, size = allocated(lambda: [typechecked(f) for f in functions])
+    print('{0:<50} {1:>10.1f} KiB'.format(
+        '{0} typechecked wrappers'.format(count), size / 1024))
+    print('{0:<50} {1:>10.1f} B'.format('per wrapper', size / count))
+    wrapper = wrappers[0]
+    report('typechecked call', measure(lambda: wrapper(['a'], {'a': 1})))
+
+
+if __name__ == '__main__':
+    main()
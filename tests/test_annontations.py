@@ -1,8 +1,17 @@
+import abc
+import asyncio
+import concurrent.futures
+import inspect
+import pickle
+import sys
+import types
 import unittest
 from collections import namedtuple
 
-from annotation.typed import (typechecked, Interface, union, AnyType, predicate,
-    optional, typedef, options, only)
+from annotation.typed import (typechecked, Interface, Record, union, AnyType, predicate,
+    optional, typedef, options, only, check_type_async, _check_type_constraint,
+    TypeCheckError, typecheck_module, _check_argument_types, _compile,
+    _compile_signature)
 
 
 
@@ -335,6 +344,431 @@ class TypecheckedTest(unittest.TestCase):
                     return value
                 self.assertRaises(TypeError, test, value)
 
+    def test_lazy(self):
+        introspected = []
+
+        class Annotation(type):
+            def __instancecheck__(cls, instance):
+                introspected.append(instance)
+                return isinstance(instance, int)
+
+        @typechecked(lazy=True)
+        def test(a: Annotation('Int', (), {})):
+            return a
+
+        self.assertEqual([], introspected)
+        self.assertEqual(1, test(1))
+        self.assertRaises(TypeError, test, 'string')
+        self.assertEqual([1, 'string'], introspected)
+
+    def test_lazy_signature_is_cached(self):
+        from unittest import mock
+
+        @typechecked(lazy=True)
+        def test(a: int) -> int:
+            return a
+
+        with mock.patch('inspect.signature') as signature:
+            signature.side_effect = AssertionError
+            self.assertRaises(AssertionError, test, 1)
+
+        self.assertEqual(1, test(1))
+        with mock.patch('inspect.signature') as signature:
+            signature.side_effect = AssertionError
+            self.assertEqual(2, test(2))
+            self.assertRaises(TypeError, test, 'string')
+
+    def test_coroutine_function(self):
+        @typechecked
+        async def test(a: int) -> int:
+            return a
+
+        self.assertEqual(1, asyncio.run(test(1)))
+        self.assertRaises(TypeError, asyncio.run, test('string'))
+
+        @typechecked
+        async def test(a: int) -> int:
+            return str(a)
+
+        self.assertRaises(TypeError, asyncio.run, test(1))
+
+    def test_coroutine_function_with_chunk_size(self):
+        @typechecked(chunk_size=10)
+        async def test(a: [int]) -> [str]:
+            return [str(i) for i in a]
+
+        self.assertEqual(['1', '2'], asyncio.run(test([1, 2])))
+        self.assertEqual(100, len(asyncio.run(test(list(range(100))))))
+        with self.assertRaisesRegex(TypeError, 'Incorrect type for "a"'):
+            asyncio.run(test(list(range(100)) + ['string']))
+
+        @typechecked(chunk_size=10)
+        async def test(a: [int]) -> [str]:
+            return a
+
+        with self.assertRaisesRegex(TypeError, 'Incorrect return type'):
+            asyncio.run(test(list(range(100))))
+
+    def test_fail_fast_errors(self):
+        @typechecked(errors='fail-fast')
+        def test(a: {str: [int]}, b: int) -> [int]:
+            return a['items']
+
+        self.assertEqual([1], test({'items': [1]}, 2))
+        with self.assertRaises(TypeCheckError) as context:
+            test({'items': list(range(2000)) + ['a', 'b']}, 'c')
+        violations = context.exception.violations
+        self.assertEqual(1, len(violations))
+        self.assertEqual('a["items"][2000]', violations[0].path)
+        self.assertEqual('a', violations[0].value)
+        self.assertEqual((int,), violations[0].expected)
+        self.assertIn('a["items"][2000]: expected int, got str',
+                      str(context.exception))
+
+        with self.assertRaises(TypeCheckError) as context:
+            test({'items': ['a']}, 1)
+        self.assertEqual('a["items"][0]', context.exception.violations[0].path)
+
+        with self.assertRaises(TypeCheckError) as context:
+            test({1: [1]}, 1)
+        violation = context.exception.violations[0]
+        self.assertTrue(violation.key)
+        self.assertEqual('a[1]', violation.path)
+
+        self.assertRaises(TypeError, test)
+
+    def test_fail_fast_return_errors(self):
+        @typechecked(errors='fail-fast')
+        def test(a) -> (int, [str]):
+            return a
+
+        self.assertEqual((1, ['a']), test((1, ['a'])))
+        with self.assertRaisesRegex(TypeCheckError, 'Incorrect return type'):
+            test((1, ['a', 2]))
+        with self.assertRaises(TypeCheckError) as context:
+            test((1, ['a', 2]))
+        self.assertEqual('return[1][1]', context.exception.violations[0].path)
+        with self.assertRaises(TypeCheckError) as context:
+            test((1,))
+        self.assertEqual('return', context.exception.violations[0].path)
+
+    def test_collect_all_errors(self):
+        @typechecked(errors='collect-all', max_errors=3)
+        def test(a: [union(int, float)], b: {str: int}):
+            return a
+
+        with self.assertRaises(TypeCheckError) as context:
+            test([1, 'a', 2.0, 'b'], {'c': 'd'})
+        self.assertEqual(['a[1]', 'a[3]', 'b["c"]'],
+                         [v.path for v in context.exception.violations])
+
+        with self.assertRaises(TypeCheckError) as context:
+            test(['a'] * 10, {'c': 'd'})
+        self.assertEqual(['a[0]', 'a[1]', 'a[2]'],
+                         [v.path for v in context.exception.violations])
+        self.assertEqual('Incorrect type for "a"',
+                         str(context.exception).splitlines()[0])
+
+    def test_ambiguous_violations_are_located_at_the_element(self):
+        @typechecked(errors='fail-fast')
+        def test(a: [[int], [str]]):
+            return a
+
+        with self.assertRaises(TypeCheckError) as context:
+            test([[1], ['a'], [1, 'a']])
+        violation = context.exception.violations[0]
+        self.assertEqual('a[2]', violation.path)
+        self.assertEqual(([int], [str]), violation.expected)
+
+    def test_invalid_errors_mode(self):
+        with self.assertRaises(ValueError):
+            @typechecked(errors='ignore')
+            def test(a: int):
+                pass
+
+    def test_coroutine_function_errors(self):
+        @typechecked(errors='fail-fast', chunk_size=10)
+        async def test(a: [int]):
+            return a
+
+        with self.assertRaises(TypeCheckError) as context:
+            asyncio.run(test(list(range(100)) + ['a']))
+        self.assertEqual('a[100]', context.exception.violations[0].path)
+
+
+class TypecheckedClassTest(unittest.TestCase):
+
+    def test_class(self):
+        def untouched(self, a):
+            return a
+
+        @typechecked
+        class Test:
+            plain = untouched
+
+            def method(self, a: int) -> int:
+                return a
+
+            @staticmethod
+            def static(a: int):
+                return a
+
+            @classmethod
+            def klass(cls, a: int):
+                return a
+
+            @property
+            def value(self) -> int:
+                return self._value
+
+            @value.setter
+            def value(self, value: int):
+                self._value = value
+
+            async def coroutine(self, a: int):
+                return a
+
+        test = Test()
+        self.assertIs(untouched, Test.plain)
+        self.assertEqual(1, test.method(1))
+        self.assertRaises(TypeError, test.method, 'a')
+        self.assertRaises(TypeError, Test.static, 'a')
+        self.assertRaises(TypeError, Test.klass, 'a')
+        self.assertEqual(1, Test.klass(1))
+        test.value = 1
+        self.assertEqual(1, test.value)
+        with self.assertRaises(TypeError):
+            test.value = 'a'
+        test._value = 'a'
+        with self.assertRaises(TypeError):
+            test.value
+        self.assertRaises(TypeError, asyncio.run, test.coroutine('a'))
+
+    def test_class_with_options(self):
+        @typechecked(errors='fail-fast')
+        class Test:
+            def method(self, a: [int]):
+                return a
+
+        with self.assertRaises(TypeCheckError) as context:
+            Test().method([1, 'a'])
+        self.assertEqual('a[1]', context.exception.violations[0].path)
+
+    def test_class_with_checked_methods(self):
+        @typechecked
+        def untouched(a: int):
+            return a
+
+        @typechecked(errors='fail-fast')
+        class Test:
+            method = untouched
+
+            @typechecked
+            def other(self, a: int):
+                return a
+
+        self.assertIs(untouched, Test.method)
+        self.assertTrue(Test.other.__typechecked__)
+        self.assertFalse(hasattr(Test.other.__wrapped__, '__typechecked__'))
+        self.assertRaisesRegex(TypeError, 'Incorrect type for "a"',
+                               Test().other, 'a')
+
+    def test_module(self):
+        module = types.ModuleType('typecheck_module_test')
+        exec(
+            'from annotation.typed import Interface, optional\n'
+            'from os.path import join\n'
+            'def function(a: int): return a\n'
+            'def untouched(a): return a\n'
+            'class Test:\n'
+            '    def method(self, a: int): return a\n'
+            'class ITest(Interface):\n'
+            '    def method(a: int): pass\n',
+            vars(module))
+        sys.modules[module.__name__] = module
+        self.addCleanup(sys.modules.pop, module.__name__)
+        untouched = module.untouched
+        interface_method = vars(module.ITest)['method']
+
+        typecheck_module(module.__name__)
+        function = module.function
+        typecheck_module(module)
+
+        self.assertIs(function, module.function)
+        self.assertEqual(1, module.function(1))
+        self.assertRaises(TypeError, module.function, 'a')
+        self.assertRaises(TypeError, module.Test().method, 'a')
+        self.assertIs(untouched, module.untouched)
+        self.assertIs(interface_method, vars(module.ITest)['method'])
+        self.assertIsInstance(module.Test(), module.ITest)
+
+        import os.path
+        self.assertIs(os.path.join, module.join)
+
+
+class CompiledConstraintTest(unittest.TestCase):
+
+    def test_same_result_as_check_type_constraint(self):
+        Positive = predicate(lambda x: x > 0)
+        constraints = [int, [int], [int, str], [], {int}, {}, (int, str),
+                       {str: int}, {str: [int], int: str}, [[Positive]],
+                       union(int, str), optional(int), None, 'int']
+        values = [1, 'a', None, [], [1, 2], [1, 'a'], [[1], [-1]], {1, 2},
+                  (1, 'a'), (1, 2, 3), {'a': 1}, {'a': [1], 1: 'b'},
+                  {1: 1}, frozenset([1])]
+        for constraint in constraints:
+            for value in values:
+                self.assertEqual(_check_type_constraint(value, constraint),
+                                 _compile(constraint).check(value),
+                                 (value, constraint))
+
+    def test_hash_consing(self):
+        self.assertIs(_compile([str]), _compile([str]))
+        self.assertIs(_compile({str: int}), _compile({str: int}))
+        self.assertIs(_compile([int, str]), _compile([str, int]))
+        self.assertIs(_compile(optional(int)), _compile(optional(int)))
+        self.assertIsNot(_compile([str]), _compile({str}))
+        self.assertIsNot(_compile((int, str)), _compile((str, int)))
+
+        def f1(a: [str], b: int = 1) -> {str: int}:
+            pass
+
+        def f2(a: [str], b: int = 2) -> {str: int}:
+            pass
+
+        self.assertIs(_compile_signature(inspect.signature(f1)),
+                      _compile_signature(inspect.signature(f2)))
+
+    def test_match_binds_like_signature(self):
+        def test(a: int, /, b: str, *args: (int,), c: int = 0, d: [int],
+                 **kwargs: {str: int}):
+            pass
+
+        signature = inspect.signature(test)
+        checks = _compile_signature(signature)
+        calls = [
+            ((1, 'b'), {'d': []}),
+            ((1,), {'b': 'b', 'd': [1]}),
+            ((1, 'b', 2), {'d': []}),
+            ((1, 'b', 2, 3), {'d': []}),
+            ((1, 'b'), {'d': [], 'c': 1, 'e': 2}),
+            ((1, 'b'), {'d': [], 'a': 2}),
+            (('a', 'b'), {'d': []}),
+            ((1, 2), {'d': []}),
+            ((1, 'b'), {'d': ['a']}),
+            ((1, 'b'), {'d': ['a'], 'c': 'c'}),
+            ((1, 'b'), {'c': 'c', 'd': ['a']}),
+            ((1, 'b'), {'d': [], 'e': 'e'}),
+            ((1, 'b'), {'d': [], 'a': 'a'}),
+            ((1,), {'d': []}),
+            ((1, 'b'), {}),
+            ((1, 'b'), {'b': 'b', 'd': []}),
+            ((), {'a': 1, 'b': 'b', 'd': []}),
+        ]
+        for args, kwargs in calls:
+            try:
+                bound_arguments = signature.bind(*args, **kwargs)
+            except TypeError:
+                self.assertEqual('', checks.match(args, kwargs), (args, kwargs))
+                self.assertIsNone(checks.bind(args, kwargs))
+                self.assertRaises(TypeError, _check_argument_types, signature,
+                                  *args, **kwargs)
+                continue
+            self.assertEqual(list(bound_arguments.arguments.items()),
+                             [(name, value) for name, checker, value
+                              in checks.bind(args, kwargs)], (args, kwargs))
+            expected = None
+            for name, value in bound_arguments.arguments.items():
+                annotation = signature.parameters[name].annotation
+                if not _check_type_constraint(value, annotation):
+                    expected = name
+                    break
+            self.assertEqual(expected, checks.match(args, kwargs),
+                             (args, kwargs))
+
+
+class CheckTypeAsyncTest(unittest.TestCase):
+
+    def check(self, value, constraint, chunk_size=2):
+        return asyncio.run(check_type_async(value, constraint, chunk_size))
+
+    def test_same_result_as_sync_check(self):
+        class Test:
+            pass
+
+        cases = [
+            (list(range(10)), [int]),
+            (list(range(10)) + ['a'], [int]),
+            ([1, 'a'] * 5, [int, str]),
+            ([[1, 2, 3]] * 5, [[int]]),
+            ([[1, 2, 'a']] * 5, [[int]]),
+            (set(range(10)), {int}),
+            (set(range(10)), {str}),
+            (tuple(range(5)), (int, int, int, int, int)),
+            (tuple(range(5)), (int, int, int, int, str)),
+            (tuple(range(5)), (int, int)),
+            ({str(i): list(range(i)) for i in range(10)}, {str: [int]}),
+            ({str(i): [str(i)] * 5 for i in range(10)}, {str: [int]}),
+            ({i: [i] * 5 for i in range(10)}, {str: [int], int: [int]}),
+            ([Test()] * 5, [Test]),
+            (list(range(10)), []),
+            ({1: 2, 3: 4}, {}),
+            (list(range(10)), int),
+            (list(range(10)), {int: int}),
+        ]
+        for value, constraint in cases:
+            self.assertEqual(_check_type_constraint(value, constraint),
+                             self.check(value, constraint),
+                             (value, constraint))
+
+    def test_yields_to_event_loop(self):
+        async def main():
+            ticks = 0
+            done = False
+
+            async def count():
+                nonlocal ticks
+                while not done:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            counter = asyncio.ensure_future(count())
+            await asyncio.sleep(0)
+            start = ticks
+            result = await check_type_async(list(range(1000)), [int], 100)
+            done = True
+            await counter
+            return result, ticks - start
+
+        result, ticks = asyncio.run(main())
+        self.assertTrue(result)
+        self.assertGreaterEqual(ticks, 9)
+
+    def test_nested_containers_are_charged(self):
+        async def main():
+            ticks = 0
+            done = False
+
+            async def count():
+                nonlocal ticks
+                while not done:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            counter = asyncio.ensure_future(count())
+            await asyncio.sleep(0)
+            start = ticks
+            value = [list(range(100)) for _ in range(100)]
+            result = await check_type_async(value, [[int]], 100)
+            done = True
+            await counter
+            return result, ticks - start
+
+        result, ticks = asyncio.run(main())
+        self.assertTrue(result)
+        self.assertGreaterEqual(ticks, 99)
+
+
 class UnionTest(unittest.TestCase):
 
     def test_union_is_type(self):
@@ -1135,6 +1569,362 @@ class InterfaceTest(unittest.TestCase):
 
         self.assertIsInstance(TestImplementation(), TestInterface)
 
+    def test_lazy_interface(self):
+
+        class TestInterface(Interface, lazy=True):
+            x = int
+
+            def test(a: int) -> int:
+                pass
+
+        class TestImplementation:
+            x = 1
+
+            def test(self, a: int) -> int:
+                return a
+
+        self.assertEqual({}, TestInterface.__signatures__)
+        self.assertEqual(['test'], list(TestInterface.__pending__))
+        self.assertIsInstance(TestImplementation(), TestInterface)
+        self.assertTrue(issubclass(TestImplementation, TestInterface))
+        self.assertNotIsInstance(1, TestInterface)
+        self.assertEqual({}, TestInterface.__pending__)
+        self.assertEqual(['test'], list(TestInterface.__signatures__))
+
+    def test_lazy_interface_add_method(self):
+
+        class Test(Interface, lazy=True):
+            pass
+
+        @Test.add_method
+        def test(x: int) -> int:
+            pass
+
+        class TestImplementation:
+            def test(self, x: int) -> int:
+                return 1
+
+        class Other: pass
+
+        self.assertRaises(TypeError, Test.add_method, 1)
+        self.assertIsInstance(TestImplementation(), Test)
+        self.assertNotIsInstance(Other(), Test)
+
+    def test_interface_inheritance(self):
+
+        class Base(Interface):
+            x = int
+
+            def test1(a: int) -> int:
+                pass
+
+        class Derived(Base):
+            y = str
+
+            def test2(b: str) -> str:
+                pass
+
+        class TestImplementation:
+            x = 1
+            y = 'string'
+
+            def test1(self, a: int) -> int:
+                return a
+
+            def test2(self, b: str) -> str:
+                return b
+
+        class BaseImplementation:
+            x = 1
+
+            def test1(self, a: int) -> int:
+                return a
+
+        self.assertEqual({'x': int, 'y': str}, Derived.__attributes__)
+        self.assertEqual(['test1', 'test2'], sorted(Derived.__signatures__))
+        self.assertEqual({'x': int}, Base.__attributes__)
+        self.assertEqual(['test1'], list(Base.__signatures__))
+
+        self.assertIsInstance(TestImplementation(), Derived)
+        self.assertIsInstance(BaseImplementation(), Base)
+        self.assertNotIsInstance(BaseImplementation(), Derived)
+        self.assertTrue(issubclass(TestImplementation, Derived))
+        self.assertFalse(issubclass(BaseImplementation, Derived))
+
+    def test_interface_composition(self):
+
+        class Test1(Interface):
+            def test1() -> int:
+                pass
+
+        class Test2(Interface):
+            def test2() -> str:
+                pass
+
+        class Composed(Test1, Test2, Interface):
+            pass
+
+        class TestImplementation:
+            def test1(self) -> int:
+                return 1
+
+            def test2(self) -> str:
+                return 'string'
+
+        class Other:
+            def test1(self) -> int:
+                return 1
+
+        self.assertEqual(['test1', 'test2'], sorted(Composed.__signatures__))
+        self.assertIsInstance(TestImplementation(), Composed)
+        self.assertNotIsInstance(Other(), Composed)
+
+    def test_interface_inheritance_override(self):
+
+        class Base(Interface):
+            x = int
+
+            def test(a: int) -> int:
+                pass
+
+        class Derived(Base):
+            x = str
+
+            def test(a: str) -> str:
+                pass
+
+        class TestImplementation:
+            x = 'string'
+
+            def test(self, a: str) -> str:
+                return a
+
+        self.assertIsInstance(TestImplementation(), Derived)
+        self.assertNotIsInstance(TestImplementation(), Base)
+
+    def test_interface_inheritance_add_to_base(self):
+
+        class Base(Interface):
+            pass
+
+        class Derived(Base):
+            pass
+
+        class TestImplementation:
+            x = 1
+
+            def test(self, a: int) -> int:
+                return a
+
+        class Other: pass
+
+        Base.add_attribute('x', int)
+
+        @Base.add_method
+        def test(a: int) -> int:
+            pass
+
+        self.assertEqual({'x': int}, Derived.__attributes__)
+        self.assertEqual(['test'], list(Derived.__signatures__))
+        self.assertIsInstance(TestImplementation(), Derived)
+        self.assertNotIsInstance(Other(), Derived)
+
+    def test_lazy_interface_inheritance(self):
+
+        class Base(Interface, lazy=True):
+            def test1(a: int) -> int:
+                pass
+
+        class Derived(Base):
+            def test2(b: str) -> str:
+                pass
+
+        class Eager(Base, lazy=False):
+            pass
+
+        class TestImplementation:
+            def test1(self, a: int) -> int:
+                return a
+
+            def test2(self, b: str) -> str:
+                return b
+
+        self.assertTrue(Derived.__lazy__)
+        self.assertEqual(['test1', 'test2'], sorted(Derived.__pending__))
+        self.assertEqual(['test1'], list(Eager.__signatures__))
+        self.assertIsInstance(TestImplementation(), Derived)
+        self.assertEqual({}, Derived.__pending__)
+        self.assertEqual(['test1'], list(Base.__pending__))
+
+    def test_static_interface_attributes(self):
+
+        class TestInterface(Interface, static=True):
+            x = int
+            y = str
+
+        class TestImplementation1:
+            y = 'string'
+
+            def __init__(self):
+                self.x = 1
+
+        class TestImplementation2:
+            __slots__ = ('x', 'y')
+
+            def __init__(self):
+                self.x = 1
+                self.y = 'string'
+
+        class Other:
+            __slots__ = ('x', 'y')
+
+            def __init__(self):
+                self.x = 1
+
+        self.assertIsInstance(TestImplementation1(), TestInterface)
+        self.assertIsInstance(TestImplementation2(), TestInterface)
+        self.assertNotIsInstance(Other(), TestInterface)
+        self.assertNotIsInstance(1, TestInterface)
+
+    def test_static_interface_has_no_side_effects(self):
+        accessed = []
+
+        class TestInterface(Interface, static=True):
+            x = int
+            y = int
+
+            def test(a: int) -> int:
+                pass
+
+        class TestImplementation:
+            def __getattr__(self, name):
+                accessed.append(name)
+                return 1
+
+            @property
+            def x(self) -> int:
+                accessed.append('x')
+                return 1
+
+            def test(self, a: int) -> int:
+                return a
+
+        implementation = TestImplementation()
+        self.assertNotIsInstance(implementation, TestInterface)
+        implementation.y = 1
+        self.assertIsInstance(implementation, TestInterface)
+        self.assertEqual([], accessed)
+
+    def test_static_interface_property_annotations(self):
+
+        class TestInterface(Interface, static=True):
+            x = int
+
+        class TestImplementation:
+            @property
+            def x(self) -> int:
+                return 1
+
+        class Other1:
+            @property
+            def x(self) -> str:
+                return 'string'
+
+        class Other2:
+            @property
+            def x(self):
+                return 1
+
+        self.assertIsInstance(TestImplementation(), TestInterface)
+        self.assertNotIsInstance(Other1(), TestInterface)
+        self.assertNotIsInstance(Other2(), TestInterface)
+
+    def test_static_interface_follows_abc_registration(self):
+
+        class Base(abc.ABC):
+            pass
+
+        class Impl:
+            pass
+
+        class TestInterface(Interface, static=True):
+            x = Base
+
+        class TestImplementation:
+            @property
+            def x(self) -> Impl:
+                return Impl()
+
+        self.assertNotIsInstance(TestImplementation(), TestInterface)
+        Base.register(Impl)
+        self.assertIsInstance(TestImplementation(), TestInterface)
+
+    def test_static_interface_methods(self):
+
+        class TestInterface(Interface, static=True):
+            def test(a: int) -> int:
+                pass
+
+        class TestImplementation:
+            def test(self, a: int) -> int:
+                return a
+
+        class Other:
+            def test(self, a: str) -> int:
+                return a
+
+        class Callable:
+            def __call__(self, a: int) -> int:
+                return a
+
+        self.assertIsInstance(TestImplementation(), TestInterface)
+        self.assertNotIsInstance(Other(), TestInterface)
+
+        other = Other()
+        other.test = TestImplementation().test
+        self.assertIsInstance(other, TestInterface)
+        self.assertNotIsInstance(Other(), TestInterface)
+
+        class StaticImplementation:
+            test = staticmethod(Callable())
+
+        self.assertIsInstance(StaticImplementation(), TestInterface)
+
+    def test_static_interface_builtin_implementation(self):
+
+        class TestInterface(Interface, static=True):
+            def __len__():
+                pass
+
+        self.assertIsInstance([], TestInterface)
+        self.assertIsInstance('', TestInterface)
+        self.assertNotIsInstance(iter([]), TestInterface)
+        self.assertNotIsInstance(1, TestInterface)
+
+    def test_static_interface_cache_invalidation(self):
+
+        class TestInterface(Interface, static=True):
+            pass
+
+        class Derived(TestInterface):
+            pass
+
+        class TestImplementation:
+            def test(self, x: int) -> int:
+                return 1
+
+        class Other: pass
+
+        self.assertTrue(Derived.__static__)
+        self.assertIsInstance(Other(), Derived)
+
+        @TestInterface.add_method
+        def test(x: int) -> int:
+            pass
+
+        self.assertIsInstance(TestImplementation(), Derived)
+        self.assertNotIsInstance(Other(), Derived)
+
 
 class PredicateTest(unittest.TestCase):
 
@@ -1174,6 +1964,71 @@ class PredicateTest(unittest.TestCase):
         self.assertIsInstance(f1, callback)
         self.assertNotIsInstance(f2, callback)
 
+    def test_typedef_memoized(self):
+        from unittest import mock
+
+        @typedef
+        def callback(a: int) -> int:
+            pass
+
+        def f1(a: int) -> int:
+            return a
+
+        self.assertIsInstance(f1, callback)
+        with mock.patch('inspect.signature') as signature:
+            signature.side_effect = AssertionError
+            self.assertIsInstance(f1, callback)
+
+        f1.__annotations__['a'] = str
+        self.assertIsInstance(f1, callback)
+        callback.invalidate(f1)
+        self.assertNotIsInstance(f1, callback)
+
+        f1.__annotations__['a'] = int
+        callback.invalidate()
+        self.assertIsInstance(f1, callback)
+
+    def test_typedef_cache_is_weak(self):
+        import gc
+
+        @typedef
+        def callback(a: int) -> int:
+            pass
+
+        def f1(a: int) -> int:
+            return a
+
+        self.assertIsInstance(f1, callback)
+        self.assertEqual(1, len(callback.__cache__))
+        del f1
+        gc.collect()
+        self.assertEqual(0, len(callback.__cache__))
+
+        self.assertIsInstance(len, typedef(lambda obj: None))
+
+    def test_typedef_invalidated_by_interface_changes(self):
+
+        class Test(Interface):
+            pass
+
+        class Other:
+            pass
+
+        @typedef
+        def callback(a: Other):
+            pass
+
+        def f1(a: Test):
+            pass
+
+        self.assertIsInstance(f1, callback)
+
+        @Test.add_method
+        def test():
+            pass
+
+        self.assertNotIsInstance(f1, callback)
+
     def test_options(self):
         self.assertIsInstance('open', options('open', 'write'))
         self.assertIsInstance('write', options('open', 'write'))
@@ -1183,5 +2038,250 @@ class PredicateTest(unittest.TestCase):
         self.assertIsInstance(1, only(int))
         self.assertNotIsInstance(True, only(int))
 
+
+
+def positive(x):
+    return x > 0
+
+
+def handler(a: int) -> int:
+    return a
+
+
+class PickleTest(unittest.TestCase):
+
+    def round_trip(self, constraint):
+        return pickle.loads(pickle.dumps(constraint))
+
+    def test_constraints_are_interned(self):
+        self.assertIs(union(int, str), union(str, int))
+        self.assertIs(optional(int), optional(int))
+        self.assertIs(options('a', 'b'), options('a', 'b'))
+        self.assertIs(only(int), only(int))
+        self.assertIs(predicate(positive), predicate(positive))
+        self.assertIsNot(optional(int), optional(str))
+        self.assertIsNot(predicate(positive), predicate(positive, 'other'))
+        self.assertIsNot(options(1), options(True))
+        self.assertIsNot(options(1), options(1.0))
+
+    def test_typedefs_are_not_interned(self):
+        @typedef
+        def callback(a: int) -> int:
+            pass
+
+        @typedef
+        def other(a: int) -> int:
+            pass
+
+        self.assertIsNot(callback, other)
+        self.assertIsInstance(handler, callback)
+        self.assertIsInstance(handler, other)
+        self.assertIn(handler, other.__cache__)
+        callback.invalidate()
+        self.assertIn(handler, other.__cache__)
+
+    def test_round_trip(self):
+        constraints = [union(int, str), optional(int), options('a', 1),
+                       only(bool), predicate(positive), optional(union(int, str))]
+        for constraint in constraints:
+            self.assertIs(constraint, self.round_trip(constraint))
+
+    def test_round_trip_typedef(self):
+        @typedef
+        def callback(a: int) -> int:
+            pass
+
+        copy = self.round_trip(callback)
+        self.assertEqual(callback.__signature__, copy.__signature__)
+        self.assertIsInstance(handler, copy)
+        self.assertNotIsInstance(positive, copy)
+
+    def test_unhashable_arguments(self):
+        @typedef
+        def callback(a: [int]):
+            pass
+
+        copy = self.round_trip(callback)
+        self.assertEqual(callback.__signature__, copy.__signature__)
+        self.assertIsNot(options([1], [2]), options([1], [2]))
+        self.assertIsInstance([1], self.round_trip(options([1], [2])))
+
+    def test_unpicklable_predicate(self):
+        self.assertRaises((pickle.PicklingError, AttributeError),
+                          pickle.dumps, predicate(lambda x: x))
+
+    def test_classes_are_pickled_by_reference(self):
+        self.assertIs(AnyType, self.round_trip(AnyType))
+        self.assertIs(Interface, self.round_trip(Interface))
+
+    def test_worker_process(self):
+        constraint = {str: [union(int, optional(float))]}
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            self.assertTrue(executor.submit(
+                _check_type_constraint, {'a': [1, None, 2.0]}, constraint
+            ).result())
+            self.assertFalse(executor.submit(
+                _check_type_constraint, {'a': ['b']}, constraint).result())
+
+
+
+
+class Person(Record):
+    name: str
+    age: int
+
+
+class RecordTest(unittest.TestCase):
+
+    def test_construction(self):
+        person = Person('john', 20)
+        self.assertEqual('john', person.name)
+        self.assertEqual(20, person.age)
+        self.assertEqual(person, Person(age=20, name='john'))
+        self.assertNotEqual(person, Person('john', 21))
+        self.assertEqual("Person(name='john', age=20)", repr(person))
+        self.assertRaisesRegex(TypeError, 'Incorrect type for "age"',
+                               Person, 'john', '20')
+        self.assertRaisesRegex(TypeError, 'Missing field "age"', Person, 'john')
+        self.assertRaisesRegex(TypeError, 'Unknown field "other"', Person,
+                               'john', 20, other=1)
+        self.assertRaisesRegex(TypeError, 'Multiple values', Person, 'john',
+                               name='john', age=20)
+        self.assertRaises(TypeError, Person, 'john', 20, 1)
+
+    def test_assignment(self):
+        person = Person('john', 20)
+        person.age = 21
+        self.assertEqual(21, person.age)
+        with self.assertRaisesRegex(TypeError, 'Incorrect type for "age"'):
+            person.age = '22'
+        self.assertEqual(21, person.age)
+        with self.assertRaises(AttributeError):
+            person.other = 1
+
+    def test_slots(self):
+        self.assertEqual(('name', 'age'), Person.__slots__)
+        self.assertFalse(hasattr(Person('john', 20), '__dict__'))
+
+    def test_inheritance_and_members(self):
+        class Employee(Person):
+            salary: optional(int)
+            tags: [str]
+            KINDS = {'full': int, 'part': float}
+
+            class Kind:
+                pass
+
+            def describe(self) -> str:
+                return '{0} {1}'.format(self.name, self.salary)
+
+        employee = Employee('john', 20, None, ['a'])
+        self.assertEqual(('salary', 'tags'), Employee.__slots__)
+        self.assertEqual(['name', 'age', 'salary', 'tags'],
+                         list(Employee.__fields__))
+        self.assertEqual(int, Employee.KINDS['full'])
+        self.assertIsInstance(Employee.Kind(), Employee.Kind)
+        self.assertEqual('john None', employee.describe())
+        with self.assertRaises(TypeError):
+            employee.tags = ['a', 1]
+        with self.assertRaises(TypeError):
+            employee.name = 1
+        self.assertRaises(TypeError, Employee, 'john', 20, 1.5, [])
+
+        with self.assertRaises(TypeError):
+            class Invalid(Person):
+                def name(self):
+                    pass
+        with self.assertRaises(TypeError):
+            class WithValue(Record):
+                name: str = 'john'
+
+    def test_hash(self):
+        self.assertRaises(TypeError, hash, Person('john', 20))
+
+    def test_custom_init(self):
+        class Point(Record):
+            x: int
+            y: int
+
+            def __init__(self, x):
+                self.x = x
+                self.y = x * 2
+
+        self.assertEqual(Point(1), Point(1))
+        self.assertEqual(2, Point(1).y)
+        self.assertRaises(TypeError, Point, 'a')
+
+    def test_pickle(self):
+        person = pickle.loads(pickle.dumps(Person('john', 20)))
+        self.assertEqual(Person('john', 20), person)
+
+    def test_interface_skips_guaranteed_attributes(self):
+        checked = []
+
+        class CountingMeta(type):
+            def __instancecheck__(cls, instance):
+                checked.append(instance)
+                return isinstance(instance, str)
+
+        class Name(str, metaclass=CountingMeta):
+            pass
+
+        class Named(Interface):
+            name = Name
+
+        class StaticNamed(Interface, static=True):
+            name = Name
+
+        class NamedRecord(Record):
+            name: Name
+
+        record = NamedRecord(Name('john'))
+        checked.clear()
+        self.assertIsInstance(record, Named)
+        self.assertIsInstance(record, StaticNamed)
+        self.assertEqual([], checked)
+
+        # Not guaranteed by the field declaration, still checked.
+        self.assertIsInstance(Person('john', 20), Named)
+        self.assertEqual(['john'], checked)
+
+    def test_interface_with_unset_field(self):
+        class Partial(Record):
+            name: str
+
+            def __init__(self):
+                pass
+
+        class Named(Interface):
+            name = str
+
+        self.assertNotIsInstance(Partial(), Named)
+        partial = Partial()
+        partial.name = 'john'
+        self.assertIsInstance(partial, Named)
+
+    def test_interface_changes_are_seen(self):
+        class Closable(Interface):
+            pass
+
+        class Handle:
+            pass
+
+        class File(Record):
+            handle: Handle
+
+        class HasHandle(Interface):
+            handle = Closable
+
+        self.assertIsInstance(File(Handle()), HasHandle)
+
+        @Closable.add_method
+        def close():
+            pass
+
+        self.assertNotIsInstance(File(Handle()), HasHandle)
+
+
 if __name__ == '__main__':
     unittest.main()
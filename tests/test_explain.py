@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+
+from annotation.explain import ConstraintProfiler
+from annotation.typed import Interface, predicate, typechecked, union
+
+
+class ConstraintProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = ConstraintProfiler()
+
+    def nodes(self):
+        return {node.path: node for node in self.profiler.stats()}
+
+    def test_same_results_as_typechecked(self):
+        constraints = [
+            (int, 1, 'string'),
+            ([int], [1, 2], [1, 'string']),
+            ([int, str], [1, 'string'], [1.5]),
+            ({int, str}, {1, 'string'}, {1.5}),
+            ((int, str), (1, 'string'), ('string', 1)),
+            ({str: int}, {'a': 1}, {'a': 'b'}),
+            ({str: int, int: str}, {'a': 1, 1: 'a'}, {'a': 'a'}),
+            ({str: [int]}, {'a': [1]}, {'a': ['b']}),
+            (union(int, str), 'string', 1.5),
+            ([], [1, 'string'], 1),
+        ]
+        for constraint, valid, invalid in constraints:
+            self.assertTrue(self.profiler.check(valid, constraint))
+            self.assertFalse(self.profiler.check(invalid, constraint))
+
+    def test_typechecked(self):
+
+        @typechecked(profiler=self.profiler)
+        def test(a: [int], b) -> str:
+            return b
+
+        self.assertEqual('string', test([1, 2, 3], 'string'))
+        self.assertRaises(TypeError, test, ['string'], 'string')
+        self.assertRaises(TypeError, test, [1], 1)
+
+        nodes = self.nodes()
+        self.assertEqual(['a', 'a[*]', 'b', 'return'], sorted(nodes))
+        self.assertEqual(3, nodes['a'].calls)
+        self.assertEqual(5, nodes['a[*]'].calls)
+        self.assertEqual('int', nodes['a[*]'].constraint)
+        self.assertEqual(2, nodes['return'].calls)
+        self.assertTrue(nodes['a'].function.endswith('test'))
+        self.assertGreaterEqual(nodes['a'].total_time, nodes['a[*]'].total_time)
+
+    def test_typechecked_coroutine(self):
+
+        @typechecked(profiler=self.profiler)
+        async def test(a: int) -> int:
+            return a
+
+        self.assertEqual(1, asyncio.run(test(1)))
+        self.assertRaises(TypeError, asyncio.run, test('string'))
+        nodes = self.nodes()
+        self.assertEqual(2, nodes['a'].calls)
+        self.assertEqual(1, nodes['return'].calls)
+
+        @typechecked(profiler=self.profiler)
+        async def wrong(a: int) -> str:
+            return a
+
+        self.assertRaises(TypeError, asyncio.run, wrong(1))
+
+    def test_branches(self):
+        Positive = predicate(lambda x: x > 0, 'Positive')
+
+        class Named(Interface):
+            name = str
+
+        self.profiler.check({'a': 1, 2: [-1]}, {str: Positive, int: [Named, int]})
+        nodes = self.nodes()
+        self.assertEqual(
+            ['value', 'value{key}#0', 'value{key}#1', 'value{value}#0',
+             'value{value}#1', 'value{value}#1[*]#0', 'value{value}#1[*]#1'],
+            sorted(nodes))
+        self.assertEqual('predicate Positive', nodes['value{value}#0'].constraint)
+        self.assertEqual('interface ConstraintProfilerTest.test_branches.'
+                         '<locals>.Named', nodes['value{value}#1[*]#0'].constraint)
+        self.assertEqual(2, nodes['value{key}#0'].calls)
+        self.assertEqual(1, nodes['value{key}#1'].calls)
+
+    def test_report(self):
+        self.profiler.check([(1, 'a')] * 100, [(int, str)])
+        report = self.profiler.report(sort='calls', limit=2).splitlines()
+        self.assertEqual(3, len(report))
+        self.assertIn('calls', report[0])
+        self.assertTrue(report[1].split()[0] == '100')
+        self.profiler.reset()
+        self.assertEqual([], self.profiler.stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import asyncio
+import unittest
+
+from annotation import instrument
+from annotation.overload import FunctionNotFound, overloaded
+from annotation.typed import Interface, typechecked
+
+
+class InstrumentTest(unittest.TestCase):
+
+    def setUp(self):
+        instrument.enable()
+
+    def tearDown(self):
+        instrument.disable()
+        instrument.reset()
+
+    def counters(self, obj):
+        return instrument.snapshot()['{0}.{1}'.format(obj.__module__,
+                                                      obj.__qualname__)]
+
+    def test_typechecked(self):
+
+        @typechecked
+        def test(a: int, b: str) -> int:
+            return a
+
+        self.assertEqual(1, test(1, 'string'))
+        self.assertRaises(TypeError, test, 'string', 'string')
+        counters = self.counters(test)
+        self.assertEqual(2, counters['calls'])
+        self.assertEqual(3, counters['checks'])
+        self.assertEqual(1, counters['failures'])
+        self.assertGreater(counters['check_time'], 0)
+
+    def test_typechecked_coroutine(self):
+
+        @typechecked(chunk_size=2)
+        async def test(a: [int]) -> int:
+            return len(a)
+
+        self.assertEqual(3, asyncio.run(test([1, 2, 3])))
+        self.assertRaises(TypeError, asyncio.run, test(['a']))
+        counters = self.counters(test)
+        self.assertEqual(2, counters['calls'])
+        self.assertEqual(2, counters['checks'])
+        self.assertEqual(1, counters['failures'])
+
+    def test_typechecked_return_failure(self):
+
+        @typechecked(lazy=True)
+        def test(a) -> int:
+            return a
+
+        self.assertRaises(TypeError, test, 'string')
+        counters = self.counters(test)
+        self.assertEqual(1, counters['calls'])
+        self.assertEqual(1, counters['failures'])
+
+    def test_disabled(self):
+        instrument.disable()
+
+        @typechecked
+        def test(a: int) -> int:
+            return a
+
+        class TestInterface(Interface):
+            pass
+
+        self.assertEqual(1, test(1))
+        self.assertIsInstance(1, TestInterface)
+        self.assertRaises(KeyError, self.counters, test)
+        self.assertRaises(KeyError, self.counters, TestInterface)
+
+    def test_interface(self):
+
+        class TestInterface(Interface):
+            def test():
+                pass
+
+        class TestImplementation:
+            def test(self):
+                pass
+
+        class Derived(TestInterface):
+            pass
+
+        self.assertIsInstance(TestImplementation(), TestInterface)
+        self.assertNotIsInstance(1, TestInterface)
+        counters = self.counters(TestInterface)
+        self.assertEqual(2, counters['calls'])
+        self.assertEqual(1, counters['failures'])
+
+        instrument.disable()
+        self.assertIsInstance(TestImplementation(), Derived)
+        self.assertEqual(1, self.counters(Derived)['calls'])
+
+    def test_overloaded(self):
+
+        @overloaded
+        def test(a: int):
+            return 'int'
+
+        @overloaded
+        def test(a: str):
+            return 'str'
+
+        self.assertEqual('int', test(1))
+        self.assertEqual('int', test(2))
+        self.assertEqual('str', test('string'))
+        self.assertRaises(FunctionNotFound, test, 1, 2)
+        counters = instrument.snapshot()['{0}.{1}'.format(
+            __name__, 'InstrumentTest.test_overloaded.<locals>.test')]
+        self.assertEqual(4, counters['calls'])
+        self.assertEqual(1, counters['hits'])
+        self.assertEqual(3, counters['misses'])
+        self.assertEqual(1, counters['failures'])
+
+    def test_overloaded_stats(self):
+
+        @overloaded
+        def test(a: int):
+            return 'int'
+
+        @overloaded
+        def test(a: bool):
+            return 'bool'
+
+        for _ in range(3):
+            test(True)
+        test(1)
+        self.assertRaises(FunctionNotFound, test, 'string')
+        stats = test.stats()
+        self.assertEqual(5, stats.calls)
+        self.assertEqual(2, stats.hits)
+        self.assertEqual(3, stats.misses)
+        self.assertEqual(1, stats.failures)
+        self.assertEqual(0.4, stats.hit_ratio)
+        self.assertGreater(stats.lookup_time, 0)
+        self.assertLessEqual(stats.lookup_time, stats.dispatch_time)
+        self.assertEqual(['bool', 'int'],
+                         [func(1) for func, calls in stats.implementations])
+        self.assertEqual([3, 1],
+                         [calls for func, calls in stats.implementations])
+
+    def test_export(self):
+        exported = []
+
+        @typechecked
+        def test(a: int):
+            return a
+
+        test(1)
+        instrument.add_hook(exported.append)
+        try:
+            data = instrument.export(reset_counters=True)
+        finally:
+            instrument.remove_hook(exported.append)
+        self.assertEqual([data], exported)
+        self.assertEqual(1, data['{0}.{1}'.format(__name__, test.__qualname__)]['calls'])
+        self.assertEqual(0, self.counters(test)['calls'])
+
+
+if __name__ == '__main__':
+    unittest.main()
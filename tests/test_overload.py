@@ -1,6 +1,14 @@
+import abc
+import asyncio
+import collections.abc
+import gc
+import io
 import unittest
 
-from annotation.overload import AmbiguousFunction, FunctionNotFound, overloaded
+from annotation import overload
+from annotation.overload import (AmbiguousFunction, FunctionNotFound,
+                                 OverloadedFunction, overloaded, unregister)
+from annotation.typed import Interface, predicate, union
 
 
 class TestOverloaded(unittest.TestCase):
@@ -61,5 +69,740 @@ class TestOverloaded(unittest.TestCase):
         self.assertRaises(AmbiguousFunction, foo.add_function, other_foo)
 
 
+    def test_unrelated_overloads(self):
+        @overloaded
+        def foo(a:int):
+            return 'int'
+
+        @overloaded
+        def foo(a:str):
+            return 'str'
+
+        @overloaded
+        def foo(a:float):
+            return 'float'
+
+        self.assertEqual(foo(1), 'int')
+        self.assertEqual(foo(''), 'str')
+        self.assertEqual(foo(1.0), 'float')
+
+    def test_method(self):
+        class Shape:
+            def __init__(self, name):
+                self.name = name
+
+            @overloaded
+            def scale(self, factor: int):
+                return (self.name, 'int', factor)
+
+            @overloaded
+            def scale(self, factor: float):
+                return (self.name, 'float', factor)
+
+        shape = Shape('a')
+        self.assertEqual(('a', 'int', 2), shape.scale(2))
+        self.assertEqual(('a', 'float', 2.0), shape.scale(2.0))
+        self.assertEqual(('b', 'int', 3), Shape('b').scale(3))
+        self.assertEqual(('a', 'int', 2), Shape.scale(shape, 2))
+        self.assertRaises(FunctionNotFound, shape.scale, 'a')
+        self.assertEqual({(int,), (float,)}, set(Shape.scale._method_cache))
+        self.assertFalse(hasattr(shape.scale, '__dict__'))
+
+    def test_method_on_receiver_type(self):
+        class A:
+            pass
+
+        class B:
+            pass
+
+        class Base:
+            @overloaded
+            def f(self: A, a: int):
+                return 'A'
+
+            @overloaded
+            def f(self: B, a: int):
+                return 'B'
+
+        class X(Base, A):
+            pass
+
+        class Y(Base, B):
+            pass
+
+        self.assertEqual('A', X().f(1))
+        self.assertEqual('B', Y().f(1))
+        self.assertEqual('A', X().f(1))
+        self.assertEqual({(X, int), (Y, int)}, set(Base.f._method_cache))
+
+    def test_method_cache_skips_receiver(self):
+        class Base:
+            @overloaded
+            def f(self, a: int):
+                return 'int'
+
+        class Derived(Base):
+            pass
+
+        self.assertEqual('int', Base().f(1))
+        self.assertEqual('int', Derived().f(2))
+        self.assertEqual({(int,)}, set(Base.f._method_cache))
+
+        class Annotated(Base):
+            @overloaded
+            def f(self: Base, a: str):
+                return 'str'
+
+        class Plain(Annotated):
+            @overloaded
+            def f(self, a: float):
+                return 'float'
+
+        self.assertEqual('str', Plain().f('a'))
+        self.assertEqual('int', Plain().f(1))
+        self.assertEqual({(Plain, str), (Plain, int)}, set(Plain.f._method_cache))
+
+    def test_method_in_subclass(self):
+        class Base:
+            @overloaded
+            def describe(self, value: int):
+                return 'base int'
+
+            @overloaded
+            def describe(self, value: str):
+                return 'base str'
+
+        class Derived(Base):
+            @overloaded
+            def describe(self, value: str):
+                return 'derived str'
+
+            @overloaded
+            def describe(self, value: bytes):
+                return 'derived bytes'
+
+        derived = Derived()
+        self.assertEqual('base int', derived.describe(1))
+        self.assertEqual('derived str', derived.describe('a'))
+        self.assertEqual('derived bytes', derived.describe(b'a'))
+        self.assertEqual('base str', Base().describe('a'))
+        self.assertRaises(FunctionNotFound, Base().describe, b'a')
+        self.assertEqual('base int', Derived.describe(derived, 1))
+        # The overloads of the base class are not copied.
+        self.assertEqual(2, len(Base.describe._functions[2]._childs))
+        self.assertEqual(2, len(Derived.describe._functions[2]._childs))
+
+        def describe(self, value: float):
+            return 'base float'
+        Base.describe.add_function(describe)
+        self.assertEqual('base float', derived.describe(1.0))
+
+
+    def test_registry_is_weak(self):
+        def define():
+            @overloaded
+            def foo(a:int):
+                return 'int'
+
+            @overloaded
+            def foo(a:str):
+                return 'str'
+            return foo
+
+        foo = define()
+        self.assertEqual('str', foo(''))
+        functions = overload._overloaded_functions[__name__]
+        self.assertIs(foo, functions.get(foo._name))
+        name = foo._name
+        del foo
+        gc.collect()
+        self.assertNotIn(name, functions)
+        # Not ambiguous with the released overloads.
+        self.assertEqual('int', define()(1))
+
+    def test_unregister(self):
+        @overloaded
+        def foo(a:int):
+            return 'int'
+
+        old_foo = foo
+        unregister(foo)
+        self.assertIsNone(overload._overloaded_functions.get(__name__, {}).get(foo._name))
+
+        @overloaded
+        def foo(a:int):
+            return 'new int'
+
+        self.assertIsNot(old_foo, foo)
+        self.assertEqual('int', old_foo(1))
+        self.assertEqual('new int', foo(1))
+        unregister(old_foo)
+        self.assertIs(foo, overload._overloaded_functions[__name__][foo._name])
+
+    def test_freeze(self):
+        @overloaded
+        def foo(a, b):
+            return 'two empty args'
+
+        @overloaded
+        def foo(a:int, b):
+            return 'one int'
+
+        @overloaded
+        def foo(a:int, b:str):
+            return 'int and str'
+
+        @overloaded
+        def foo(a:str, b:int):
+            return 'str and int'
+
+        @overloaded
+        def foo(a:bool):
+            return 'bool'
+
+        self.assertIs(foo, foo.freeze())
+        self.assertEqual({}, foo._functions)
+        self.assertEqual(foo(object(), object()), 'two empty args')
+        self.assertEqual(foo(1, object()), 'one int')
+        self.assertEqual(foo(1, ''), 'int and str')
+        self.assertEqual(foo('', 1), 'str and int')
+        self.assertEqual(foo(True), 'bool')
+        self.assertRaises(FunctionNotFound, foo, 1)
+        self.assertRaises(FunctionNotFound, foo, object(), object(), object())
+
+        def other_foo(a:float, b):
+            pass
+        self.assertRaises(TypeError, foo.add_function, other_foo)
+
+    def test_heap_find(self):
+        Even = predicate(lambda x: x % 2 == 0, 'Even')
+
+        def foo(a, b):
+            return 'any'
+
+        def bar(a: int, b):
+            return 'int'
+
+        def baz(a: Even, b: str):
+            return 'even'
+
+        heap = overload.FunctionHeap(foo)
+        heap.push(bar)
+        heap.push(baz)
+        self.assertIs(bar, heap.find((int, str), (1, 'a')))
+        self.assertIs(baz, heap.find((int, str), (2, 'a')))
+        self.assertIs(foo, heap.find((str, str), ('a', 'a')))
+        self.assertIs(foo, heap.find((str, int)))
+        self.assertIs(bar, heap.find((int, int)))
+        # Even may match values of any type.
+        self.assertRaises(TypeError, heap.find, (str, str))
+        self.assertRaises(FunctionNotFound, overload.FunctionHeap(bar).find,
+                          (str, str))
+        self.assertTrue(overload._check_func_types(baz, (int, str)))
+        self.assertFalse(overload._check_func_types(baz, (int, int)))
+
+    def test_register_many(self):
+        def foo(a, b):
+            return 'two empty args'
+
+        def foo_int(a:int, b):
+            return 'one int'
+
+        def foo_bool_str(a:bool, b:str):
+            return 'bool and str'
+
+        def foo_int_str(a:int, b:str):
+            return 'int and str'
+
+        def foo_str_int(a:str, b:int):
+            return 'str and int'
+
+        def foo_float(a:float):
+            return 'float'
+
+        function = OverloadedFunction(__name__, 'foo')
+        function.add_function(foo_float)
+        function.register_many([foo_int_str, foo_bool_str, foo_str_int, foo,
+                                foo_int])
+        self.assertEqual(function(object(), object()), 'two empty args')
+        self.assertEqual(function(1, object()), 'one int')
+        self.assertEqual(function(True, object()), 'one int')
+        self.assertEqual(function(True, ''), 'bool and str')
+        self.assertEqual(function(1, ''), 'int and str')
+        self.assertEqual(function('', 1), 'str and int')
+        self.assertEqual(function(1.0), 'float')
+        heap = function._functions[2]
+        self.assertIs(heap._root, foo)
+        self.assertEqual({foo_int, foo_str_int},
+                         {child._root for child in heap._childs})
+
+        def foo_object(a:object):
+            return 'object'
+        function.register_many([foo_object])
+        self.assertEqual(function(1.0), 'float')
+        self.assertEqual(function(''), 'object')
+        self.assertIs(function._functions[1]._root, foo_object)
+
+    def test_register_many_ambiguous(self):
+        def foo(a:int, b):
+            pass
+
+        def other_foo(a, b:int):
+            pass
+
+        def same_foo(a:int, b):
+            pass
+
+        def single_foo(a:str):
+            pass
+
+        function = OverloadedFunction(__name__, 'foo')
+        self.assertRaises(AmbiguousFunction, function.register_many,
+                          [foo, other_foo])
+        self.assertRaises(AmbiguousFunction, function.register_many,
+                          [single_foo, foo, same_foo])
+        self.assertEqual({}, function._functions)
+        function.register_many([foo])
+        self.assertRaises(AmbiguousFunction, function.register_many,
+                          [other_foo])
+
+    def test_subclass_checks_are_invalidated(self):
+        class Closeable(abc.ABC):
+            pass
+
+        class Closing(Interface):
+            def close():
+                pass
+
+        class Resource:
+            def close(self):
+                pass
+
+            @overloaded
+            def describe(self: Closing):
+                return 'closing'
+
+        @overloaded
+        def kind(a: Closeable):
+            return 'closeable'
+
+        self.assertRaises(FunctionNotFound, kind, Resource())
+        Closeable.register(Resource)
+        self.assertEqual('closeable', kind(Resource()))
+
+        @overloaded
+        def describe(a: Closing):
+            return 'closing'
+
+        self.assertEqual('closing', describe(Resource()))
+        self.assertEqual('closing', Resource().describe())
+        def label():
+            pass
+        Closing.add_method(label)
+        self.assertRaises(FunctionNotFound, describe, Resource())
+        self.assertRaises(FunctionNotFound, Resource().describe)
+
+    def test_predicates(self):
+        Even = predicate(lambda x: x % 2 == 0, 'Even')
+        Positive = predicate(lambda x: x > 0, 'Positive')
+
+        @overloaded
+        def parity(a: int):
+            return 'int'
+
+        @overloaded
+        def parity(a: Even):
+            return 'even'
+
+        @overloaded
+        def parity(a: str):
+            return 'str'
+
+        @overloaded
+        def parity(a: union(float, Positive), b):
+            return 'float or positive'
+
+        self.assertEqual('even', parity(2))
+        self.assertEqual('int', parity(3))
+        self.assertEqual('str', parity('a'))
+        self.assertEqual({(int,), (str,)}, set(parity._candidate_cache))
+        self.assertEqual('str', parity('b'))
+        self.assertEqual('float or positive', parity(-1.0, None))
+        self.assertEqual('float or positive', parity(1, None))
+        self.assertRaises(FunctionNotFound, parity, -1, None)
+
+        parity.freeze()
+        self.assertEqual('even', parity(2))
+        self.assertEqual('int', parity(3))
+        self.assertRaises(FunctionNotFound, parity, -1, None)
+
+    def test_predicates_are_checked_per_call(self):
+        checked = []
+
+        def is_small(x):
+            checked.append(x)
+            return x < 10
+        Small = predicate(is_small)
+
+        @overloaded
+        def size(a: Small):
+            return 'small'
+
+        @overloaded
+        def size(a):
+            return 'any'
+
+        lookup = size._lookup
+        lookups = []
+        size._lookup = lambda types: lookups.append(types) or lookup(types)
+        self.assertEqual('small', size(1))
+        self.assertEqual('any', size(100))
+        self.assertEqual('any', size(20))
+        self.assertEqual([(int,)], lookups)
+        self.assertEqual([1, 100, 20], checked)
+
+    def test_interface_with_attributes(self):
+        class Named(Interface):
+            name = str
+
+        class Thing:
+            def __init__(self, name):
+                self.name = name
+
+        @overloaded
+        def label(a: Named):
+            return 'named'
+
+        @overloaded
+        def label(a: object):
+            return 'object'
+
+        self.assertEqual('named', label(Thing('a')))
+        self.assertEqual('object', label(Thing(1)))
+
+    def test_predicate_method_in_subclass(self):
+        Negative = predicate(lambda x: x < 0, 'Negative')
+
+        class Base:
+            @overloaded
+            def sign(self, value: int):
+                return 'base int'
+
+        class Derived(Base):
+            @overloaded
+            def sign(self, value: Negative):
+                return 'negative'
+
+        self.assertEqual('negative', Derived().sign(-1))
+        self.assertEqual('base int', Derived().sign(1))
+        self.assertEqual('base int', Base().sign(-1))
+
+    def test_async(self):
+        @overloaded
+        async def handle(a: int):
+            return 'int'
+
+        @overloaded
+        async def handle(a: str):
+            await asyncio.sleep(0)
+            return 'str'
+
+        self.assertTrue(asyncio.iscoroutinefunction(handle))
+        self.assertEqual('int', asyncio.run(handle(1)))
+        self.assertEqual('str', asyncio.run(handle('a')))
+        self.assertEqual({(int,), (str,)}, set(handle._function_cache))
+
+        def handle_float(a: float):
+            return 'float'
+        self.assertRaises(TypeError, handle.add_function, handle_float)
+        self.assertRaises(TypeError, handle.register_many, [handle_float])
+        self.assertRaises(FunctionNotFound, handle, 1.0)
+
+        @overloaded
+        def regular(a: int):
+            return 'int'
+
+        async def regular_str(a: str):
+            return 'str'
+        self.assertFalse(asyncio.iscoroutinefunction(regular))
+        self.assertRaises(TypeError, regular.add_function, regular_str)
+
+    def test_async_method(self):
+        class Handler:
+            @overloaded
+            async def handle(self, a: int):
+                return 'int'
+
+        self.assertEqual('int', asyncio.run(Handler().handle(1)))
+        self.assertTrue(asyncio.iscoroutinefunction(Handler().handle))
+        self.assertTrue(asyncio.iscoroutinefunction(Handler.handle))
+        self.assertFalse(hasattr(Handler().handle, '__dict__'))
+
+        class SyncHandler:
+            @overloaded
+            def handle(self, a: int):
+                return 'int'
+
+        self.assertFalse(asyncio.iscoroutinefunction(SyncHandler().handle))
+
+        with self.assertRaises((TypeError, RuntimeError)):
+            class MixedHandler(Handler):
+                @overloaded
+                def handle(self, a: str):
+                    return 'str'
+
+    def test_single_dispatch(self):
+        @overloaded
+        def render(value: int, out: list):
+            return 'int'
+
+        @overloaded
+        def render(value: bool, out: list):
+            return 'bool'
+
+        @overloaded
+        def render(value: collections.abc.Sequence, out: list):
+            return 'sequence'
+
+        @overloaded
+        def render(value, out: list):
+            return 'any'
+
+        @overloaded
+        def render(value: int, out: list, extra: int):
+            return 'int and int'
+
+        @overloaded
+        def render(value: str, out: list, extra: str):
+            return 'str and str'
+
+        self.assertEqual('int', render(1, []))
+        self.assertEqual('bool', render(True, []))
+        self.assertEqual('sequence', render('a', []))
+        self.assertEqual('any', render(1.0, []))
+        self.assertRaises(FunctionNotFound, render, 1, ())
+        self.assertEqual('int and int', render(1, [], 2))
+        self.assertRaises(FunctionNotFound, render, 1, [], 'a')
+        self.assertIsInstance(render._dispatchers[2], overload._SingleDispatch)
+        self.assertEqual(0, render._dispatchers[2].position)
+        self.assertIsNone(render._dispatchers[3])
+
+        def other_render(value: bool, out: list):
+            pass
+        self.assertRaises(AmbiguousFunction, render.add_function, other_render)
+
+        class Numbers(collections.abc.Sequence):
+            __getitem__ = __len__ = None
+        render.freeze()
+        self.assertEqual('sequence', render(Numbers(), []))
+        self.assertEqual('bool', render(False, []))
+
+    def test_single_dispatch_ambiguous_abcs(self):
+        class Left(abc.ABC):
+            pass
+
+        class Right(abc.ABC):
+            pass
+
+        class Both:
+            pass
+        Left.register(Both)
+        Right.register(Both)
+
+        @overloaded
+        def side(value: Left):
+            return 'left'
+
+        @overloaded
+        def side(value: Right):
+            return 'right'
+
+        self.assertIn(side(Both()), ('left', 'right'))
+        self.assertIsNotNone(side._dispatchers[1])
+
+    def test_single_dispatch_multiple_inheritance(self):
+        class A:
+            pass
+
+        class B:
+            pass
+
+        class C(A):
+            pass
+
+        class D(A, B):
+            pass
+
+        @overloaded
+        def with_dispatcher(a: A):
+            return 'A'
+
+        @overloaded
+        def with_dispatcher(a: B):
+            return 'B'
+
+        @overloaded
+        def with_dispatcher(a: C):
+            return 'C'
+
+        @overloaded
+        def with_heap(a: A):
+            return 'A'
+
+        @overloaded
+        def with_heap(a: B):
+            return 'B'
+
+        @overloaded
+        def with_heap(a: C):
+            return 'C'
+
+        with_heap._dispatchers[1] = None
+        for value in (A(), B(), C(), D()):
+            self.assertEqual(with_heap(value), with_dispatcher(value))
+        self.assertIsInstance(with_dispatcher._dispatchers[1],
+                              overload._SingleDispatch)
+        # The last function registered wins, not the first base in the MRO.
+        self.assertEqual('B', with_dispatcher(D()))
+        self.assertEqual('C', with_dispatcher(C()))
+
+    def test_profile(self):
+        Even = predicate(lambda x: x % 2 == 0, 'Even')
+
+        class Local:
+            pass
+
+        @overloaded
+        def convert(a: int, b):
+            return 'int'
+
+        @overloaded
+        def convert(a: Even, b):
+            return 'even'
+
+        @overloaded
+        def convert(a: object, b):
+            return 'object'
+
+        class Converter:
+            @overloaded
+            def convert(self, a: str):
+                return 'str'
+
+        convert(1, None)
+        convert('a', 1.0)
+        convert(Local(), None)
+        Converter().convert('a')
+        self.assertRaises(FunctionNotFound, Converter().convert, 1)
+        self.assertEqual({(int, type(None)), (str, float), (Local, type(None))},
+                         set(convert.observed_types()[0]))
+        self.assertEqual(([], [(str,)]), Converter.convert.observed_types())
+
+        profile = io.StringIO()
+        overload.dump_profile(profile)
+        convert._clear_caches()
+        Converter.convert._clear_caches()
+        Converter.convert.freeze()
+        profile.seek(0)
+        self.assertGreaterEqual(overload.warm_up(profile), 3)
+        self.assertEqual({(int, type(None)), (str, float)},
+                         set(convert._candidate_cache))
+        self.assertEqual({(str,)}, set(Converter.convert._method_cache))
+        self.assertEqual('even', convert(2, None))
+        self.assertEqual('str', Converter().convert('a'))
+
+        self.assertEqual(0, convert.warm_up([(float,)], [(float,)]))
+        Converter.convert._clear_caches()
+        self.assertEqual(1, Converter.convert.warm_up((), [(str,)]))
+        self.assertEqual({(str,)}, set(Converter.convert._method_cache))
+
+    def test_observed_types_survive_invalidation(self):
+        class Other(abc.ABC):
+            pass
+
+        @overloaded
+        def observed(a: union(int, str)):
+            return 'int or str'
+
+        @overloaded
+        def observed(a: object):
+            return 'object'
+
+        observed(1)
+        observed('a')
+        Other.register(float)
+        observed(1.5)
+        self.assertNotIn((int,), observed._function_cache)
+        self.assertEqual({(int,), (str,), (float,)},
+                         set(observed.observed_types()[0]))
+
+    def test_stats_and_dump_heap(self):
+        @overloaded
+        def foo(a, b):
+            pass
+
+        @overloaded
+        def foo(a: int, b):
+            pass
+
+        @overloaded
+        def foo(a: bool, b):
+            pass
+
+        @overloaded
+        def foo(a: str, b: int):
+            pass
+
+        @overloaded
+        def foo(a: float):
+            pass
+
+        foo(1, 2)
+        foo(1.0)
+        stats = foo.stats()
+        self.assertEqual(__name__ + '.' + foo._name, stats.name)
+        self.assertEqual(5, stats.functions)
+        self.assertEqual(3, stats.depth)
+        self.assertEqual(2, stats.type_tuples)
+        self.assertEqual(0, stats.calls)
+        self.assertEqual((), stats.implementations)
+        self.assertIn(stats, overload.stats())
+        self.assertIn(stats.name, overload.report())
+
+        dump = [
+            foo._name + ' with 1 argument',
+            '  foo(a: float)',
+            foo._name + ' with 2 arguments',
+            '  foo(a, b)',
+            '    foo(a: int, b)',
+            '      foo(a: bool, b)',
+            '    foo(a: str, b: int)',
+        ]
+        self.assertEqual('\n'.join(dump), foo.dump_heap())
+        foo.freeze()
+        self.assertEqual('\n'.join(dump), foo.dump_heap())
+        self.assertEqual(3, foo.stats().depth)
+
+    def test_freeze_method_in_subclass(self):
+        class Base:
+            @overloaded
+            def describe(self, value: int):
+                return 'base int'
+
+        class Derived(Base):
+            @overloaded
+            def describe(self, value: str):
+                return 'derived str'
+
+        Derived.describe.freeze()
+        self.assertEqual('base int', Derived().describe(1))
+        self.assertEqual('derived str', Derived().describe('a'))
+
+        def describe(self, value: float):
+            return 'base float'
+        Base.describe.add_function(describe)
+        self.assertEqual('base float', Derived().describe(1.0))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+import io
+import unittest
+
+from annotation.scan import ConformanceIndex, main, scan
+from annotation.typed import Interface
+
+
+class Reader(Interface):
+    def read(size: int) -> bytes:
+        pass
+
+
+class Writer(Interface):
+    def write(data: bytes) -> int:
+        pass
+
+
+class Closeable(Interface):
+    def close():
+        pass
+
+
+class File:
+    def read(self, size: int) -> bytes:
+        return b''
+
+    def write(self, data: bytes) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+
+class Socket:
+    def read(self, size: int) -> bytes:
+        return b''
+
+    def close(self):
+        pass
+
+
+class WrongReader:
+    def read(self, size: str) -> bytes:
+        return b''
+
+
+class Other:
+    pass
+
+
+class ScanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.expected = {
+            __name__ + ':File': [__name__ + ':Closeable',
+                                 __name__ + ':Reader',
+                                 __name__ + ':Writer'],
+            __name__ + ':Socket': [__name__ + ':Closeable',
+                                   __name__ + ':Reader'],
+        }
+
+    def test_scan_module(self):
+        index = scan([__name__])
+        self.assertEqual(self.expected, index.classes)
+        self.assertEqual([__name__ + ':Closeable', __name__ + ':Reader'],
+                         index.interfaces_of(Socket))
+        self.assertEqual([], index.interfaces_of(Other))
+        self.assertEqual([__name__ + ':File', __name__ + ':Socket'],
+                         index.implementations_of(Reader))
+
+    def test_scan_with_interfaces(self):
+        index = scan([__name__], interfaces=[Writer, __name__ + ':Closeable'])
+        self.assertEqual({
+            __name__ + ':File': [__name__ + ':Closeable',
+                                 __name__ + ':Writer'],
+            __name__ + ':Socket': [__name__ + ':Closeable'],
+        }, index.classes)
+
+    def test_scan_package(self):
+        package = __name__.rpartition('.')[0]
+        index = scan([package], interfaces=[Reader, Writer, Closeable])
+        self.assertEqual(self.expected['{0}:File'.format(__name__)],
+                         index.interfaces_of(File))
+        index = scan([package], interfaces=[Reader], recursive=False)
+        self.assertEqual(0, len(index))
+
+    def test_scan_processes(self):
+        self.assertEqual(scan([__name__]), scan([__name__], processes=2))
+
+    def test_index_serialization(self):
+        index = scan([__name__])
+        fp = io.StringIO()
+        index.dump(fp)
+        fp.seek(0)
+        self.assertEqual(index, ConformanceIndex.load(fp))
+
+    def test_main(self):
+        import contextlib
+        import json
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main(['-i', __name__ + ':Writer', __name__])
+        self.assertEqual({'classes': {__name__ + ':File': [__name__ + ':Writer']}},
+                         json.loads(output.getvalue()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import asyncio
+import concurrent.futures
+import threading
+import unittest
+
+from annotation.shadow import ShadowChecker
+from annotation.typed import typechecked
+
+
+class ShadowCheckerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.violations = []
+
+    def on_violation(self, name, error):
+        self.violations.append((name.rpartition('.')[2], error))
+
+    def test_violations(self):
+        checker = ShadowChecker(on_violation=self.on_violation)
+
+        @typechecked(shadow=checker)
+        def test(a: int, b: [str]) -> int:
+            return a
+
+        self.assertEqual(1, test(1, ['string']))
+        self.assertEqual('string', test('string', ['string']))
+        self.assertEqual(1, test(1, [1]))
+        checker.wait()
+        checker.close()
+
+        self.assertEqual([('test', 'Incorrect type for "a"'),
+                          ('test', 'Incorrect return type'),
+                          ('test', 'Incorrect type for "b"')], self.violations)
+        self.assertEqual(3, checker.submitted)
+        self.assertEqual(3, checker.validated)
+        self.assertEqual(2, checker.violations)
+        self.assertEqual(0, checker.dropped)
+
+    def test_raising_call(self):
+        checker = ShadowChecker(on_violation=self.on_violation)
+
+        @typechecked(shadow=checker)
+        def test(a: int) -> int:
+            return a + 1
+
+        self.assertRaises(TypeError, test, 'string')
+        checker.wait()
+        checker.close()
+        self.assertEqual([('test', 'Incorrect type for "a"')], self.violations)
+        self.assertEqual(1, checker.submitted)
+
+    def test_coroutine(self):
+        checker = ShadowChecker(on_violation=self.on_violation)
+
+        @typechecked(shadow=checker)
+        async def test(a: int) -> int:
+            return a
+
+        self.assertEqual(1, asyncio.run(test(1)))
+        self.assertEqual('string', asyncio.run(test('string')))
+        checker.wait()
+        checker.close()
+        self.assertEqual([('test', 'Incorrect type for "a"'),
+                          ('test', 'Incorrect return type')], self.violations)
+        self.assertEqual(2, checker.validated)
+
+    def test_lazy(self):
+        checker = ShadowChecker(on_violation=self.on_violation)
+
+        @typechecked(lazy=True, shadow=checker)
+        def test(a: int):
+            return a
+
+        test('string')
+        checker.wait()
+        self.assertEqual([('test', 'Incorrect type for "a"')], self.violations)
+
+    def _blocked_checker(self, drop):
+        started = threading.Event()
+        release = threading.Event()
+
+        def on_violation(name, error):
+            if not started.is_set():
+                started.set()
+                release.wait()
+            self.on_violation(name, error)
+
+        checker = ShadowChecker(maxsize=2, drop=drop, on_violation=on_violation)
+
+        @typechecked(shadow=checker)
+        def test(a: int):
+            return a
+
+        test('blocking')
+        started.wait()
+        for value in ('a', 'b', 'c', 'd'):
+            test(value)
+        release.set()
+        checker.wait()
+        return checker
+
+    def test_drop_newest(self):
+        checker = self._blocked_checker('newest')
+        self.assertEqual(5, checker.submitted)
+        self.assertEqual(3, checker.validated)
+        self.assertEqual(2, checker.dropped)
+
+    def test_drop_oldest(self):
+        checker = self._blocked_checker('oldest')
+        self.assertEqual(5, checker.submitted)
+        self.assertEqual(3, checker.validated)
+        self.assertEqual(2, checker.dropped)
+
+    def test_counters_from_threads(self):
+        checker = ShadowChecker(maxsize=8, drop='oldest',
+                                on_violation=self.on_violation)
+
+        @typechecked(shadow=checker)
+        def test(a: int):
+            return a
+
+        def call():
+            for i in range(200):
+                test(i)
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        checker.close()
+        self.assertEqual(800, checker.submitted)
+        self.assertEqual(800, checker.validated + checker.dropped)
+
+    def test_submit_after_close(self):
+        checker = ShadowChecker(on_violation=self.on_violation)
+
+        @typechecked(shadow=checker)
+        def test(a: int):
+            return a
+
+        test('a')
+        checker.close()
+        self.assertEqual(1, checker.validated)
+        self.assertRaises(RuntimeError, test, 1)
+        self.assertEqual(1, checker.submitted)
+        checker.close()
+
+    def test_invalid_drop(self):
+        self.assertRaises(ValueError, ShadowChecker, drop='other')
+
+    def test_executor(self):
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            checker = ShadowChecker(on_violation=self.on_violation,
+                                    executor=executor)
+
+            @typechecked(shadow=checker)
+            def test(a: int) -> int:
+                return a
+
+            test(1)
+            test('string')
+            checker.wait()
+
+        self.assertEqual(2, checker.validated)
+        self.assertEqual(1, checker.violations)
+        self.assertEqual(2, len(self.violations))
+
+
+if __name__ == '__main__':
+    unittest.main()
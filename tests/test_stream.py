@@ -0,0 +1,93 @@
+import io
+import os
+import tempfile
+import unittest
+
+from annotation.stream import StreamValidator, read_csv, read_jsonl
+
+
+class ReadTest(unittest.TestCase):
+
+    def test_read_jsonl(self):
+        lines = io.StringIO('{"a": 1}\n\n[1, 2]\n')
+        self.assertEqual([{'a': 1}, [1, 2]], list(read_jsonl(lines)))
+
+        with self.assertRaisesRegex(ValueError, 'line 2'):
+            list(read_jsonl(io.StringIO('1\n{\n')))
+
+    def test_read_jsonl_path(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl',
+                                         delete=False) as fp:
+            fp.write('1\n2\n')
+        self.addCleanup(os.remove, fp.name)
+        self.assertEqual([1, 2], list(read_jsonl(fp.name)))
+
+    def test_read_csv(self):
+        rows = io.StringIO('name,age\njohn,20\njane,unknown\n')
+        self.assertEqual([{'name': 'john', 'age': 20},
+                          {'name': 'jane', 'age': 'unknown'}],
+                         list(read_csv(rows, converters={'age': int})))
+
+
+class StreamValidatorTest(unittest.TestCase):
+
+    def records(self):
+        for i in range(100):
+            if i % 10 == 3:
+                yield {'values': [i, str(i)]}
+            else:
+                yield {'values': [i, i]}
+
+    def test_validate(self):
+        failures = []
+        validator = StreamValidator({str: [int]}, on_failure=failures.append)
+        valid = list(validator.validate(self.records()))
+
+        self.assertEqual(90, len(valid))
+        self.assertEqual([4, 14, 24], [f.number for f in failures[:3]])
+        self.assertEqual({'values': [3, '3']}, failures[0].record)
+        self.assertEqual('record["values"][1]', failures[0].violations[0].path)
+        self.assertEqual(100, validator.stats.records)
+        self.assertEqual(90, validator.stats.valid)
+        self.assertEqual(10, validator.stats.invalid)
+        self.assertGreater(validator.stats.throughput, 0)
+        self.assertIn('100 records, 90 valid, 10 invalid', str(validator.stats))
+
+    def test_validate_is_lazy(self):
+        consumed = []
+
+        def records():
+            for i in range(10):
+                consumed.append(i)
+                yield i
+
+        validator = StreamValidator(int)
+        stream = validator.validate(records())
+        self.assertEqual([], consumed)
+        self.assertEqual(0, next(stream))
+        self.assertEqual([0], consumed)
+
+    def test_max_errors(self):
+        failures = []
+        validator = StreamValidator([int], on_failure=failures.append,
+                                    max_errors=2)
+        list(validator.validate([['a', 'b', 'c']]))
+        self.assertEqual(['record[0]', 'record[1]'],
+                         [v.path for v in failures[0].violations])
+
+    def test_processes(self):
+        failures = []
+        validator = StreamValidator({str: [int]}, on_failure=failures.append,
+                                    processes=2, chunk_size=7)
+        valid = list(validator.validate(self.records()))
+
+        self.assertEqual([r for r in self.records() if
+                          all(isinstance(v, int) for v in r['values'])], valid)
+        self.assertEqual([4, 14, 24], [f.number for f in failures[:3]])
+        self.assertEqual('record["values"][1]', failures[0].violations[0].path)
+        self.assertEqual(100, validator.stats.records)
+        self.assertEqual(10, validator.stats.invalid)
+
+
+if __name__ == '__main__':
+    unittest.main()